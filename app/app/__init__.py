@@ -1,5 +1,5 @@
 from logging import DEBUG, basicConfig, getLogger
-from os import getenv
+from os import cpu_count, getenv
 from pathlib import Path
 from warnings import filterwarnings
 
@@ -10,6 +10,71 @@ logger = getLogger(__name__)
 filterwarnings("ignore")
 
 MLFLOW_TRACKING_URI = getenv("MLFLOW_TRACKING_URI")
+MP_START_METHOD = getenv("MP_START_METHOD", "forkserver")
+OCR_WORKERS = int(getenv("OCR_WORKERS", str(cpu_count() or 1)))
+# Rendered pages waiting for OCR when rendering runs ahead of it; bounds the
+# rasters held at once regardless of page count
+OCR_PREFETCH_PAGES = int(getenv("OCR_PREFETCH_PAGES", "2"))
+# Tiered OCR reads each page at the lowest DPI first and re-OCRs lines whose
+# mean word confidence (0-100) is below OCR_MIN_CONFIDENCE at the next tier
+OCR_TIERED = getenv("OCR_TIERED", "false").lower() == "true"
+OCR_DPI_TIERS = [int(dpi) for dpi in getenv("OCR_DPI_TIERS", "150,300").split(",")]
+OCR_MIN_CONFIDENCE = float(getenv("OCR_MIN_CONFIDENCE", "80"))
+# "compare" runs pdfplumber and OCR on every page, "route" OCRs only pages
+# whose text layer fails the TEXT_* thresholds, "race" cancels OCR as soon as
+# the whole text layer passes them, "backend" runs the one text backend the
+# cost router picks for the document
+EXTRACTION_MODE = getenv("EXTRACTION_MODE", "compare")
+# Text backend for "backend" mode: "auto" routes by document signals and
+# measured latency, a backend name ("pdfplumber", "pdfium", "ocr") pins it
+TEXT_BACKEND = getenv("TEXT_BACKEND", "auto")
+# Share of "auto" routed documents sent to a backend of the same kind (text
+# layer or OCR) other than the cheapest, so every backend keeps being measured
+# instead of judged by its prior. Explored documents can come out with slightly
+# different text, so this is off by default
+TEXT_BACKEND_EXPLORE_RATE = float(getenv("TEXT_BACKEND_EXPLORE_RATE", "0"))
+# Read filled fillable PDFs from their AcroForm fields, skipping text and OCR
+ACROFORM_FAST_PATH = getenv("ACROFORM_FAST_PATH", "true").lower() == "true"
+# Classify pages against template fingerprints before extraction: documents
+# whose pages all match one template take its region OCR path and blank pages
+# are skipped
+PAGE_CLASSIFIER = getenv("PAGE_CLASSIFIER", "false").lower() == "true"
+# Render resolution for template region OCR, small boxed text needs more than
+# the whole-page default of 200
+TEMPLATE_OCR_DPI = int(getenv("TEMPLATE_OCR_DPI", "300"))
+# Read the line of business checkboxes on ACORD 125 pages of documents that are
+# not filled fillable PDFs. Each such document is classified and its matching
+# pages rendered once more, so this costs a render pass per document
+CHECKBOX_LINES_OF_BUSINESS = (
+    getenv("CHECKBOX_LINES_OF_BUSINESS", "false").lower() == "true"
+)
+# Share of a template checkbox's interior that must be inked to read as checked
+CHECKBOX_FILL_RATIO = float(getenv("CHECKBOX_FILL_RATIO", "0.1"))
+TEXT_MIN_CHARS = int(getenv("TEXT_MIN_CHARS", "50"))
+TEXT_MAX_GARBAGE_RATIO = float(getenv("TEXT_MAX_GARBAGE_RATIO", "0.1"))
+TEXT_MIN_WORD_RATIO = float(getenv("TEXT_MIN_WORD_RATIO", "0.5"))
+# Server processes (gunicorn workers) on this host; each starts its own
+# extraction engine, so the CPUs are shared between them by default
+WEB_CONCURRENCY = int(getenv("WEB_CONCURRENCY", "1"))
+EXTRACTION_WORKERS = int(
+    getenv("EXTRACTION_WORKERS", str(max(1, OCR_WORKERS // WEB_CONCURRENCY)))
+)
+# Recycle each extraction worker after this many tasks, 0 keeps workers forever
+EXTRACTION_MAX_TASKS_PER_CHILD = int(getenv("EXTRACTION_MAX_TASKS_PER_CHILD", "100"))
+# Extraction requests admitted at once (running or queued) before the API
+# answers 503, and the Retry-After seconds it suggests
+EXTRACTION_QUEUE_DEPTH = int(
+    getenv("EXTRACTION_QUEUE_DEPTH", str(2 * EXTRACTION_WORKERS))
+)
+EXTRACTION_RETRY_AFTER = int(getenv("EXTRACTION_RETRY_AFTER", "5"))
+# Batch documents extracted at once across all jobs
+JOBS_PARALLELISM = int(getenv("JOBS_PARALLELISM", str(EXTRACTION_WORKERS)))
+# Model behind PDFExtractor.pass_to_llm, "identity" is the local stand-in that
+# returns records unchanged. Records from concurrent extractions are batched
+# up to LLM_MAX_BATCH_SIZE, waiting at most LLM_MAX_WAIT_MS for a batch to fill
+LLM_MODEL = getenv("LLM_MODEL", "identity")
+LLM_MAX_BATCH_SIZE = int(getenv("LLM_MAX_BATCH_SIZE", "8"))
+LLM_MAX_WAIT_MS = float(getenv("LLM_MAX_WAIT_MS", "10"))
 MODULE_PATH = Path(__file__).parent
 APP_ROOT = MODULE_PATH.parent
 PROJECT_PATH = APP_ROOT.parent
@@ -32,6 +97,58 @@ if not TEMPLATE_PATH.exists():
 (DATASET_STORE_PATH := STORE_PATH / "datasets").mkdir(exist_ok=True, parents=True)
 (OUTPUT_STORE_PATH := STORE_PATH / "outputs").mkdir(exist_ok=True, parents=True)
 
+EXTRACTION_CACHE_PATH = OUTPUT_STORE_PATH / "extraction_cache"
+EXTRACTION_CACHE_ENTRIES = int(getenv("EXTRACTION_CACHE_ENTRIES", "256"))
+EXTRACTION_CACHE_DISK_BYTES = int(
+    getenv("EXTRACTION_CACHE_DISK_BYTES", str(512 * 2**20))
+)
+# Rendered page rasters reused across OCR passes, 0 bytes disables the cache
+RASTER_CACHE_PATH = OUTPUT_STORE_PATH / "raster_cache"
+RASTER_CACHE_BYTES = int(getenv("RASTER_CACHE_BYTES", str(2 * 2**30)))
+JOBS_STORE_PATH = OUTPUT_STORE_PATH / "jobs"
+JOBS_DATABASE_URL = getenv(
+    "JOBS_DATABASE_URL", f"sqlite:///{OUTPUT_STORE_PATH}/jobs.db"
+)
+# Most documents in one batch job, counting the PDFs inside uploaded zips
+JOBS_MAX_FILES = int(getenv("JOBS_MAX_FILES", "10000"))
+# Most bytes the PDFs in one uploaded zip may uncompress to, so a small
+# archive cannot fill the disk
+JOBS_MAX_UNPACKED_BYTES = int(getenv("JOBS_MAX_UNPACKED_BYTES", str(2 * 2**30)))
+# A running batch document is leased to the process extracting it, which
+# renews the lease while it works; documents whose lease is older than this
+# many seconds are taken over by the next process that resumes the job
+JOBS_LEASE_SECONDS = float(getenv("JOBS_LEASE_SECONDS", "60"))
+
+# Extraction runs are logged to MLflow by a background thread: up to
+# TRACKING_QUEUE_SIZE runs wait in memory and are sent every
+# TRACKING_FLUSH_SECONDS or TRACKING_BATCH_SIZE runs. While the server fails,
+# runs are spooled to disk and replayed after TRACKING_RETRY_SECONDS
+TRACKING_SPOOL_PATH = OUTPUT_STORE_PATH / "tracking_spool"
+TRACKING_QUEUE_SIZE = int(getenv("TRACKING_QUEUE_SIZE", "1000"))
+TRACKING_BATCH_SIZE = int(getenv("TRACKING_BATCH_SIZE", "50"))
+TRACKING_FLUSH_SECONDS = float(getenv("TRACKING_FLUSH_SECONDS", "5"))
+TRACKING_RETRY_SECONDS = float(getenv("TRACKING_RETRY_SECONDS", "30"))
+# Share of extraction runs logged at all, and what happens to a run when the
+# queue is full: "spool" writes it to disk, "drop" discards it
+TRACKING_SAMPLE_RATE = float(getenv("TRACKING_SAMPLE_RATE", "1.0"))
+TRACKING_OVERFLOW = getenv("TRACKING_OVERFLOW", "spool")
+
+# Evaluation runs append each finished document to a checkpoint under
+# EVALUATION_PATH so an interrupted run resumes where it stopped
+EVALUATION_PATH = OUTPUT_STORE_PATH / "evaluation"
+
+# Synthetic ACORD corpora are generated in shards of CORPUS_SHARD_SIZE
+# documents; CORPUS_SCANNED_RATIO of them are rasterized at CORPUS_SCAN_DPI
+# with noise and up to CORPUS_MAX_SKEW degrees of skew to look scanned
+CORPUS_PATH = DATASET_STORE_PATH / "corpus"
+CORPUS_SHARD_SIZE = int(getenv("CORPUS_SHARD_SIZE", "1000"))
+CORPUS_SCANNED_RATIO = float(getenv("CORPUS_SCANNED_RATIO", "0.0"))
+CORPUS_SCAN_DPI = int(getenv("CORPUS_SCAN_DPI", "150"))
+CORPUS_MAX_SKEW = float(getenv("CORPUS_MAX_SKEW", "1.5"))
+
+# Seconds before a cached extraction expires, 0 keeps entries until evicted
+EXTRACTION_CACHE_TTL = float(getenv("EXTRACTION_CACHE_TTL", str(7 * 24 * 60 * 60)))
+
 # Declare no protected namespaces so that "model" can be used as a field name
 config = ConfigDict(protected_namespaces=())
 
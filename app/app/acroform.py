@@ -0,0 +1,356 @@
+"""Fast path for fillable ACORD PDFs
+
+Fillable forms carry their answers as AcroForm field values, so they can be
+read straight into the ``Application`` dataclass tree without layout text
+extraction or OCR. Only ACORD 125 field names are mapped, so other fillable
+forms (e.g. the ACORD 127 or 137) are left to text extraction and OCR.
+"""
+
+from pathlib import Path
+from re import compile, sub
+
+from pdfminer.pdftypes import resolve1
+from pdfminer.psparser import PSLiteral
+from pdfminer.utils import decode_text
+from pdfplumber import open as open_pdf
+
+from app.__init__ import getLogger
+from app.data_model import (
+    Address,
+    Agency,
+    Application,
+    BusinessInfo,
+    ContactInfo,
+    Coverage,
+    InsuredInfo,
+    PolicyInfo,
+)
+
+logger = getLogger(__name__)
+
+# Trailing XFA-style array index on ACORD field names, e.g. "..._A[0]"
+INDEX_PATTERN = compile(r"\[\d+\]$")
+UNCHECKED = ("", "Off", "0", "No", "false")
+
+# (line of business, indicator field, premium field) on the ACORD 125
+LINES_OF_BUSINESS = (
+    (
+        "Boiler & Machinery",
+        "Policy_LineOfBusiness_BoilerAndMachineryIndicator_A",
+        "BoilerAndMachineryLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Business Auto",
+        "Policy_LineOfBusiness_BusinessAutoIndicator_A",
+        "CommercialVehicleLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Business Owners",
+        "Policy_LineOfBusiness_BusinessOwnersIndicator_A",
+        "BusinessOwnersLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Commercial General Liability",
+        "Policy_LineOfBusiness_CommercialGeneralLiability_A",
+        "GeneralLiabilityLineOfBusiness_TotalPremiumAmount_A",
+    ),
+    (
+        "Commercial Inland Marine",
+        "Policy_LineOfBusiness_CommercialInlandMarineIndicator_A",
+        "CommercialInlandMarineLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Commercial Property",
+        "Policy_LineOfBusiness_CommercialProperty_A",
+        "CommercialPropertyLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Crime",
+        "Policy_LineOfBusiness_CrimeIndicator_A",
+        "CrimeLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Cyber and Privacy",
+        "Policy_LineOfBusiness_CyberAndPrivacy_A",
+        "CyberAndPrivacyLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Fiduciary Liability",
+        "Policy_LineOfBusiness_FiduciaryLiabilityIndicator_A",
+        "FiduciaryLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Garage and Dealers",
+        "Policy_LineOfBusiness_GarageAndDealersIndicator_A",
+        "GarageAndDealersLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Liquor Liability",
+        "Policy_LineOfBusiness_LiquorLiabilityIndicator_A",
+        "LiquorLiabilityLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Motor Carrier",
+        "Policy_LineOfBusiness_MotorCarrierIndicator_A",
+        "MotorCarrierLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Truckers",
+        "Policy_LineOfBusiness_TruckersIndicator_A",
+        "TruckersLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Umbrella",
+        "Policy_LineOfBusiness_UmbrellaIndicator_A",
+        "CommercialUmbrellaLineOfBusiness_PremiumAmount_A",
+    ),
+    (
+        "Yacht",
+        "Policy_LineOfBusiness_YachtIndicator_A",
+        "YachtLineOfBusiness_PremiumAmount_A",
+    ),
+)
+
+LEGAL_ENTITIES = (
+    ("Corporation", "CorporationIndicator"),
+    ("Individual", "IndividualIndicator"),
+    ("Joint Venture", "JointVentureIndicator"),
+    ("LLC", "LimitedLiabilityCorporationIndicator"),
+    ("Not For Profit", "NotForProfitIndicator"),
+    ("Partnership", "PartnershipIndicator"),
+    ("Subchapter S Corporation", "SubchapterSCorporationIndicator"),
+    ("Trust", "TrustIndicator"),
+)
+
+
+def field_value(value) -> str | None:
+    """decodes an AcroForm field value (text string or button state name)"""
+    value = resolve1(value)
+    if value is None:
+        return None
+    if isinstance(value, PSLiteral):
+        value = value.name
+    if isinstance(value, bytes):
+        value = decode_text(value)
+    if isinstance(value, list):
+        return ", ".join(filter(None, (field_value(item) for item in value)))
+    return str(value).strip()
+
+
+def walk_fields(fields: list, prefix: str = ""):
+    """yields (qualified name, value) for every terminal field in the tree"""
+    for ref in fields:
+        field = resolve1(ref)
+        name = field_value(field.get("T"))
+        qualified = f"{prefix}.{name}" if prefix and name else name or prefix
+        kids = resolve1(field.get("Kids")) or []
+        # Kids without a name are widget annotations of this field, not fields
+        if any("T" in resolve1(kid) for kid in kids):
+            yield from walk_fields(kids, qualified)
+        else:
+            yield qualified, field_value(field.get("V"))
+
+
+def read_form_fields(pdf_path: Path) -> dict[str, str]:
+    """returns the PDF's AcroForm values keyed by short field name
+
+    Short names drop the form/page hierarchy and array index, e.g.
+    ``F[0].P1[0].Producer_FullName_A[0]`` becomes ``Producer_FullName_A``.
+    When a name repeats across pages the first non-empty value wins. PDFs
+    without an AcroForm return an empty dict.
+    """
+    try:
+        with open_pdf(pdf_path) as pdf:
+            acroform = resolve1(pdf.doc.catalog.get("AcroForm"))
+            if not acroform:
+                return {}
+            fields = {}
+            for name, value in walk_fields(resolve1(acroform.get("Fields")) or []):
+                short_name = INDEX_PATTERN.sub("", name.rsplit(".", 1)[-1])
+                if value and not fields.get(short_name):
+                    fields[short_name] = value
+                else:
+                    fields.setdefault(short_name, value)
+            return fields
+    except FileNotFoundError as e:
+        raise RuntimeError(f"PDF file not found: {pdf_path}\n{e}") from e
+    except Exception as e:
+        raise RuntimeError(f"Error reading form fields from {pdf_path}\n{e}") from e
+
+
+def read_form_widgets(pdf_path: Path) -> dict[str, tuple[int, tuple]]:
+    """returns the page number and ``(x0, top, x1, bottom)`` box, in PDF points
+    from the top-left corner, of the first widget of every named field"""
+    widgets = {}
+    with open_pdf(pdf_path) as pdf:
+        for page in pdf.pages:
+            for annot in page.annots:
+                if not annot["title"]:
+                    continue
+                short_name = INDEX_PATTERN.sub("", annot["title"])
+                box = (annot["x0"], annot["top"], annot["x1"], annot["bottom"])
+                widgets.setdefault(short_name, (page.page_number, box))
+    return widgets
+
+
+def is_acord_125(fields: dict[str, str]) -> bool:
+    """whether the form has the ACORD 125 line of business boxes, which the
+    other ACORD forms lack"""
+    return any(indicator in fields for _, indicator, _ in LINES_OF_BUSINESS)
+
+
+def has_values(record) -> bool:
+    """whether any leaf of a nested record dict is filled in"""
+    if isinstance(record, dict):
+        return any(has_values(value) for value in record.values())
+    if isinstance(record, list):
+        return any(has_values(value) for value in record)
+    return record not in (None, "")
+
+
+def checked(fields: dict[str, str], name: str) -> bool:
+    return (fields.get(name) or "") not in UNCHECKED
+
+
+def to_number(value: str | None) -> float | None:
+    """parses amounts such as "$1,200.50"; returns None when not numeric"""
+    if not value:
+        return None
+    try:
+        return float(sub(r"[^\d.\-]", "", value))
+    except ValueError:
+        return None
+
+
+def to_int(value: str | None) -> int | None:
+    number = to_number(value)
+    return None if number is None else int(number)
+
+
+def address(fields: dict[str, str], prefix: str, suffix: str = "A") -> Address:
+    return Address(
+        line1=fields.get(f"{prefix}_LineOne_{suffix}"),
+        line2=fields.get(f"{prefix}_LineTwo_{suffix}"),
+        city=fields.get(f"{prefix}_CityName_{suffix}"),
+        state=fields.get(f"{prefix}_StateOrProvinceCode_{suffix}"),
+        zip_code=fields.get(f"{prefix}_PostalCode_{suffix}"),
+    )
+
+
+def insured(fields: dict[str, str], suffix: str) -> InsuredInfo:
+    return InsuredInfo(
+        name=fields.get(f"NamedInsured_FullName_{suffix}"),
+        mailing_address=address(fields, "NamedInsured_MailingAddress", suffix),
+        naics_code=fields.get(f"NamedInsured_NAICSCode_{suffix}"),
+        sic_code=fields.get(f"NamedInsured_SICCode_{suffix}"),
+        fein_or_ssn=fields.get(f"NamedInsured_TaxIdentifier_{suffix}"),
+        website_address=fields.get(f"NamedInsured_Primary_WebsiteAddress_{suffix}"),
+    )
+
+
+def lines_of_business(fields: dict[str, str]) -> dict[str, float | None]:
+    """returns each checked line of business with its premium amount"""
+    selected = {
+        name: to_number(fields.get(premium))
+        for name, indicator, premium in LINES_OF_BUSINESS
+        if checked(fields, indicator)
+    }
+    for suffix in "ABC":
+        if checked(fields, f"Policy_LineOfBusiness_OtherIndicator_{suffix}"):
+            name = fields.get(
+                f"Policy_LineOfBusiness_OtherLineOfBusinessDescription_{suffix}"
+            )
+            selected[name or "Other"] = to_number(
+                fields.get(f"Policy_SectionAttached_OtherPremiumAmount_{suffix}")
+            )
+    return selected
+
+
+def entity_type(fields: dict[str, str]) -> str | None:
+    for name, indicator in LEGAL_ENTITIES:
+        if checked(fields, f"NamedInsured_LegalEntity_{indicator}_A"):
+            return name
+    if checked(fields, "NamedInsured_LegalEntity_OtherIndicator_A"):
+        return fields.get("NamedInsured_LegalEntity_OtherDescription_A") or "Other"
+    return None
+
+
+def fields_to_application(fields: dict[str, str]) -> Application:
+    """maps ACORD 125 AcroForm values onto the Application dataclass tree"""
+    producer_address = address(fields, "Producer_MailingAddress")
+    phone_number = fields.get("Producer_ContactPerson_PhoneNumber_A")
+    premiums = lines_of_business(fields)
+    return Application(
+        agency=Agency(
+            agency_name=fields.get("Producer_FullName_A"),
+            agency_code=fields.get("Insurer_ProducerIdentifier_A"),
+            contact_info=ContactInfo(
+                full_name=fields.get("Producer_ContactPerson_FullName_A"),
+                first_name=None,
+                last_name=None,
+                phone_number=phone_number,
+                phone_type="Work" if phone_number else None,
+                fax_number=fields.get("Producer_FaxNumber_A"),
+                email=fields.get("Producer_ContactPerson_EmailAddress_A"),
+                mailing_address=producer_address,
+                physical_address=producer_address,
+            ),
+            address=producer_address,
+            customer_id=fields.get("Producer_CustomerIdentifier_A"),
+        ),
+        first_named_insured=insured(fields, "A"),
+        additional_insureds=[
+            insured(fields, suffix)
+            for suffix in "BCD"
+            if fields.get(f"NamedInsured_FullName_{suffix}")
+        ],
+        policy_info=PolicyInfo(
+            proposed_eff_date=fields.get("Policy_EffectiveDate_A"),
+            proposed_exp_date=fields.get("Policy_ExpirationDate_A"),
+            lines_of_business=list(premiums),
+            premium_details=premiums,
+        ),
+        business_info=BusinessInfo(
+            entity_type=entity_type(fields),
+            number_of_members=to_int(
+                fields.get("NamedInsured_LegalEntity_MemberManagerCount_A")
+            ),
+            description_of_operations=fields.get(
+                "CommercialPolicy_OperationsDescription_A"
+            )
+            or fields.get("BuildingOccupancy_OperationsDescription_A"),
+            business_started_date=fields.get("NamedInsured_BusinessStartDate_A"),
+            annual_revenue=to_number(
+                fields.get("CommercialStructure_AnnualRevenueAmount_A")
+            ),
+            no_of_employees_fulltime=to_int(
+                fields.get("BusinessInformation_FullTimeEmployeeCount_A")
+            ),
+            no_of_employees_parttime=to_int(
+                fields.get("BusinessInformation_PartTimeEmployeeCount_A")
+            ),
+        ),
+        coverages=[
+            Coverage(line_of_business=name, coverage_code=None, premium=premium)
+            for name, premium in premiums.items()
+        ],
+    )
+
+
+def extract_form_data(pdf_path: Path) -> dict | None:
+    """returns the Application read from a filled fillable ACORD 125 as a dict,
+    or None when the PDF has no AcroForm, is another form, none of the mapped
+    fields is filled or it cannot be parsed, so the caller falls back to text
+    extraction"""
+    try:
+        fields = read_form_fields(pdf_path)
+    except RuntimeError as e:
+        logger.warning(f"Skipping AcroForm fast path: {e}")
+        return None
+    if not is_acord_125(fields):
+        return None
+    application = fields_to_application(fields).to_dict()
+    if not has_values(application):
+        return None
+    logger.info(f"Read {len(fields)} ACORD 125 AcroForm fields from {pdf_path}")
+    return application
@@ -0,0 +1,306 @@
+"""Pluggable text extraction backends with a cost-based router
+
+A backend turns a whole PDF into text. For each document the router reads
+cheap signals with pdfium (page count, whether there is a text layer, the
+producer and the file size) and picks the backend expected to finish first,
+from the seconds per page it has measured on similar documents or, until it
+has, from the backend's prior. A small share of documents goes to another
+backend instead, so a backend with a wrong prior is measured and corrected
+rather than never tried. ``TEXT_BACKEND`` pins a single backend instead.
+"""
+
+from collections.abc import Callable, Collection
+from math import ceil
+from pathlib import Path
+from random import Random
+from re import compile
+from threading import Lock
+from time import perf_counter
+
+from pypdfium2 import PdfDocument
+
+from app.__init__ import (
+    TEXT_BACKEND,
+    TEXT_BACKEND_EXPLORE_RATE,
+    TEXT_MIN_CHARS,
+    getLogger,
+)
+from app.data_model import DocumentSignals
+from app.engine import ExtractionEngine
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+# Weight of the newest measurement in the moving average of seconds per page
+LATENCY_ALPHA = 0.2
+# Measurements of a document profile needed before it overrides the average
+# over all documents
+MIN_PROFILE_SAMPLES = 3
+# Leading pages checked for a text layer when reading signals
+SIGNAL_SAMPLE_PAGES = 3
+# Documents above this many bytes per page are mostly images, such as scans
+HEAVY_PAGE_BYTES = 200 * 2**10
+PRODUCER_PATTERN = compile(r"[a-z]+")
+
+
+def extract_pdfium_data(pdf_path: Path, skip_pages: Collection[int] = ()) -> str:
+    """extracts text from PDF file using pdfium, leaving out ``skip_pages``"""
+    logger.info(f"Extracting text from PDF using pdfium: {pdf_path}")
+    try:
+        pdf = PdfDocument(str(pdf_path))
+    except FileNotFoundError as e:
+        raise RuntimeError(f"PDF file not found: {pdf_path}\n{e}") from e
+    except Exception as e:
+        raise RuntimeError(f"Error reading PDF file: {pdf_path}\n{e}") from e
+    try:
+        texts = []
+        for index in range(len(pdf)):
+            if index + 1 in skip_pages:
+                continue
+            page = pdf[index]
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+            textpage.close()
+            page.close()
+        return "\n".join(text for text in texts if text)
+    except Exception as e:
+        raise RuntimeError(f"Error in PDF extraction from {pdf_path}\n{e}") from e
+    finally:
+        pdf.close()
+
+
+def read_signals(
+    pdf_path: Path,
+    sample_pages: int = SIGNAL_SAMPLE_PAGES,
+    min_chars: int = TEXT_MIN_CHARS,
+) -> DocumentSignals:
+    """reads the routing signals of a PDF without extracting the whole document
+
+    The text layer counts as present when the first ``sample_pages`` pages
+    average at least ``min_chars`` characters.
+    """
+    try:
+        pdf = PdfDocument(str(pdf_path))
+    except FileNotFoundError as e:
+        raise RuntimeError(f"PDF file not found: {pdf_path}\n{e}") from e
+    except Exception as e:
+        raise RuntimeError(f"Error reading PDF file: {pdf_path}\n{e}") from e
+    try:
+        page_count = len(pdf)
+        producer = pdf.get_metadata_value("Producer")
+        sampled = min(page_count, sample_pages)
+        text_chars = 0
+        for index in range(sampled):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            text_chars += textpage.count_chars()
+            textpage.close()
+            page.close()
+    finally:
+        pdf.close()
+    return DocumentSignals(
+        page_count=page_count,
+        file_size=Path(pdf_path).stat().st_size,
+        producer=producer,
+        text_chars=text_chars,
+        has_text_layer=sampled > 0 and text_chars >= min_chars * sampled,
+    )
+
+
+def document_profile(signals: DocumentSignals) -> str:
+    """groups documents that extract at similar speed: same producing software
+    and both image-heavy or both not"""
+    match = PRODUCER_PATTERN.search(signals.producer.lower())
+    producer = match.group() if match else "unknown"
+    weight = "heavy" if signals.bytes_per_page > HEAVY_PAGE_BYTES else "light"
+    return f"{producer}/{weight}"
+
+
+class TextBackend:
+    """A whole-document text extractor and the throughput measured for it
+
+    ``func`` takes the PDF path and the 1-indexed pages to leave out as
+    ``skip_pages``, plus the extraction engine as ``engine`` when the backend
+    is ``sharded`` across its workers. ``seconds_per_page`` is the
+    expected cost until the backend has been measured. Backends that need a
+    text layer are skipped for documents without one.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., str],
+        seconds_per_page: float,
+        needs_text_layer: bool = True,
+        sharded: bool = False,
+    ):
+        self.name = name
+        self.func = func
+        self.prior = seconds_per_page
+        self.needs_text_layer = needs_text_layer
+        self.sharded = sharded
+        self.documents = 0
+        self.pages = 0
+        self.seconds = 0.0
+        # Moving average of seconds per page and sample count, by profile,
+        # with "" covering every document
+        self._latency: dict[str, tuple[float, int]] = {}
+        self._lock = Lock()
+
+    def rounds(self, page_count: int, workers: int = 1) -> int:
+        """pages each worker handles in turn, which is what wall time scales with"""
+        return ceil(page_count / workers) if self.sharded else page_count
+
+    def extract(
+        self,
+        pdf_path: Path,
+        page_count: int,
+        profile: str = "",
+        engine: ExtractionEngine | None = None,
+        skip_pages: Collection[int] = (),
+    ) -> str:
+        """extracts the document and records how long it took"""
+        start = perf_counter()
+        if self.sharded:
+            text = self.func(pdf_path, skip_pages=skip_pages, engine=engine)
+        else:
+            text = self.func(pdf_path, skip_pages=skip_pages)
+        workers = engine.processes if engine is not None else 1
+        self.record(page_count, perf_counter() - start, profile, workers)
+        return text
+
+    def record(
+        self, page_count: int, seconds: float, profile: str = "", workers: int = 1
+    ):
+        seconds_per_page = seconds / max(self.rounds(page_count, workers), 1)
+        with self._lock:
+            self.documents += 1
+            self.pages += page_count
+            self.seconds += seconds
+            for key in {"", profile}:
+                average, samples = self._latency.get(key, (seconds_per_page, 0))
+                average += LATENCY_ALPHA * (seconds_per_page - average)
+                self._latency[key] = (average, samples + 1)
+
+    def seconds_per_page(self, profile: str = "") -> float:
+        """the measured seconds per page for the profile, falling back to the
+        average over all documents and then to the prior"""
+        with self._lock:
+            average, samples = self._latency.get(profile, (0.0, 0))
+            if samples >= MIN_PROFILE_SAMPLES:
+                return average
+            average, samples = self._latency.get("", (0.0, 0))
+            return average if samples else self.prior
+
+    def estimate(self, signals: DocumentSignals, workers: int = 1) -> float:
+        """expected seconds to extract a document"""
+        seconds_per_page = self.seconds_per_page(document_profile(signals))
+        return seconds_per_page * self.rounds(signals.page_count, workers)
+
+    def throughput(self) -> dict:
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "pages": self.pages,
+                "seconds": round(self.seconds, 3),
+                "pages_per_second": (
+                    round(self.pages / self.seconds, 3) if self.seconds else None
+                ),
+            }
+
+
+_backends: dict[str, TextBackend] = {}
+
+
+def register_backend(backend: TextBackend):
+    """makes a backend available to routers, replacing any with the same name"""
+    _backends[backend.name] = backend
+
+
+register_backend(TextBackend("pdfium", extract_pdfium_data, seconds_per_page=0.01))
+
+
+class BackendRouter:
+    """Picks the text backend expected to extract each document fastest
+
+    ``pinned`` names a backend to use for every document, "auto" routes by
+    cost. Without ``backends`` the router uses every registered backend. A
+    share ``explore_rate`` of auto-routed documents goes to a random other
+    backend of the same kind as the cheapest, which keeps its latency measured.
+    Text layer documents are never explored with OCR, which is far slower and
+    reads different text.
+    """
+
+    def __init__(
+        self,
+        backends: list[TextBackend] | None = None,
+        pinned: str = TEXT_BACKEND,
+        explore_rate: float = TEXT_BACKEND_EXPLORE_RATE,
+        seed: int | None = None,
+    ):
+        if backends is None:
+            self.backends = _backends
+        else:
+            self.backends = {backend.name: backend for backend in backends}
+        self.pinned = None if pinned == "auto" else pinned
+        self.explore_rate = explore_rate
+        self._random = Random(seed)
+
+    def choose(self, signals: DocumentSignals, workers: int = 1) -> TextBackend:
+        if self.pinned is not None:
+            if self.pinned not in self.backends:
+                raise ValueError(f"Unknown text backend: {self.pinned}")
+            return self.backends[self.pinned]
+        candidates = [
+            backend
+            for backend in self.backends.values()
+            if signals.has_text_layer or not backend.needs_text_layer
+        ]
+        if not candidates:
+            raise RuntimeError("No text backend can read a PDF without a text layer")
+        best = min(candidates, key=lambda backend: backend.estimate(signals, workers))
+        others = [
+            backend
+            for backend in candidates
+            if backend is not best and backend.needs_text_layer == best.needs_text_layer
+        ]
+        if others and self._random.random() < self.explore_rate:
+            backend = self._random.choice(others)
+            logger.info(f"Exploring text backend {backend.name} instead of {best.name}")
+            return backend
+        return best
+
+    def extract(
+        self,
+        pdf_path: Path,
+        engine: ExtractionEngine | None = None,
+        skip_pages: Collection[int] = (),
+    ) -> str:
+        """extracts a document, less ``skip_pages``, with the backend chosen for it"""
+        signals = read_signals(pdf_path)
+        page_count = sum(
+            page_number not in skip_pages
+            for page_number in range(1, signals.page_count + 1)
+        )
+        workers = engine.processes if engine is not None else 1
+        backend = self.choose(signals, workers)
+        logger.info(
+            f"Routing {pdf_path} to {backend.name}: {signals.page_count} pages, "
+            f"text layer {signals.has_text_layer}, producer {signals.producer!r}, "
+            f"{signals.file_size} bytes"
+        )
+        text = backend.extract(
+            pdf_path, page_count, document_profile(signals), engine, skip_pages
+        )
+        logger.info(f"Text backend {backend.name} throughput: {backend.throughput()}")
+        return text
+
+    def stats(self) -> dict:
+        """throughput of every backend in this process"""
+        return {name: backend.throughput() for name, backend in self.backends.items()}
+
+
+@process_wide
+def get_router() -> BackendRouter:
+    """returns the process-wide backend router, created on first use"""
+    return BackendRouter()
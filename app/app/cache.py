@@ -0,0 +1,323 @@
+"""Content-addressed caches for extraction results and rendered pages
+
+Keys combine a hash of the PDF bytes with a hash of the extractor version and
+configuration, so re-submitted documents are served from memory or from disk
+under ``store/outputs`` without re-running pdfplumber or tesseract. Page
+rasters are cached the same way, so later OCR passes skip rendering.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import sha256
+from json import dumps, loads
+from os import getpid, replace
+from pathlib import Path
+from threading import Lock
+from time import time
+
+from numpy import asarray, load, save
+from PIL import Image
+
+from app.__init__ import (
+    EXTRACTION_CACHE_DISK_BYTES,
+    EXTRACTION_CACHE_ENTRIES,
+    EXTRACTION_CACHE_PATH,
+    EXTRACTION_CACHE_TTL,
+    RASTER_CACHE_BYTES,
+    RASTER_CACHE_PATH,
+    getLogger,
+)
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    """returns the hex digest identifying a document's content"""
+    return sha256(data).hexdigest()
+
+
+def digest_cache_key(digest: str, version: str, config: dict) -> str:
+    """returns a key for an already-hashed document, extractor version and config"""
+    config_hash = sha256(dumps([version, config], sort_keys=True).encode())
+    return f"{digest}-{config_hash.hexdigest()[:16]}"
+
+
+def make_cache_key(data: bytes, version: str, config: dict) -> str:
+    """returns a key unique to the document content, extractor version and config"""
+    return digest_cache_key(content_hash(data), version, config)
+
+
+def hash_file(path: Path) -> str:
+    """returns the SHA-256 hex digest of a file, read in chunks"""
+    digest = sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(2**20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    return hash_file(path)
+
+
+def file_digest(path: Path) -> str | None:
+    """returns the content hash of a file, hashing it again only when its size
+    or mtime changes, or None when it does not exist"""
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return _file_digest(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+class ExtractionCache:
+    """Two-tier LRU cache: an in-memory tier in front of an on-disk JSON tier
+
+    Entries expire after ``ttl`` seconds in both tiers. The memory tier holds
+    at most ``max_entries`` results and the disk tier at most ``max_bytes``;
+    the least recently used entries are evicted first. Both tiers keep values
+    serialized, so every hit returns a fresh copy that callers may mutate.
+    Disk entries are written atomically, and unreadable ones count as misses.
+    """
+
+    def __init__(
+        self,
+        path: Path = EXTRACTION_CACHE_PATH,
+        max_entries: int = EXTRACTION_CACHE_ENTRIES,
+        max_bytes: int = EXTRACTION_CACHE_DISK_BYTES,
+        ttl: float = EXTRACTION_CACHE_TTL,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(exist_ok=True, parents=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = Lock()
+        self._disk_bytes = sum(file.stat().st_size for file in self._files())
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def _files(self) -> list[Path]:
+        return list(self.path.glob("*/*.json"))
+
+    def _file(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl > 0 and time() - created > self.ttl
+
+    def _remember(self, key: str, created: float, data: str):
+        self._memory[key] = (created, data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _unlink(self, file: Path):
+        try:
+            size = file.stat().st_size
+            file.unlink()
+        except FileNotFoundError:
+            return
+        self._disk_bytes -= size
+
+    def _evict_disk(self):
+        if self._disk_bytes <= self.max_bytes:
+            return
+        # Reads touch the file, so the oldest mtime is the least recently used
+        for file in sorted(self._files(), key=lambda file: file.stat().st_mtime):
+            if self._disk_bytes <= self.max_bytes:
+                break
+            self._unlink(file)
+            self.counters["evictions"] += 1
+
+    def _read(self, file: Path) -> tuple[float, str] | None:
+        """returns a disk entry's creation time and serialized value, or None
+        when it is missing or unreadable, removing unreadable ones"""
+        try:
+            entry = loads(file.read_text())
+            return float(entry["created"]), dumps(entry["value"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Dropping unreadable cache entry {file}: {e}")
+            self._unlink(file)
+            return None
+
+    def get(self, key: str):
+        """returns the cached value for ``key`` or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                created, data = self._memory[key]
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return loads(data)
+                del self._memory[key]
+                self.counters["expirations"] += 1
+
+            file = self._file(key)
+            entry = self._read(file)
+            if entry is not None:
+                created, data = entry
+                if not self._expired(created):
+                    file.touch()
+                    self._remember(key, created, data)
+                    self.counters["disk_hits"] += 1
+                    return loads(data)
+                self._unlink(file)
+                self.counters["expirations"] += 1
+
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value):
+        """stores a JSON-serializable ``value`` in both tiers"""
+        created = time()
+        data = dumps(value)
+        payload = dumps({"created": created, "value": value})
+        with self._lock:
+            self._remember(key, created, data)
+            file = self._file(key)
+            file.parent.mkdir(exist_ok=True)
+            self._unlink(file)
+            temporary = file.with_suffix(f".{getpid()}.tmp")
+            temporary.write_text(payload)
+            replace(temporary, file)
+            self._disk_bytes += file.stat().st_size
+            self._evict_disk()
+
+    def invalidate(self, digest: str | None = None) -> int:
+        """drops every entry for a content hash (or key), or all entries when
+        ``digest`` is None, and returns the number of entries removed"""
+        with self._lock:
+            keys = [
+                key for key in self._memory if digest is None or key.startswith(digest)
+            ]
+            for key in keys:
+                del self._memory[key]
+            pattern = "*/*.json" if digest is None else f"{digest[:2]}/{digest}*.json"
+            files = list(self.path.glob(pattern))
+            for file in files:
+                self._unlink(file)
+        logger.info(f"Invalidated {len(files)} cached extraction results")
+        return max(len(keys), len(files))
+
+    def stats(self) -> dict:
+        """returns hit/miss counters and the current size of each tier"""
+        with self._lock:
+            lookups = sum(
+                self.counters[name] for name in ("memory_hits", "disk_hits", "misses")
+            )
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            return {
+                **self.counters,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+@process_wide
+def get_cache() -> ExtractionCache:
+    """returns the process-wide extraction cache, creating it on first use"""
+    return ExtractionCache()
+
+
+class RasterCache:
+    """Size-capped LRU disk cache of rendered pages as ``.npy`` arrays
+
+    Entries are keyed by (content hash, page number, DPI, colorspace) and are
+    memory-mapped on read, so a hit costs neither rendering nor decoding.
+    Files are written atomically, so worker processes can share the directory.
+    Each process tracks the bytes it has written and rescans the directory to
+    evict the least recently used rasters once it believes the cap is reached.
+    """
+
+    def __init__(
+        self, path: Path = RASTER_CACHE_PATH, max_bytes: int = RASTER_CACHE_BYTES
+    ):
+        self.path = Path(path)
+        self.path.mkdir(exist_ok=True, parents=True)
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._disk_bytes = sum(file.stat().st_size for file in self._files())
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _files(self) -> list[Path]:
+        return list(self.path.glob("*/*.npy"))
+
+    def _file(self, digest: str, page_number: int, dpi: int, colorspace: str) -> Path:
+        return self.path / digest[:2] / f"{digest}-{page_number}-{dpi}-{colorspace}.npy"
+
+    def _evict(self):
+        if self._disk_bytes <= self.max_bytes:
+            return
+        files = []
+        for file in self._files():
+            try:
+                files.append((file.stat(), file))
+            except FileNotFoundError:
+                continue
+        self._disk_bytes = sum(stat.st_size for stat, _ in files)
+        # Reads touch the file, so the oldest mtime is the least recently used
+        for stat, file in sorted(files, key=lambda entry: entry[0].st_mtime):
+            if self._disk_bytes <= self.max_bytes:
+                break
+            file.unlink(missing_ok=True)
+            self._disk_bytes -= stat.st_size
+            self.counters["evictions"] += 1
+
+    def get(
+        self, digest: str, page_number: int, dpi: int, colorspace: str = "L"
+    ) -> Image.Image | None:
+        """returns the cached page image or None on a miss"""
+        file = self._file(digest, page_number, dpi, colorspace)
+        try:
+            array = load(file, mmap_mode="r")
+            file.touch()
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+        with self._lock:
+            self.counters["hits"] += 1
+        return Image.fromarray(array, mode=colorspace)
+
+    def set(
+        self,
+        digest: str,
+        page_number: int,
+        dpi: int,
+        colorspace: str,
+        image: Image.Image,
+    ):
+        """stores a rendered page, converted to ``colorspace``"""
+        file = self._file(digest, page_number, dpi, colorspace)
+        file.parent.mkdir(exist_ok=True)
+        temporary = file.with_suffix(f".{getpid()}.tmp")
+        with open(temporary, "wb") as output:
+            save(output, asarray(image.convert(colorspace)))
+        replace(temporary, file)
+        with self._lock:
+            self._disk_bytes += file.stat().st_size
+            self._evict()
+
+    def stats(self) -> dict:
+        """returns hit/miss counters and the bytes this process accounts for"""
+        with self._lock:
+            return {**self.counters, "disk_bytes": self._disk_bytes}
+
+
+@process_wide
+def get_raster_cache() -> RasterCache | None:
+    """returns the process-wide raster cache, or None when it is disabled"""
+    return RasterCache() if RASTER_CACHE_BYTES > 0 else None
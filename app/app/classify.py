@@ -0,0 +1,214 @@
+"""Cheap page classifier that tags pages with known templates before extraction
+
+Each template page is fingerprinted once from a blank copy of the form: a
+64-bit difference hash of the ink in a small grayscale thumbnail and the set
+of label words in its text layer. Incoming pages are fingerprinted the same way with
+pdfium in a few milliseconds per page, then matched on their label words when
+they have a text layer and on their thumbnail hash when they do not.
+"""
+
+from dataclasses import dataclass
+from json import dumps, loads
+from pathlib import Path
+from re import compile
+from threading import Lock
+
+from numpy import asarray, packbits, uint8
+from PIL import Image
+from pypdfium2 import PdfDocument
+
+from app.__init__ import TEMPLATE_PATH, getLogger
+from app.data_model import PageClass
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+# Thumbnail scale relative to 72 dpi, about 120x160 pixels for a letter page
+THUMBNAIL_SCALE = 0.2
+# Pixels darker than this count as ink. Hashing ink coverage rather than
+# brightness keeps mostly-white form pages stable across renderers and scans
+INK_LEVEL = 240
+# The hash compares the ink in each of 8x8 cells with its right neighbour
+HASH_SIZE = 8
+# Share of a template page's label words a page must contain to match it;
+# filled-in values only add words, so this holds for completed forms
+MIN_TEXT_SCORE = 0.7
+# Pages with fewer label words than this are matched on their thumbnail
+MIN_TOKENS = 20
+# Differing hash bits allowed for a thumbnail match
+MAX_HASH_DISTANCE = 14
+# Thumbnails with no text and a pixel standard deviation below this are blank
+BLANK_CONTRAST = 2.0
+TOKEN_PATTERN = compile(r"[A-Z]{3,}")
+PAGES_SUFFIX = "_pages.json"
+
+
+@dataclass
+class PageFingerprint:
+    dhash: int
+    tokens: frozenset[str]
+    contrast: float = 0.0
+
+
+def difference_hash(thumbnail: Image.Image) -> int:
+    """hashes whether ink coverage rises or falls between neighbouring cells"""
+    ink = (asarray(thumbnail.convert("L")) < INK_LEVEL).astype(uint8) * 255
+    cells = Image.fromarray(ink).resize(
+        (HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX
+    )
+    pixels = asarray(cells)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(packbits(bits).tobytes(), "big")
+
+
+def text_tokens(text: str) -> frozenset[str]:
+    """the distinct words of three or more letters, which on a form are
+    mostly its printed labels"""
+    return frozenset(TOKEN_PATTERN.findall(text.upper()))
+
+
+def fingerprint_page(page) -> PageFingerprint:
+    """fingerprints a pdfium page from a thumbnail render and its text layer"""
+    bitmap = page.render(scale=THUMBNAIL_SCALE, grayscale=True, draw_annots=False)
+    thumbnail = bitmap.to_pil()
+    textpage = page.get_textpage()
+    text = textpage.get_text_range()
+    textpage.close()
+    return PageFingerprint(
+        difference_hash(thumbnail),
+        text_tokens(text),
+        float(asarray(thumbnail).std()),
+    )
+
+
+def fingerprint_pdf(pdf_path: Path) -> list[PageFingerprint]:
+    """fingerprints every page of a PDF, in page order"""
+    try:
+        pdf = PdfDocument(str(pdf_path))
+    except FileNotFoundError as e:
+        raise RuntimeError(f"PDF file not found: {pdf_path}\n{e}") from e
+    except Exception as e:
+        raise RuntimeError(f"Error reading PDF file: {pdf_path}\n{e}") from e
+    try:
+        fingerprints = []
+        for page in pdf:
+            fingerprints.append(fingerprint_page(page))
+            page.close()
+        return fingerprints
+    finally:
+        pdf.close()
+
+
+class PageClassifier:
+    """Template page fingerprints, loaded from ``*_pages.json`` files"""
+
+    def __init__(self, path: Path = TEMPLATE_PATH):
+        self.path = Path(path)
+        self._references: list[tuple[str, int, PageFingerprint]] = []
+        self._lock = Lock()
+        for pages_path in sorted(self.path.glob(f"*{PAGES_SUFFIX}")):
+            self._load(pages_path)
+
+    def _load(self, pages_path: Path):
+        data = loads(pages_path.read_text())
+        self._add(
+            data["name"],
+            {
+                page["page_number"]: PageFingerprint(
+                    int(page["dhash"], 16), frozenset(page["tokens"])
+                )
+                for page in data["pages"]
+            },
+        )
+
+    def _add(self, name: str, fingerprints: dict[int, PageFingerprint]):
+        with self._lock:
+            self._references = [
+                reference for reference in self._references if reference[0] != name
+            ] + [
+                (name, number, fingerprint)
+                for number, fingerprint in fingerprints.items()
+            ]
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return sorted({name for name, _, _ in self._references})
+
+    def add_form(self, name: str, pdf_path: Path, save: bool = False):
+        """fingerprints every page of a blank copy of the form as template
+        ``name`` and optionally writes them next to the template schemas"""
+        fingerprints = dict(enumerate(fingerprint_pdf(pdf_path), start=1))
+        self._add(name, fingerprints)
+        if save:
+            data = {
+                "name": name,
+                "pages": [
+                    {
+                        "page_number": number,
+                        "dhash": f"{fingerprint.dhash:016x}",
+                        "tokens": sorted(fingerprint.tokens),
+                    }
+                    for number, fingerprint in fingerprints.items()
+                ],
+            }
+            pages_path = self.path / f"{name}{PAGES_SUFFIX}"
+            pages_path.write_text(dumps(data, indent=2) + "\n")
+        logger.info(f"Fingerprinted {len(fingerprints)} pages of template {name}")
+
+    def classify(self, page_number: int, fingerprint: PageFingerprint) -> PageClass:
+        with self._lock:
+            references = list(self._references)
+        if len(fingerprint.tokens) >= MIN_TOKENS:
+            best, best_score = None, 0.0
+            for reference in references:
+                tokens = reference[2].tokens
+                score = len(tokens & fingerprint.tokens) / len(tokens) if tokens else 0
+                if score > best_score:
+                    best, best_score = reference, score
+            if best is not None and best_score >= MIN_TEXT_SCORE:
+                return PageClass(page_number, best[0], best[1], best_score, "text")
+            return PageClass(page_number, "unknown", None, best_score, "text")
+        if not fingerprint.tokens and fingerprint.contrast < BLANK_CONTRAST:
+            return PageClass(page_number, "blank", None, 1.0, "image")
+        best, best_distance = None, HASH_SIZE * HASH_SIZE
+        for reference in references:
+            distance = (reference[2].dhash ^ fingerprint.dhash).bit_count()
+            if distance < best_distance:
+                best, best_distance = reference, distance
+        score = 1 - best_distance / (HASH_SIZE * HASH_SIZE)
+        if best is not None and best_distance <= MAX_HASH_DISTANCE:
+            return PageClass(page_number, best[0], best[1], score, "image")
+        return PageClass(page_number, "unknown", None, score, "image")
+
+    def classify_pdf(self, pdf_path: Path) -> list[PageClass]:
+        """tags every page of a PDF with the template page it matches"""
+        fingerprints = fingerprint_pdf(pdf_path)
+        classes = [
+            self.classify(number, fingerprint)
+            for number, fingerprint in enumerate(fingerprints, start=1)
+        ]
+        logger.info(
+            f"Classified {pdf_path}: "
+            f"{[f'{page.template}:{page.template_page}' for page in classes]}"
+        )
+        return classes
+
+
+def document_template(classes: list[PageClass]) -> str | None:
+    """returns the template every non-blank page matched, if they all matched
+    the same one"""
+    names = {page.template for page in classes if page.template != "blank"}
+    if len(names) == 1 and "unknown" not in names:
+        return names.pop()
+    return None
+
+
+@process_wide
+def get_classifier() -> PageClassifier:
+    """returns the process-wide page classifier, loading it on first use"""
+    return PageClassifier()
+
+
+def classify_pdf(pdf_path: Path) -> list[PageClass]:
+    """tags every page of a PDF using the process-wide classifier"""
+    return get_classifier().classify_pdf(pdf_path)
@@ -0,0 +1,404 @@
+"""Sharded, parallel generation of synthetic ACORD 125 corpora
+
+Each document is a random ``Application`` rendered as a filled form PDF,
+next to its expected record as JSON. Records only hold what the form shows,
+so a perfect extraction matches its expected record field for field.
+Documents are generated in shards on engine workers. A shard's Faker and
+noise seeds derive from the corpus seed and the shard number alone, so any
+shard can be rebuilt identically on any machine. A shard writes its manifest
+file only once all of its documents are on disk. Generation therefore
+resumes by skipping shards whose manifest lists the documents they should
+hold, and machines split a corpus by taking every ``machines``-th shard.
+"""
+
+from argparse import ArgumentParser
+from dataclasses import asdict, replace
+from json import dumps, loads
+from pathlib import Path
+from random import Random
+from statistics import NormalDist
+
+from faker import Faker
+from numpy import asarray, clip, frombuffer, int16, uint8
+from numpy.random import SeedSequence, default_rng
+from PIL import Image
+from pypdfium2 import PdfDocument
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen.canvas import Canvas
+
+from app.__init__ import (
+    CORPUS_MAX_SKEW,
+    CORPUS_PATH,
+    CORPUS_SCAN_DPI,
+    CORPUS_SCANNED_RATIO,
+    CORPUS_SHARD_SIZE,
+    getLogger,
+)
+from app.acroform import LINES_OF_BUSINESS
+from app.data_model import Address, Application, CorpusShard, Coverage
+from app.engine import ExtractionEngine, get_engine, shutdown_engine
+
+logger = getLogger(__name__)
+
+CONFIG_FILE = "corpus.json"
+MANIFEST_DIR = "manifest"
+TITLE = "COMMERCIAL INSURANCE APPLICATION"
+# Lines printed as shaded section headings rather than filled rows
+SECTIONS = ("LINES OF BUSINESS", "NAME (", "DESCRIPTION OF PRIMARY OPERATIONS")
+MARGIN = 36
+ROW_HEIGHT = 16
+FONT_SIZE = 8
+# Standard deviation of the gray-level noise on scanned variants, applied by
+# mapping random bytes through the normal quantiles, which is much cheaper
+# than drawing normal samples per pixel
+SCAN_NOISE = 12.0
+NOISE_LEVELS = (
+    asarray([NormalDist(0, SCAN_NOISE).inv_cdf((k + 0.5) / 256) for k in range(256)])
+    .round()
+    .astype(int16)
+)
+
+
+def form_application(faker: Faker) -> Application:
+    """returns a random Application holding only what a filled ACORD 125
+    shows, typed as the form prints it
+
+    The agency and contact addresses and the contact's split name are not on
+    the form, the contact phone is the work number, and the lines of business
+    are ACORD lines, each with a premium and a coverage.
+    """
+    application = Application.rand(faker)
+    agency = application.agency
+    blank = Address(None, None, None, None, None)
+    contact = replace(
+        agency.contact_info,
+        first_name=None,
+        last_name=None,
+        phone_type="Work",
+        mailing_address=blank,
+        physical_address=blank,
+    )
+    names = faker.random_elements(
+        elements=[name for name, _, _ in LINES_OF_BUSINESS],
+        length=faker.random_int(min=1, max=3),
+        unique=True,
+    )
+    premiums = {name: float(faker.random_int(min=100, max=9999)) for name in names}
+    insureds = [
+        replace(
+            insured, naics_code=str(insured.naics_code), sic_code=str(insured.sic_code)
+        )
+        for insured in [
+            application.first_named_insured,
+            *application.additional_insureds,
+        ]
+    ]
+    policy = application.policy_info
+    business = application.business_info
+    return replace(
+        application,
+        agency=replace(
+            agency,
+            agency_code=str(agency.agency_code),
+            customer_id=str(agency.customer_id),
+            contact_info=contact,
+            address=blank,
+        ),
+        first_named_insured=insureds[0],
+        additional_insureds=insureds[1:],
+        policy_info=replace(
+            policy,
+            proposed_eff_date=str(policy.proposed_eff_date),
+            proposed_exp_date=str(policy.proposed_exp_date),
+            lines_of_business=list(premiums),
+            premium_details=premiums,
+        ),
+        business_info=replace(
+            business,
+            business_started_date=str(business.business_started_date),
+            annual_revenue=float(business.annual_revenue),
+        ),
+        coverages=[
+            Coverage(line_of_business=name, coverage_code=None, premium=premium)
+            for name, premium in premiums.items()
+        ],
+    )
+
+
+def render_text(application: Application) -> str:
+    """writes an application as labelled form text, the way a layout
+    extraction of a filled ACORD 125 reads"""
+    agency = application.agency
+    contact = agency.contact_info
+    policy = application.policy_info
+    business = application.business_info
+    lines = [
+        TITLE,
+        f"AGENCY {agency.agency_name} CARRIER Great Lakes Mutual NAIC CODE 12345",
+        f"CONTACT NAME: {contact.full_name}",
+        f"PHONE (A/C, No, Ext): {contact.phone_number} "
+        f"FAX (A/C, No): {contact.fax_number or ''}",
+        f"E-MAIL ADDRESS: {contact.email}",
+        f"CODE: {agency.agency_code} SUBCODE: AGENCY CUSTOMER ID: {agency.customer_id}",
+        f"PROPOSED EFF DATE {policy.proposed_eff_date} "
+        f"PROPOSED EXP DATE {policy.proposed_exp_date}",
+        "LINES OF BUSINESS",
+        " ".join(
+            f"{name.upper()} $ {policy.premium_details[name]:,.2f}"
+            for name in policy.lines_of_business
+            if name in policy.premium_details
+        ),
+    ]
+    for label, insured in [
+        ("First", application.first_named_insured),
+        *(("Other", insured) for insured in application.additional_insureds),
+    ]:
+        address = insured.mailing_address
+        lines += [
+            f"NAME ({label} Named Insured) AND MAILING ADDRESS (including ZIP+4)",
+            insured.name,
+            address.line1,
+            *([address.line2] if address.line2 else []),
+            f"{address.city}, {address.state} {address.zip_code}",
+            f"GL CODE SIC {insured.sic_code} NAICS {insured.naics_code} "
+            f"FEIN OR SOC SEC # {insured.fein_or_ssn}",
+            f"WEBSITE ADDRESS {insured.website_address or ''}",
+        ]
+    lines += [
+        f"ENTITY TYPE: {business.entity_type} "
+        f"NO. OF MEMBERS AND MANAGERS: {business.number_of_members or ''}",
+        "DESCRIPTION OF PRIMARY OPERATIONS",
+        business.description_of_operations,
+        f"DATE BUSINESS STARTED (MM/DD/YYYY) {business.business_started_date}",
+        f"ANNUAL REVENUES: $ {business.annual_revenue:,}",
+        f"# FULL TIME EMPL {business.no_of_employees_fulltime} "
+        f"# PART TIME EMPL {business.no_of_employees_parttime}",
+    ]
+    return "\n".join(lines)
+
+
+def render_form(application: Application, pdf_path: Path):
+    """draws an application as a ruled form, one boxed row per line of
+    ``render_text`` and shaded section headings, over as many pages as it
+    takes"""
+    width, height = letter
+    canvas = Canvas(str(pdf_path), pagesize=letter)
+    lines = render_text(application).splitlines()
+    top = height - MARGIN
+    for line in lines:
+        if top - ROW_HEIGHT < MARGIN:
+            canvas.showPage()
+            top = height - MARGIN
+        top -= ROW_HEIGHT
+        if line == TITLE:
+            canvas.setFont("Helvetica-Bold", FONT_SIZE + 4)
+            canvas.drawString(MARGIN, top + 4, "ACORD")
+            canvas.drawRightString(width - MARGIN, top + 4, line)
+            continue
+        heading = line.startswith(SECTIONS)
+        canvas.setFillGray(0.85 if heading else 1.0)
+        canvas.rect(MARGIN, top, width - 2 * MARGIN, ROW_HEIGHT, fill=1)
+        canvas.setFillGray(0.0)
+        canvas.setFont("Helvetica-Bold" if heading else "Helvetica", FONT_SIZE)
+        canvas.drawString(MARGIN + 4, top + 5, line)
+    canvas.save()
+
+
+def scan_pdf(pdf_path: Path, rng: Random, noise_seed: int, dpi: int = CORPUS_SCAN_DPI):
+    """replaces a PDF with a scan-like copy: every page rasterized to gray,
+    skewed by up to ``CORPUS_MAX_SKEW`` degrees and speckled with noise"""
+    noise = default_rng(noise_seed)
+    pdf = PdfDocument(str(pdf_path))
+    try:
+        pages = []
+        for page in pdf:
+            image = page.render(scale=dpi / 72, grayscale=True).to_pil().convert("L")
+            page.close()
+            image = image.rotate(
+                rng.uniform(-CORPUS_MAX_SKEW, CORPUS_MAX_SKEW),
+                resample=Image.Resampling.BILINEAR,
+                fillcolor=255,
+            )
+            speckle = frombuffer(noise.bytes(image.width * image.height), uint8)
+            pixels = NOISE_LEVELS[speckle.reshape(image.height, image.width)]
+            pixels += asarray(image)
+            pages.append(
+                Image.fromarray(clip(pixels, 0, 255, out=pixels).astype(uint8))
+            )
+    finally:
+        pdf.close()
+    pages[0].save(
+        pdf_path, "PDF", resolution=dpi, save_all=True, append_images=pages[1:]
+    )
+
+
+def shard_seed(seed: int, shard: int) -> int:
+    """derives the seed of one shard from the corpus seed"""
+    return int(SeedSequence([seed, shard]).generate_state(1)[0])
+
+
+def manifest_path(output_dir: Path, shard: int) -> Path:
+    return Path(output_dir) / MANIFEST_DIR / f"shard_{shard:05}.json"
+
+
+def generate_shard(
+    output_dir: str,
+    shard: int,
+    start: int,
+    count: int,
+    seed: int,
+    scanned_ratio: float = CORPUS_SCANNED_RATIO,
+) -> CorpusShard:
+    """writes documents ``start`` to ``start + count`` and their expected
+    JSON, then the shard's manifest file; runs on an engine worker"""
+    output_dir = Path(output_dir)
+    seed = shard_seed(seed, shard)
+    faker = Faker()
+    faker.seed_instance(seed)
+    rng = Random(seed)
+    directory = Path(f"shard_{shard:05}")
+    (output_dir / directory).mkdir(parents=True, exist_ok=True)
+    documents, scanned = [], []
+    for n in range(start, start + count):
+        application = form_application(faker)
+        pdf_path, json_path = (
+            directory / f"doc_{n:07}.pdf",
+            directory / f"doc_{n:07}.json",
+        )
+        render_form(application, output_dir / pdf_path)
+        (output_dir / json_path).write_text(dumps(application.to_dict()))
+        scanned.append(rng.random() < scanned_ratio)
+        if scanned[-1]:
+            scan_pdf(output_dir / pdf_path, rng, rng.getrandbits(64))
+        documents.append((str(pdf_path), str(json_path)))
+    entry = CorpusShard(shard, seed, documents, scanned)
+    manifest = manifest_path(output_dir, shard)
+    manifest.parent.mkdir(exist_ok=True)
+    # written whole, then renamed, so a manifest file always means a finished shard
+    partial = manifest.with_suffix(".tmp")
+    partial.write_text(dumps(asdict(entry)))
+    partial.replace(manifest)
+    return entry
+
+
+def read_manifest(output_dir: Path = CORPUS_PATH) -> list[CorpusShard]:
+    """returns the finished shards of a corpus, in shard order"""
+    shards = []
+    for path in sorted((Path(output_dir) / MANIFEST_DIR).glob("shard_*.json")):
+        shard = CorpusShard(**loads(path.read_text()))
+        shard.documents = [tuple(pair) for pair in shard.documents]
+        shards.append(shard)
+    return shards
+
+
+def corpus_pairs(output_dir: Path = CORPUS_PATH) -> list[tuple[str, str]]:
+    """returns the absolute ``(pdf_path, json_path)`` pairs of every finished
+    shard"""
+    output_dir = Path(output_dir)
+    return [
+        (str(output_dir / pdf_path), str(output_dir / json_path))
+        for shard in read_manifest(output_dir)
+        for pdf_path, json_path in shard.documents
+    ]
+
+
+def check_config(output_dir: Path, config: dict):
+    """records the corpus settings on first use and refuses to extend a
+    corpus generated with different ones, which would mix two corpora"""
+    path = output_dir / CONFIG_FILE
+    if not path.exists():
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path.write_text(dumps(config))
+        return
+    existing = loads(path.read_text())
+    if existing != config:
+        raise ValueError(
+            f"Corpus at {output_dir} was generated with {existing}, not {config}"
+        )
+
+
+def generate_corpus(
+    documents: int,
+    output_dir: Path = CORPUS_PATH,
+    seed: int = 0,
+    shard_size: int = CORPUS_SHARD_SIZE,
+    scanned_ratio: float = CORPUS_SCANNED_RATIO,
+    machine: int = 0,
+    machines: int = 1,
+    engine: ExtractionEngine | None = None,
+) -> list[tuple[str, str]]:
+    """generates this machine's missing shards of a corpus on the engine's
+    workers and returns the pairs of every finished shard
+
+    Shard ``n`` belongs to machine ``n % machines``. Shards whose manifest
+    lists as many documents as they should hold are skipped, so an interrupted
+    run picks up where it stopped, while a different ``documents`` regenerates
+    the shard it ends in and drops the manifests of shards past it.
+    """
+    if shard_size < 1:
+        raise ValueError(f"Corpus shards need at least 1 document: {shard_size}")
+    if not 0 <= machine < machines:
+        raise ValueError(f"Machine {machine} is not one of {machines}")
+    output_dir = Path(output_dir)
+    check_config(
+        output_dir,
+        {"seed": seed, "shard_size": shard_size, "scanned_ratio": scanned_ratio},
+    )
+    counts = {
+        shard: min(shard_size, documents - start)
+        for shard, start in enumerate(range(0, documents, shard_size))
+    }
+    finished = set()
+    for shard in read_manifest(output_dir):
+        if shard.shard not in counts:
+            manifest_path(output_dir, shard.shard).unlink(missing_ok=True)
+        elif len(shard.documents) == counts[shard.shard]:
+            finished.add(shard.shard)
+    shards = [
+        (shard, shard * shard_size, count)
+        for shard, count in counts.items()
+        if shard % machines == machine and shard not in finished
+    ]
+    logger.info(
+        f"Generating {len(shards)} corpus shards in {output_dir} "
+        f"({len(finished)} already finished)"
+    )
+    if shards:
+        engine = engine or get_engine()
+        results = engine.imap_unordered(
+            generate_shard,
+            *zip(
+                *(
+                    (str(output_dir), shard, start, count, seed, scanned_ratio)
+                    for shard, start, count in shards
+                ),
+                strict=True,
+            ),
+        )
+        for n, shard in enumerate(results, 1):
+            logger.info(f"Finished corpus shard {shard.shard} ({n}/{len(shards)})")
+    return corpus_pairs(output_dir)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--output-dir", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=CORPUS_SHARD_SIZE)
+    parser.add_argument("--scanned-ratio", type=float, default=CORPUS_SCANNED_RATIO)
+    parser.add_argument("--machine", type=int, default=0)
+    parser.add_argument("--machines", type=int, default=1)
+    FLAGS = parser.parse_args()
+
+    pairs = generate_corpus(
+        FLAGS.documents,
+        FLAGS.output_dir,
+        FLAGS.seed,
+        FLAGS.shard_size,
+        FLAGS.scanned_ratio,
+        FLAGS.machine,
+        FLAGS.machines,
+    )
+    shutdown_engine()
+    logger.info(f"Corpus at {FLAGS.output_dir} has {len(pairs)} documents")
@@ -1,7 +1,8 @@
 from base64 import b64decode
-from dataclasses import asdict, dataclass
+from collections import Counter
+from dataclasses import asdict, dataclass, field
 from json import loads
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from faker import Faker
 from pydantic import BaseModel, HttpUrl, field_validator
@@ -118,6 +119,190 @@ class PredictionPayload(BaseModel):
     scaler_destination: str = "./"
 
 
+@dataclass
+class TextLayerScore:
+    """Cheap quality signals for a page's embedded text layer."""
+
+    char_count: int
+    garbage_ratio: float
+    word_ratio: float
+
+    def is_usable(
+        self, min_chars: int, max_garbage_ratio: float, min_word_ratio: float
+    ) -> bool:
+        """Whether the text layer is good enough to skip OCR for the page."""
+        return (
+            self.char_count >= min_chars
+            and self.garbage_ratio <= max_garbage_ratio
+            and self.word_ratio >= min_word_ratio
+        )
+
+
+@dataclass
+class OCRStats:
+    """Which DPI tiers a page was OCRed at and how confident the result is."""
+
+    dpi: int
+    tiers: List[int]
+    confidence: Optional[float]
+    words: int
+    escalated_lines: int = 0
+
+
+@dataclass
+class PageResult:
+    """Text extracted from a single (1-indexed) page and the path that produced it."""
+
+    page_number: int
+    text: str
+    method: str
+    score: Optional[TextLayerScore] = None
+    ocr: Optional[OCRStats] = None
+
+
+@dataclass
+class ExtractionReport:
+    """Per-page extraction results for a document, in page order."""
+
+    pages: List[PageResult] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return " ".join(page.text for page in self.pages if page.text)
+
+    @property
+    def method_counts(self) -> dict:
+        """Number of pages that took each extraction path."""
+        return dict(Counter(page.method for page in self.pages))
+
+    def to_dict(self):
+        """Convert the report to a dictionary, including the path counts."""
+        return {**asdict(self), "method_counts": self.method_counts}
+
+
+@dataclass
+class DocumentSignals:
+    """Cheap facts about a PDF used to pick a text extraction backend."""
+
+    page_count: int
+    file_size: int
+    producer: str
+    text_chars: int
+    has_text_layer: bool
+
+    @property
+    def bytes_per_page(self) -> float:
+        return self.file_size / self.page_count if self.page_count else 0.0
+
+
+@dataclass
+class BatchStats:
+    """One batched LLM model call.
+
+    ``occupancy`` is ``size`` over the maximum batch size, ``wait`` is how
+    long the first record waited for the batch to close and ``latency`` is
+    how long the model call took, both in seconds.
+    """
+
+    size: int
+    occupancy: float
+    wait: float
+    latency: float
+
+
+@dataclass
+class TrackedRun:
+    """Params, metrics and JSON artifacts of one run waiting to be logged to
+    MLflow; ``timestamp`` is when it happened, in milliseconds."""
+
+    params: dict
+    metrics: dict
+    artifacts: dict
+    timestamp: int
+
+
+@dataclass
+class EvaluationResult:
+    """How one document of an evaluation set was extracted.
+
+    ``accuracy`` is the share of the expected record's leaf fields that were
+    extracted with the same value; ``error`` is set, and ``accuracy`` is 0,
+    when extraction raised. ``seconds`` covers extraction and scoring;
+    ``expected`` and ``extracted`` hold each record's non-empty fields by path
+    (see ``app.scoring.record_fields``).
+    """
+
+    pdf_path: str
+    json_path: str
+    seconds: float
+    accuracy: float = 0.0
+    fields: int = 0
+    matched: int = 0
+    valid: bool = False
+    error: Optional[str] = None
+    expected: Optional[dict] = None
+    extracted: Optional[dict] = None
+
+
+@dataclass
+class CorpusShard:
+    """Manifest entry of one generated corpus shard.
+
+    ``documents`` are ``(pdf_path, json_path)`` pairs relative to the corpus
+    directory and ``scanned`` says which PDFs are rasterized, scan-like
+    variants without a text layer. ``seed`` is the shard's derived seed.
+    """
+
+    shard: int
+    seed: int
+    documents: List[Tuple[str, str]]
+    scanned: List[bool]
+
+
+@dataclass
+class PageClass:
+    """Which known template page a (1-indexed) page looks like.
+
+    ``template`` is a template name, "blank" or "unknown"; ``score`` is how
+    closely the page matched (1.0 is identical) and ``method`` says whether
+    its text layer ("text") or its thumbnail ("image") decided.
+    """
+
+    page_number: int
+    template: str
+    template_page: Optional[int] = None
+    score: float = 0.0
+    method: Optional[str] = None
+
+
+@dataclass
+class FieldRegion:
+    """Where a template field sits on a form: a (1-indexed) page and an
+    ``(x0, top, x1, bottom)`` box in PDF points from the top-left corner.
+
+    Checkbox regions carry the ``value`` their field takes when checked.
+    """
+
+    path: str
+    page_number: int
+    bbox: Tuple[float, float, float, float]
+    source: Optional[str] = None
+    value: Optional[str] = None
+
+
+@dataclass
+class FieldError:
+    """One schema violation in an extracted record.
+
+    ``path`` locates the field, e.g. ``additional_insureds[0].name``, and
+    ``keyword`` is the schema keyword it broke ("type", "required", ...).
+    """
+
+    path: str
+    keyword: str
+    message: str
+
+
 @dataclass
 class OutputModelBase:
     """Base class for all data models."""
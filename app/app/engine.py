@@ -0,0 +1,158 @@
+"""Long-lived, pre-warmed process pool shared by all extraction requests"""
+
+from asyncio import get_running_loop
+from collections.abc import Callable, Iterable, Iterator
+from importlib import import_module
+from multiprocessing import get_context
+from multiprocessing.pool import AsyncResult
+from threading import Lock
+from typing import Self
+
+from app.__init__ import (
+    EXTRACTION_MAX_TASKS_PER_CHILD,
+    EXTRACTION_WORKERS,
+    MP_START_METHOD,
+    getLogger,
+)
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+WARM_MODULES = ("pdfplumber", "pdf2image", "pytesseract", "app.extract")
+
+
+def apply_task(task: tuple[Callable, tuple]):
+    """runs a ``(func, args)`` task, for pool methods that pass one argument"""
+    func, args = task
+    return func(*args)
+
+
+def warm_worker():
+    """imports the heavy extraction dependencies once per worker process"""
+    for name in WARM_MODULES:
+        import_module(name)
+
+
+class ExtractionEngine:
+    """Process pool created once at startup and reused for every document
+
+    Workers import pdfplumber, pdf2image and pytesseract when they start, so
+    tasks only pay for extraction work. Workers are replaced after
+    ``max_tasks_per_child`` tasks to bound memory growth in long-lived
+    processes.
+    """
+
+    def __init__(
+        self,
+        processes: int = EXTRACTION_WORKERS,
+        max_tasks_per_child: int = EXTRACTION_MAX_TASKS_PER_CHILD,
+        start_method: str = MP_START_METHOD,
+    ):
+        if processes < 1:
+            raise ValueError(f"Extraction engine needs at least 1 process: {processes}")
+        self.processes = processes
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self.start_method = start_method
+        self._pool = None
+        self._lock = Lock()
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self) -> Self:
+        """starts the worker processes if they are not already running"""
+        with self._lock:
+            if self._pool is None:
+                logger.info(
+                    f"Starting extraction engine with {self.processes} workers "
+                    f"({self.start_method}, recycle after {self.max_tasks_per_child})"
+                )
+                context = get_context(self.start_method)
+                if self.start_method == "forkserver":
+                    context.set_forkserver_preload(list(WARM_MODULES))
+                self._pool = context.Pool(
+                    processes=self.processes,
+                    initializer=warm_worker,
+                    maxtasksperchild=self.max_tasks_per_child,
+                )
+        return self
+
+    def submit(self, func: Callable, *args) -> AsyncResult:
+        """schedules ``func(*args)`` on a worker and returns its async result"""
+        if self._pool is None:
+            raise RuntimeError("Extraction engine is not running")
+        return self._pool.apply_async(func, args)
+
+    async def run(self, func: Callable, *args):
+        """awaits ``func(*args)`` on a worker without tying up a thread"""
+        if self._pool is None:
+            raise RuntimeError("Extraction engine is not running")
+        loop = get_running_loop()
+        future = loop.create_future()
+
+        def resolve(setter, value):
+            if not future.done():
+                setter(value)
+
+        self._pool.apply_async(
+            func,
+            args,
+            callback=lambda result: loop.call_soon_threadsafe(
+                resolve, future.set_result, result
+            ),
+            error_callback=lambda error: loop.call_soon_threadsafe(
+                resolve, future.set_exception, error
+            ),
+        )
+        return await future
+
+    def map(self, func: Callable, *iterables: Iterable) -> list:
+        """runs ``func`` over zipped ``iterables``, which must be the same length,
+        and returns results in order"""
+        if self._pool is None:
+            raise RuntimeError("Extraction engine is not running")
+        return self._pool.starmap(func, zip(*iterables, strict=True))
+
+    def imap_unordered(
+        self, func: Callable, *iterables: Iterable, chunksize: int = 1
+    ) -> Iterator:
+        """runs ``func`` over zipped ``iterables``, which must be the same length,
+        and yields results as they finish, in any order, without holding them
+        all in memory"""
+        if self._pool is None:
+            raise RuntimeError("Extraction engine is not running")
+        tasks = ((func, args) for args in zip(*iterables, strict=True))
+        return self._pool.imap_unordered(apply_task, tasks, chunksize)
+
+    def shutdown(self, wait: bool = True):
+        """stops the workers, letting queued tasks finish unless ``wait`` is False"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        logger.info(f"Shutting down extraction engine (wait={wait})")
+        if wait:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+
+@process_wide
+def get_engine() -> ExtractionEngine:
+    """returns the process-wide extraction engine, starting it on first use"""
+    return ExtractionEngine().start()
+
+
+def shutdown_engine(wait: bool = True):
+    """shuts down the process-wide extraction engine if it was started"""
+    engine = get_engine.clear()
+    if engine is not None:
+        engine.shutdown(wait=wait)
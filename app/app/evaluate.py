@@ -0,0 +1,243 @@
+"""Parallel evaluation of extraction against expected records
+
+Each document is extracted and scored on an engine worker, so the parent
+only streams finished results into an aggregator: no document waits on
+another and none of them opens an MLflow run. Every finished result is
+appended to a JSON lines checkpoint; a rerun with the same checkpoint feeds
+the results already in it to the aggregator and only extracts the rest.
+Aggregated metrics and the per-document table are logged once, as a single
+run, when the whole set is done, along with per-field scores of the
+extracted records (see ``app.scoring``).
+"""
+
+from collections.abc import Iterable
+from contextlib import nullcontext
+from dataclasses import asdict, fields
+from itertools import repeat
+from json import JSONDecodeError, dumps, loads
+from pathlib import Path
+from time import perf_counter
+
+from pandas import DataFrame
+
+from app.__init__ import EXTRACTION_MODE, getLogger
+from app.data_model import EvaluationResult
+from app.engine import ExtractionEngine, get_engine
+from app.extract import extract_document, structure_text
+from app.scoring import (
+    flatten_record,
+    latency_percentiles,
+    record_fields,
+    score_records,
+)
+from app.tracking import TrackingSink, get_sink
+from app.validation import validate_record
+
+logger = getLogger(__name__)
+
+# Finished documents between progress log lines
+PROGRESS_EVERY = 100
+# Per-document table columns; the records themselves are scored per field
+TABLE_COLUMNS = tuple(
+    field.name
+    for field in fields(EvaluationResult)
+    if field.name not in ("expected", "extracted")
+)
+
+
+def evaluate_document(
+    pdf_path: str, json_path: str, mode: str = EXTRACTION_MODE
+) -> EvaluationResult:
+    """extracts one document and scores it against its expected JSON record;
+    runs on an engine worker, so it extracts without a nested pool"""
+    start = perf_counter()
+    try:
+        extracted = structure_text(
+            extract_document(Path(pdf_path), use_multiprocessing=False, mode=mode)
+        )
+        expected = loads(Path(json_path).read_text())
+        paths = flatten_record(expected)
+        truth, found = record_fields(expected), record_fields(extracted)
+        matched = sum(truth.get(path) == found.get(path) for path in paths)
+        valid = not validate_record(extracted)
+    except Exception as e:
+        logger.warning(f"Evaluation of {pdf_path} failed: {e}")
+        return EvaluationResult(
+            str(pdf_path),
+            str(json_path),
+            perf_counter() - start,
+            error=f"{type(e).__name__}: {e}",
+        )
+    return EvaluationResult(
+        str(pdf_path),
+        str(json_path),
+        perf_counter() - start,
+        accuracy=matched / len(paths) if paths else 0.0,
+        fields=len(paths),
+        matched=matched,
+        valid=valid,
+        expected=truth,
+        extracted=found,
+    )
+
+
+class EvaluationAggregator:
+    """Running totals over streamed evaluation results
+
+    Failed documents count towards ``accuracy`` as 0. Throughput only counts
+    documents evaluated by this run, not ones resumed from a checkpoint.
+    """
+
+    def __init__(self):
+        self.results: list[EvaluationResult] = []
+        self.resumed = 0
+        self.failed = 0
+        self.invalid = 0
+        self.matched = 0
+        self.fields = 0
+        self._accuracy = 0.0
+        self._started = perf_counter()
+
+    def add(self, result: EvaluationResult, resumed: bool = False):
+        self.results.append(result)
+        self.resumed += resumed
+        self.failed += result.error is not None
+        self.invalid += result.error is None and not result.valid
+        self.matched += result.matched
+        self.fields += result.fields
+        self._accuracy += result.accuracy
+
+    def summary(self) -> dict:
+        """returns the aggregated metrics of every result added so far"""
+        documents = len(self.results)
+        if not documents:
+            return {"documents": 0}
+        seconds = [result.seconds for result in self.results]
+        return {
+            "documents": documents,
+            "resumed": self.resumed,
+            "failed": self.failed,
+            "invalid": self.invalid,
+            "accuracy": self._accuracy / documents,
+            "field_accuracy": self.matched / self.fields if self.fields else 0.0,
+            "seconds_mean": sum(seconds) / documents,
+            **latency_percentiles(seconds),
+            "docs_per_second": (documents - self.resumed)
+            / (perf_counter() - self._started),
+        }
+
+    def field_scores(self) -> tuple[DataFrame, dict]:
+        """scores the fields of every extracted record against the expected
+        ones, returning per-field scores and overall metrics"""
+        scored = [result for result in self.results if result.extracted is not None]
+        return score_records(
+            (result.expected for result in scored),
+            (result.extracted for result in scored),
+        )
+
+    def table(self) -> dict:
+        """returns one row per document in MLflow's ``columns``/``data``
+        table layout"""
+        return {
+            "columns": list(TABLE_COLUMNS),
+            "data": [
+                [getattr(result, column) for column in TABLE_COLUMNS]
+                for result in self.results
+            ],
+        }
+
+
+def read_checkpoint(path: Path) -> dict[str, EvaluationResult]:
+    """returns the results in a checkpoint by PDF path; a line cut short by
+    an interrupted run is skipped and its document evaluated again"""
+    if not path.exists():
+        return {}
+    results = {}
+    for line in path.read_text().splitlines():
+        if not line:
+            continue
+        try:
+            result = EvaluationResult(**loads(line))
+        except (JSONDecodeError, TypeError):
+            logger.warning(f"Skipping unreadable checkpoint line in {path}")
+            continue
+        results[result.pdf_path] = result
+    return results
+
+
+def evaluate(
+    data_pairs: Iterable[tuple[str, str]],
+    phase: str = "evaluation",
+    mode: str = EXTRACTION_MODE,
+    engine: ExtractionEngine | None = None,
+    checkpoint: Path | None = None,
+    resume: bool = True,
+    sink: TrackingSink | None = None,
+    chunksize: int = 1,
+) -> dict:
+    """evaluates ``(pdf_path, json_path)`` pairs on the engine's workers,
+    logs the aggregated metrics and per-document table as one run and
+    returns the metrics
+
+    With a ``checkpoint`` path, finished documents are appended to it as they
+    arrive and, if ``resume`` is set, documents already in it are not
+    extracted again.
+    """
+    aggregator = EvaluationAggregator()
+    done = {}
+    if checkpoint is not None:
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        if resume:
+            done = read_checkpoint(checkpoint)
+            if checkpoint.exists() and not checkpoint.read_bytes().endswith(b"\n"):
+                # end the line cut short so the next result starts its own
+                with open(checkpoint, "a") as file:
+                    file.write("\n")
+        else:
+            checkpoint.unlink(missing_ok=True)
+    pending = []
+    for pdf_path, json_path in data_pairs:
+        if str(pdf_path) in done:
+            aggregator.add(done[str(pdf_path)], resumed=True)
+        else:
+            pending.append((str(pdf_path), str(json_path)))
+    logger.info(
+        f"Evaluating {len(pending)} {phase} documents "
+        f"({aggregator.resumed} resumed from checkpoint)"
+    )
+
+    engine = engine or get_engine()
+    pdf_paths = [pdf_path for pdf_path, _ in pending]
+    json_paths = [json_path for _, json_path in pending]
+    with open(checkpoint, "a") if checkpoint is not None else nullcontext() as file:
+        results = engine.imap_unordered(
+            evaluate_document,
+            pdf_paths,
+            json_paths,
+            repeat(mode, len(pending)),
+            chunksize=chunksize,
+        )
+        for n, result in enumerate(results, 1):
+            aggregator.add(result)
+            if file is not None:
+                file.write(dumps(asdict(result)) + "\n")
+                file.flush()
+            if n % PROGRESS_EVERY == 0:
+                logger.info(f"Evaluated {n}/{len(pending)} {phase} documents")
+
+    field_scores, scores = aggregator.field_scores()
+    summary = {**aggregator.summary(), **scores}
+    logger.info(f"Evaluation of {phase} documents: {summary}")
+    sink = sink or get_sink()
+    sink.log_run(
+        params={"phase": phase, "mode": mode},
+        metrics=summary,
+        artifacts={
+            f"{phase}_documents.json": aggregator.table(),
+            f"{phase}_fields.json": field_scores.reset_index(names="field").to_dict(
+                orient="split", index=False
+            ),
+        },
+    )
+    sink.flush()
+    return summary
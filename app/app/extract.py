@@ -1,27 +1,84 @@
 from base64 import b64decode
-from io import BytesIO
-from json import dumps
-from multiprocessing import Pool, set_start_method
+from collections.abc import Callable, Collection, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import current_process, get_context
+from multiprocessing.connection import Connection
+from os import killpg, setpgrp
 from pathlib import Path
+from queue import Full, Queue
+from re import compile
+from signal import SIGKILL
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from threading import Event, Thread
+from time import perf_counter
 
-from mlflow import log_artifact, log_param, set_experiment, set_tracking_uri, start_run
-from pdf2image import convert_from_bytes, convert_from_path
+from mlflow import set_experiment, set_tracking_uri
+from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_path
 from pdfplumber import open as open_pdf
-from pytesseract import image_to_string
+from PIL import Image
+from pytesseract import Output, image_to_data, image_to_string
 from requests import get
 
-from app.__init__ import getLogger
+from app.__init__ import (
+    ACROFORM_FAST_PATH,
+    CHECKBOX_FILL_RATIO,
+    CHECKBOX_LINES_OF_BUSINESS,
+    EXTRACTION_MODE,
+    MP_START_METHOD,
+    OCR_DPI_TIERS,
+    OCR_MIN_CONFIDENCE,
+    OCR_PREFETCH_PAGES,
+    OCR_TIERED,
+    OCR_WORKERS,
+    PAGE_CLASSIFIER,
+    TEXT_BACKEND,
+    TEXT_MAX_GARBAGE_RATIO,
+    TEXT_MIN_CHARS,
+    TEXT_MIN_WORD_RATIO,
+    getLogger,
+)
+from app.acroform import extract_form_data
+from app.backends import TextBackend, get_router, register_backend
+from app.cache import (
+    ExtractionCache,
+    file_digest,
+    get_cache,
+    get_raster_cache,
+    make_cache_key,
+)
+from app.data_model import ExtractionReport, OCRStats, PageResult, TextLayerScore
+from app.engine import ExtractionEngine, get_engine
+from app.llm import MicroBatcher, get_batcher
+from app.parse import DEFAULT_TEMPLATE, parse_application
+from app.render import OCR_DPI, render_page
+from app.singleflight import SingleFlight, get_single_flight
+from app.templates import CA_APP, read_lines_of_business
+from app.tracking import TrackingSink, get_sink
+from app.validation import APPLICATION, validate_record
 
 logger = getLogger(__name__)
 
+# Bump when extraction output changes so cached results are not reused
+EXTRACTOR_VERSION = "0.3.0"
 
-def extract_pdf_data(pdf_path: Path) -> str:
-    """extracts text from PDF file using pdfplumber"""
+# pdfminer emits "(cid:123)" for glyphs it cannot map to unicode
+CID_PATTERN = compile(r"\(cid:\d+\)")
+WORD_PATTERN = compile(r"\w\w")
+
+
+def extract_pdf_data(pdf_path: Path, skip_pages: Collection[int] = ()) -> str:
+    """extracts text from PDF file using pdfplumber, leaving out ``skip_pages``"""
     logger.info(f"Extracting text from PDF: {pdf_path}")
     try:
         with open_pdf(pdf_path) as pdf:
-            text = [page.extract_text() for page in pdf.pages if page.extract_text()]
-            return "".join(text)
+            # Layout analysis is expensive, so run it once per page
+            texts = (
+                page.extract_text()
+                for page in pdf.pages
+                if page.page_number not in skip_pages
+            )
+            return "".join(text for text in texts if text)
     except FileNotFoundError as e:
         raise RuntimeError(f"PDF file not found: {pdf_path}\n{e}") from e
     except IOError as e:
@@ -30,20 +87,534 @@ def extract_pdf_data(pdf_path: Path) -> str:
         raise RuntimeError(f"Error in PDF extraction from {pdf_path}\n{e}") from e
 
 
-def extract_ocr_data(pdf_path: Path) -> str:
-    """extracts text from PDF file using OCR"""
+def extract_image_data(image_path: Path) -> str:
+    """extracts text from an image file using OCR"""
+    logger.info(f"Extracting text from image using OCR: {image_path}")
+    try:
+        with Image.open(image_path) as image:
+            return image_to_string(image)
+    except IOError as e:
+        raise RuntimeError(f"Error reading image file: {e}") from e
+    except Exception as e:
+        raise RuntimeError(f"Error in OCR process: {e}") from e
+
+
+def get_page_count(pdf_path: Path) -> int:
+    """returns the number of pages in a PDF file using poppler's pdfinfo"""
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def ocr_page(pdf_path: Path, page_number: int) -> str:
+    """renders a single (1-indexed) page of a PDF file and extracts its text
+    using OCR"""
+    if OCR_TIERED:
+        return ocr_page_tiered(pdf_path, page_number)[0]
+    return image_to_string(render_page(pdf_path, page_number))
+
+
+def ocr_page_stats(pdf_path: Path, page_number: int) -> tuple[str, OCRStats | None]:
+    """OCRs a page like ``ocr_page``, also returning tier stats in tiered mode"""
+    if OCR_TIERED:
+        return ocr_page_tiered(pdf_path, page_number)
+    return ocr_page(pdf_path, page_number), None
+
+
+def ocr_lines(image: Image.Image, dpi: int, config: str = "") -> list[dict]:
+    """OCRs an image into lines with their mean word confidence and their
+    ``(left, top, right, bottom)`` box in PDF points"""
+    data = image_to_data(image, config=config, output_type=Output.DICT)
+    lines = {}
+    for index, word in enumerate(data["text"]):
+        confidence = float(data["conf"][index])
+        if confidence < 0 or not word.strip():
+            continue
+        key = (
+            data["block_num"][index],
+            data["par_num"][index],
+            data["line_num"][index],
+        )
+        line = lines.setdefault(key, {"words": [], "confidences": [], "boxes": []})
+        line["words"].append(word)
+        line["confidences"].append(confidence)
+        left, top = data["left"][index], data["top"][index]
+        right, bottom = left + data["width"][index], top + data["height"][index]
+        line["boxes"].append((left, top, right, bottom))
+    scale = 72 / dpi
+    return [
+        {
+            "text": " ".join(line["words"]),
+            "confidence": sum(line["confidences"]) / len(line["confidences"]),
+            "words": len(line["words"]),
+            "bbox": (
+                min(box[0] for box in line["boxes"]) * scale,
+                min(box[1] for box in line["boxes"]) * scale,
+                max(box[2] for box in line["boxes"]) * scale,
+                max(box[3] for box in line["boxes"]) * scale,
+            ),
+        }
+        for line in lines.values()
+    ]
+
+
+def reocr_line(image: Image.Image, dpi: int, line: dict, padding: float = 2) -> dict:
+    """re-OCRs one line's box (padded by ``padding`` points) on a page rendered
+    at ``dpi``, keeping whichever reading is more confident"""
+    scale = dpi / 72
+    left, top, right, bottom = line["bbox"]
+    crop = image.crop(
+        (
+            max(round((left - padding) * scale), 0),
+            max(round((top - padding) * scale), 0),
+            min(round((right + padding) * scale), image.width),
+            min(round((bottom + padding) * scale), image.height),
+        )
+    )
+    # Page segmentation mode 7: treat the crop as a single text line
+    parts = ocr_lines(crop, dpi, "--psm 7")
+    words = sum(part["words"] for part in parts)
+    if not words:
+        return line
+    confidence = sum(part["confidence"] * part["words"] for part in parts) / words
+    if confidence <= line["confidence"]:
+        return line
+    return {
+        "text": " ".join(part["text"] for part in parts),
+        "confidence": confidence,
+        "words": words,
+        "bbox": line["bbox"],
+    }
+
+
+def ocr_page_tiered(
+    pdf_path: Path,
+    page_number: int,
+    tiers: list[int] = OCR_DPI_TIERS,
+    min_confidence: float = OCR_MIN_CONFIDENCE,
+) -> tuple[str, OCRStats]:
+    """OCRs a (1-indexed) page at the lowest DPI tier, then re-renders at each
+    higher tier only while some lines stay below ``min_confidence``
+
+    Only the low-confidence lines are re-OCRed at the higher tier, unless most
+    of the page is low-confidence (or nothing was read), in which case the
+    whole page is.
+    """
+    tiers = sorted(tiers)
+    lines = ocr_lines(render_page(pdf_path, page_number, tiers[0]), tiers[0])
+    used, escalated = [tiers[0]], 0
+    for dpi in tiers[1:]:
+        low = [
+            index
+            for index, line in enumerate(lines)
+            if line["confidence"] < min_confidence
+        ]
+        if lines and not low:
+            break
+        image = render_page(pdf_path, page_number, dpi)
+        used.append(dpi)
+        if not lines or len(low) > len(lines) / 2:
+            escalated += len(lines)
+            lines = ocr_lines(image, dpi)
+        else:
+            escalated += len(low)
+            for index in low:
+                lines[index] = reocr_line(image, dpi, lines[index])
+
+    words = sum(line["words"] for line in lines)
+    confidence = (
+        sum(line["confidence"] * line["words"] for line in lines) / words
+        if words
+        else None
+    )
+    stats = OCRStats(used[-1], used, confidence, words, escalated)
+    logger.debug(f"Tiered OCR of page {page_number} of {pdf_path}: {stats}")
+    return "\n".join(line["text"] for line in lines), stats
+
+
+def render_pages(
+    pdf_path: Path,
+    page_numbers: Iterable[int],
+    output_folder: str,
+    rendered: Queue,
+    stop: Event,
+):
+    """renders pages one at a time to image files, queueing ``(page_number,
+    paths)`` and finally ``None`` (or the exception that stopped it)
+
+    With the raster cache enabled pages come from ``render_page`` instead and
+    are queued as memory-mapped images rather than paths.
+    """
+    cached = get_raster_cache() is not None and file_digest(pdf_path) is not None
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                rendered.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    try:
+        for page_number in page_numbers:
+            if cached:
+                paths = [render_page(pdf_path, page_number)]
+            else:
+                paths = convert_from_path(
+                    pdf_path,
+                    dpi=OCR_DPI,
+                    first_page=page_number,
+                    last_page=page_number,
+                    output_folder=output_folder,
+                    paths_only=True,
+                    grayscale=True,
+                )
+            if not put((page_number, paths)):
+                return
+    except Exception as e:
+        put(e)
+    else:
+        put(None)
+
+
+def ocr_pages_pipelined(
+    pdf_path: Path, page_numbers: Iterable[int], prefetch: int = OCR_PREFETCH_PAGES
+) -> Iterator[str]:
+    """yields the OCR text of each (1-indexed) page, in order
+
+    A background thread renders pages to files while the previous page is
+    OCRed; both poppler and tesseract run as subprocesses, so they overlap.
+    At most ``prefetch`` rendered pages wait in the queue and each file is
+    deleted once OCRed, so memory does not grow with page count.
+    """
+    with TemporaryDirectory() as output_folder:
+        rendered = Queue(maxsize=max(prefetch, 1))
+        stop = Event()
+        renderer = Thread(
+            target=render_pages,
+            args=(pdf_path, page_numbers, output_folder, rendered, stop),
+            daemon=True,
+        )
+        renderer.start()
+        try:
+            while (item := rendered.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                _, paths = item
+                try:
+                    yield " ".join(image_to_string(path) for path in paths)
+                finally:
+                    for path in paths:
+                        if isinstance(path, str):
+                            Path(path).unlink(missing_ok=True)
+        finally:
+            stop.set()
+            renderer.join()
+
+
+def ocr_pages(
+    pdf_path: Path,
+    page_numbers: list[int],
+    workers: int = OCR_WORKERS,
+    engine: ExtractionEngine | None = None,
+    func: Callable | None = None,
+) -> list:
+    """OCRs the given (1-indexed) pages and returns their text in the same order
+
+    Each worker renders and OCRs only its own page, so no images cross process
+    boundaries. Pages go to ``engine`` when one is given, otherwise to a pool
+    of ``workers`` processes for this call. ``func`` replaces ``ocr_page``,
+    e.g. ``ocr_page_stats`` to also get tier stats.
+    """
+    page_numbers = list(page_numbers)
+    ocr_page_func = func or ocr_page
+    if engine is not None:
+        logger.info(f"Sharding OCR of {len(page_numbers)} pages across engine")
+        return engine.map(
+            ocr_page_func, repeat(pdf_path, len(page_numbers)), page_numbers
+        )
+    workers = min(workers, len(page_numbers))
+    if workers <= 1 or current_process().daemon:
+        return [ocr_page_func(pdf_path, page_number) for page_number in page_numbers]
+    logger.info(f"Sharding OCR of {len(page_numbers)} pages across {workers} workers")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=get_context(MP_START_METHOD)
+    ) as executor:
+        return list(executor.map(ocr_page_func, repeat(pdf_path), page_numbers))
+
+
+def extract_ocr_data_sharded(
+    pdf_path: Path,
+    page_numbers: list[int],
+    workers: int,
+    engine: ExtractionEngine | None = None,
+) -> str:
+    """extracts text from the given pages of a PDF file using page-sharded OCR"""
+    pages = ocr_pages(pdf_path, page_numbers, workers=workers, engine=engine)
+    return " ".join(pages)
+
+
+def extract_ocr_data(
+    pdf_path: Path,
+    workers: int = OCR_WORKERS,
+    engine: ExtractionEngine | None = None,
+    skip_pages: Collection[int] = (),
+) -> str:
+    """extracts text from PDF file using OCR, leaving out ``skip_pages``
+
+    Multi-page documents are OCRed page-by-page across the extraction
+    ``engine``, or across ``workers`` processes when no engine is given.
+    Daemonic pool workers cannot start child processes, so they OCR serially
+    through the bounded render/OCR pipeline (see ``ocr_pages_pipelined``).
+    """
     logger.info(f"Extracting text from PDF using OCR: {pdf_path}")
     try:
-        images = convert_from_path(pdf_path)
-        # Utilize comprehension and join directly to avoid intermediate list storage
-        text = " ".join(image_to_string(image) for image in images)
-        return text
+        page_numbers = [
+            page_number
+            for page_number in range(1, get_page_count(pdf_path) + 1)
+            if page_number not in skip_pages
+        ]
+        sharded = engine is not None or (workers > 1 and not current_process().daemon)
+        if sharded and len(page_numbers) > 1:
+            return extract_ocr_data_sharded(
+                pdf_path, page_numbers, workers, engine=engine
+            )
+        return " ".join(ocr_pages_pipelined(pdf_path, page_numbers))
     except IOError as e:
         raise RuntimeError(f"Error reading PDF file: {e}") from e
     except Exception as e:
         raise RuntimeError(f"Error in OCR process: {e}") from e
 
 
+register_backend(TextBackend("pdfplumber", extract_pdf_data, seconds_per_page=0.3))
+register_backend(
+    TextBackend(
+        "ocr",
+        extract_ocr_data,
+        seconds_per_page=2.0,
+        needs_text_layer=False,
+        sharded=True,
+    )
+)
+
+
+def score_text_layer(text: str | None) -> TextLayerScore:
+    """scores a page's text layer by size, unmapped glyphs and word-like tokens"""
+    text = text or ""
+    cid_count = len(CID_PATTERN.findall(text))
+    text = CID_PATTERN.sub(" ", text)
+    chars = [char for char in text if not char.isspace()]
+    garbage = cid_count + sum(
+        1 for char in chars if char == "\ufffd" or not char.isprintable()
+    )
+    total = len(chars) + cid_count
+    words = text.split()
+    return TextLayerScore(
+        char_count=len(chars),
+        garbage_ratio=garbage / total if total else 1.0,
+        word_ratio=(
+            sum(1 for word in words if WORD_PATTERN.search(word)) / len(words)
+            if words
+            else 0.0
+        ),
+    )
+
+
+def route_pdf(
+    pdf_path: Path,
+    workers: int = OCR_WORKERS,
+    engine: ExtractionEngine | None = None,
+    min_chars: int = TEXT_MIN_CHARS,
+    max_garbage_ratio: float = TEXT_MAX_GARBAGE_RATIO,
+    min_word_ratio: float = TEXT_MIN_WORD_RATIO,
+    skip_pages: Collection[int] = (),
+) -> ExtractionReport:
+    """extracts text page by page, taking the text layer first and OCRing only
+    the pages whose text layer fails the quality thresholds
+
+    Pages in ``skip_pages`` are neither read nor OCRed.
+    """
+    logger.info(f"Routing PDF pages between text layer and OCR: {pdf_path}")
+    try:
+        with open_pdf(pdf_path) as pdf:
+            texts = [
+                None if page.page_number in skip_pages else page.extract_text() or ""
+                for page in pdf.pages
+            ]
+    except FileNotFoundError as e:
+        raise RuntimeError(f"PDF file not found: {pdf_path}\n{e}") from e
+    except Exception as e:
+        raise RuntimeError(f"Error in PDF extraction from {pdf_path}\n{e}") from e
+
+    pages = []
+    for page_number, text in enumerate(texts, start=1):
+        if text is None:
+            pages.append(PageResult(page_number, "", "skipped"))
+            continue
+        score = score_text_layer(text)
+        usable = score.is_usable(min_chars, max_garbage_ratio, min_word_ratio)
+        method = "text" if usable else "ocr"
+        pages.append(PageResult(page_number, text if usable else "", method, score))
+
+    ocr_results = [page for page in pages if page.method == "ocr"]
+    if ocr_results:
+        try:
+            page_numbers = [page.page_number for page in ocr_results]
+            results = ocr_pages(
+                pdf_path,
+                page_numbers,
+                workers=workers,
+                engine=engine,
+                func=ocr_page_stats,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Error in OCR process: {e}") from e
+        for page, (text, stats) in zip(ocr_results, results, strict=True):
+            page.text, page.ocr = text, stats
+
+    report = ExtractionReport(pages)
+    logger.info(f"Extraction paths for {pdf_path}: {report.method_counts}")
+    return report
+
+
+def cancellable_ocr_worker(
+    pdf_path: Path, conn: Connection, skip_pages: Collection[int] = ()
+):
+    """child entry point for a cancellable OCR job
+
+    The child leads its own process group so that cancelling it also kills
+    the pdftoppm and tesseract subprocesses it has started.
+    """
+    setpgrp()
+    try:
+        text = extract_ocr_data(pdf_path, workers=1, skip_pages=skip_pages)
+        conn.send((True, text))
+    except Exception as e:
+        conn.send((False, str(e)))
+    finally:
+        conn.close()
+
+
+class CancellableOCR:
+    """OCR of a whole PDF running in its own process, which can be killed
+    as soon as its result is no longer needed"""
+
+    def __init__(
+        self,
+        pdf_path: Path,
+        start_method: str = MP_START_METHOD,
+        skip_pages: Collection[int] = (),
+    ):
+        self.pdf_path = pdf_path
+        context = get_context(start_method)
+        self._conn, child_conn = context.Pipe(duplex=False)
+        self.process = context.Process(
+            target=cancellable_ocr_worker,
+            args=(pdf_path, child_conn, tuple(skip_pages)),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def result(self, timeout: float | None = None) -> str:
+        """waits for the OCR text, cancelling the job if ``timeout`` expires"""
+        if not self._conn.poll(timeout):
+            self.cancel()
+            raise TimeoutError(f"OCR of {self.pdf_path} timed out after {timeout}s")
+        try:
+            ok, value = self._conn.recv()
+        except EOFError as e:
+            raise RuntimeError(f"OCR process for {self.pdf_path} died: {e}") from e
+        finally:
+            self._conn.close()
+            self.process.join()
+        if not ok:
+            raise RuntimeError(f"Error in OCR process: {value}")
+        return value
+
+    def cancel(self):
+        """kills the OCR process group and reaps the worker"""
+        if self.process.is_alive():
+            logger.info(f"Cancelling OCR of {self.pdf_path} (pid {self.process.pid})")
+            try:
+                killpg(self.process.pid, SIGKILL)
+            except ProcessLookupError:
+                # The child has not become a group leader yet
+                self.process.kill()
+        self.process.join()
+        self._conn.close()
+
+
+def race_pdf(
+    pdf_path: Path,
+    speculative: bool = True,
+    timeout: float | None = None,
+    min_chars: int = TEXT_MIN_CHARS,
+    max_garbage_ratio: float = TEXT_MAX_GARBAGE_RATIO,
+    min_word_ratio: float = TEXT_MIN_WORD_RATIO,
+    skip_pages: Collection[int] = (),
+) -> str:
+    """races the pdfplumber text layer against OCR and returns the first
+    good-enough result
+
+    With ``speculative`` OCR starts in its own process straight away and is
+    killed as soon as the text layer passes the quality thresholds. Without
+    it OCR only starts once the text layer has failed. Neither reads the
+    pages in ``skip_pages``.
+    """
+    logger.info(f"Racing text layer against OCR: {pdf_path}")
+    ocr_job = CancellableOCR(pdf_path, skip_pages=skip_pages) if speculative else None
+    try:
+        try:
+            text = extract_pdf_data(pdf_path, skip_pages)
+        except RuntimeError as e:
+            logger.warning(f"Text layer failed, waiting on OCR: {e}")
+            text = ""
+        score = score_text_layer(text)
+        if score.is_usable(min_chars, max_garbage_ratio, min_word_ratio):
+            logger.info(f"Text layer won the race for {pdf_path}")
+            return text
+        if ocr_job is None:
+            ocr_text = extract_ocr_data(pdf_path, skip_pages=skip_pages)
+            return compare_results(text, ocr_text)
+        return compare_results(text, ocr_job.result(timeout))
+    finally:
+        if ocr_job is not None:
+            ocr_job.cancel()
+
+
+def extract_page(
+    pdf_path: Path,
+    page_number: int,
+    mode: str = EXTRACTION_MODE,
+    min_chars: int = TEXT_MIN_CHARS,
+    max_garbage_ratio: float = TEXT_MAX_GARBAGE_RATIO,
+    min_word_ratio: float = TEXT_MIN_WORD_RATIO,
+) -> PageResult:
+    """extracts a single (1-indexed) page so documents can be streamed page by page
+
+    In "compare" mode the page is always OCRed as well and the longer text is
+    kept, otherwise OCR only runs when the page's text layer fails the
+    quality thresholds.
+    """
+    try:
+        with open_pdf(pdf_path, pages=[page_number]) as pdf:
+            text = pdf.pages[0].extract_text() or ""
+    except Exception as e:
+        raise RuntimeError(f"Error in PDF extraction from {pdf_path}\n{e}") from e
+    score = score_text_layer(text)
+    try:
+        if mode == "compare":
+            ocr_text, stats = ocr_page_stats(pdf_path, page_number)
+            text = compare_results(text, ocr_text)
+            return PageResult(page_number, text, "compare", score, stats)
+        if score.is_usable(min_chars, max_garbage_ratio, min_word_ratio):
+            return PageResult(page_number, text, "text", score)
+        ocr_text, stats = ocr_page_stats(pdf_path, page_number)
+        return PageResult(page_number, ocr_text, "ocr", score, stats)
+    except Exception as e:
+        raise RuntimeError(f"Error in OCR process: {e}") from e
+
+
 def compare_results(
     result1: str,
     result2: str,
@@ -55,8 +626,21 @@ def compare_results(
     return result1 or result2
 
 
-def process_pdf(pdf_path: Path, use_multiprocessing=True) -> str:
-    """Extracts text from PDF using pdfplumber and OCR, then compares the results"""
+def process_pdf(
+    pdf_path: Path,
+    use_multiprocessing=True,
+    mode: str = EXTRACTION_MODE,
+    skip_pages: Collection[int] = (),
+) -> str:
+    """Extracts text from PDF using pdfplumber and OCR, then compares the results
+
+    With ``mode="route"`` each page takes the text layer when it scores well
+    and only the remaining pages are OCRed (see ``route_pdf``). With
+    ``mode="race"`` a good-enough text layer cancels the OCR job that is still
+    running (see ``race_pdf``). With ``mode="backend"`` a single text backend
+    chosen per document extracts it (see ``BackendRouter``). Every mode leaves
+    out ``skip_pages``, which the page classifier found irrelevant.
+    """
     logger.info(f"Processing PDF: {pdf_path}")
     if isinstance(pdf_path, bytes):
         return convert_from_bytes(pdf_path, single_file=True)[0]
@@ -64,79 +648,195 @@ def process_pdf(pdf_path: Path, use_multiprocessing=True) -> str:
         pdf_path = Path(pdf_path)
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+    if mode == "route":
+        engine = get_engine() if use_multiprocessing else None
+        return route_pdf(pdf_path, engine=engine, skip_pages=skip_pages).text
+    if mode == "race":
+        return race_pdf(
+            pdf_path, speculative=use_multiprocessing, skip_pages=skip_pages
+        )
+    if mode == "backend":
+        engine = get_engine() if use_multiprocessing else None
+        return get_router().extract(pdf_path, engine=engine, skip_pages=skip_pages)
+    if mode != "compare":
+        raise ValueError(f"Unsupported extraction mode: {mode}")
     if use_multiprocessing:
-        set_start_method("forkserver")
-        with Pool(processes=2) as pool:
-            tasks = [
-                pool.apply_async(extract_pdf_data, (pdf_path,)),
-                pool.apply_async(extract_ocr_data, (pdf_path,)),
-            ]
-            results = [task.get() for task in tasks]  # Collect results
-            best_result = compare_results(*results)
-            return best_result
+        # Reuse the long-lived engine: the text layer and OCR pages share workers
+        engine = get_engine()
+        pdf_task = engine.submit(extract_pdf_data, pdf_path, tuple(skip_pages))
+        ocr_result = extract_ocr_data(pdf_path, engine=engine, skip_pages=skip_pages)
+        return compare_results(pdf_task.get(), ocr_result)
     else:
         # Run sequentially in the same process
-        results = [extract_pdf_data(pdf_path), extract_ocr_data(pdf_path)]
+        results = [
+            extract_pdf_data(pdf_path, skip_pages),
+            extract_ocr_data(pdf_path, skip_pages=skip_pages),
+        ]
         return compare_results(*results)
 
 
+def extract_document(
+    pdf_path: Path,
+    use_multiprocessing=True,
+    mode: str = EXTRACTION_MODE,
+    skip_pages: Collection[int] = (),
+) -> str | dict:
+    """returns the ``Application`` dict of a filled fillable PDF, read from its
+    AcroForm fields, otherwise the text from ``process_pdf``
+
+    Text never shows which boxes are checked, so with
+    ``CHECKBOX_LINES_OF_BUSINESS`` on, ACORD 125 pages with checked line of
+    business boxes also return the ``Application`` dict, parsed from the text
+    with those lines added.
+    """
+    if ACROFORM_FAST_PATH:
+        application = extract_form_data(pdf_path)
+        if application is not None:
+            return application
+    text = process_pdf(pdf_path, use_multiprocessing, mode, skip_pages)
+    return add_checked_lines(pdf_path, text, skip_pages)
+
+
+def add_checked_lines(
+    pdf_path: Path, text: str, skip_pages: Collection[int] = ()
+) -> str | dict:
+    """returns the ``Application`` dict parsed from a PDF's extracted text with
+    its checked line of business boxes added, or the text when none are
+    checked or ``CHECKBOX_LINES_OF_BUSINESS`` is off"""
+    if not CHECKBOX_LINES_OF_BUSINESS:
+        return text
+    lines_of_business = read_lines_of_business(pdf_path, skip_pages)
+    if not lines_of_business:
+        return text
+    # The checked boxes were read from pages classified as ACORD 125
+    return parse_application(text, lines_of_business, CA_APP).to_dict()
+
+
+def structure_text(raw_text: str | dict, template: str = DEFAULT_TEMPLATE) -> dict:
+    """returns the ``Application`` dict parsed from extracted text with the
+    field labels of ``template``"""
+    if isinstance(raw_text, dict):
+        # Already structured by the AcroForm fast path
+        return raw_text
+    return parse_application(raw_text, template=template).to_dict()
+
+
+def extraction_config(mode: str = EXTRACTION_MODE) -> dict:
+    """returns the settings that change extraction output, for cache keys"""
+    return {
+        "mode": mode,
+        "acroform": ACROFORM_FAST_PATH,
+        "classifier": PAGE_CLASSIFIER,
+        "text_backend": TEXT_BACKEND if mode == "backend" else None,
+        "min_chars": TEXT_MIN_CHARS,
+        "max_garbage_ratio": TEXT_MAX_GARBAGE_RATIO,
+        "min_word_ratio": TEXT_MIN_WORD_RATIO,
+        "ocr_dpi_tiers": OCR_DPI_TIERS if OCR_TIERED else None,
+        "ocr_min_confidence": OCR_MIN_CONFIDENCE if OCR_TIERED else None,
+        "checkbox_lines_of_business": CHECKBOX_LINES_OF_BUSINESS,
+        "checkbox_fill_ratio": CHECKBOX_FILL_RATIO,
+    }
+
+
 class PDFExtractor:
-    def __init__(self, mlflow_tracking_uri: str):
+    def __init__(
+        self,
+        mlflow_tracking_uri: str,
+        mode: str = EXTRACTION_MODE,
+        cache: ExtractionCache | None = None,
+        use_cache: bool = True,
+        single_flight: SingleFlight | None = None,
+        batcher: MicroBatcher | None = None,
+        sink: TrackingSink | None = None,
+    ):
         logger.info(
             f"Setting up PDFExtractor with MLFlow tracking URI: {mlflow_tracking_uri}"
         )
         set_tracking_uri(mlflow_tracking_uri)
         set_experiment("PDF_Extraction")
+        self.mode = mode
+        self.cache = (cache or get_cache()) if use_cache else None
+        self.single_flight = single_flight or get_single_flight()
+        self.batcher = batcher or get_batcher()
+        self.sink = sink or get_sink()
 
     def read_pdf_from_file(self, filepath):
         with open(filepath, "rb") as file:
-            return self.process_pdf(file)
+            return self.process_pdf(file.read())
 
     def read_pdf_from_base64(self, base64_data):
         pdf_bytes = b64decode(base64_data)
-        return self.process_pdf(BytesIO(pdf_bytes))
+        return self.process_pdf(pdf_bytes)
 
     def read_pdf_from_url(self, url):
         response = get(url)
         response.raise_for_status()
-        return self.process_pdf(BytesIO(response.content))
+        return self.process_pdf(response.content)
 
-    def structure_data(self, raw_text):
-        # This method should be implemented to structure raw text into a dictionary
-        # based on your specific data structuring needs.
-        structured_data = {"content": raw_text}
-        return structured_data
+    def process_pdf(self, pdf_bytes: bytes) -> str | dict:
+        """extracts raw text from PDF bytes, serving repeat documents from cache
 
-    def validate_data(self, data):
-        # Implement validation logic
-        # This could be as simple as checking data types, or as complex as applying a schema validation
-        return True
+        Filled fillable PDFs return their ``Application`` dict instead (see
+        ``extract_document``). Concurrent requests for the same document share
+        one extraction.
+        """
+        key = make_cache_key(pdf_bytes, EXTRACTOR_VERSION, extraction_config(self.mode))
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info(f"Extraction cache hit: {key}")
+                return cached
+        return self.single_flight.do(key, self._extract, pdf_bytes, key)
+
+    def _extract(self, pdf_bytes: bytes, key: str) -> str | dict:
+        with NamedTemporaryFile(suffix=".pdf") as file:
+            file.write(pdf_bytes)
+            file.flush()
+            raw_text = extract_document(Path(file.name), mode=self.mode)
+        if self.cache is not None:
+            self.cache.set(key, raw_text)
+        return raw_text
+
+    def structure_data(self, raw_text, template: str = DEFAULT_TEMPLATE):
+        return structure_text(raw_text, template)
+
+    def validate_data(self, data, schema: str = APPLICATION):
+        errors = validate_record(data, schema)
+        if errors:
+            logger.warning(
+                f"Extracted data failed {schema} validation: "
+                f"{[f'{error.path}: {error.message}' for error in errors]}"
+            )
+        return not errors
 
     def pass_to_llm(self, structured_data):
-        # Code to pass structured data to an LLM and get the processed output
-        # This could involve calling an API or using a direct library method
-        processed_data = structured_data  # Placeholder for actual LLM processing
-        return processed_data
+        """runs the record through the LLM, batched with records from
+        concurrent extractions"""
+        return self.batcher.process(structured_data)
 
     def extract_data(self, input_data, input_type="file"):
-        with start_run():
-            if input_type == "file":
-                raw_text = self.read_pdf_from_file(input_data)
-            elif input_type == "base64":
-                raw_text = self.read_pdf_from_base64(input_data)
-            elif input_type == "url":
-                raw_text = self.read_pdf_from_url(input_data)
-            else:
-                raise ValueError("Unsupported input type")
-
-            structured_data = self.structure_data(raw_text)
-            if self.validate_data(structured_data):
-                final_data = self.pass_to_llm(structured_data)
-                log_param("input_type", input_type)
-                log_artifact(dumps(final_data), "output.json")
-                return final_data
-            else:
-                raise ValueError("Data validation failed")
+        start = perf_counter()
+        if input_type == "file":
+            raw_text = self.read_pdf_from_file(input_data)
+        elif input_type == "base64":
+            raw_text = self.read_pdf_from_base64(input_data)
+        elif input_type == "url":
+            raw_text = self.read_pdf_from_url(input_data)
+        else:
+            raise ValueError("Unsupported input type")
+
+        structured_data = self.structure_data(raw_text)
+        if self.validate_data(structured_data):
+            final_data = self.pass_to_llm(structured_data)
+            # Logged in the background so MLflow I/O stays off the request path
+            self.sink.log_run(
+                params={"input_type": input_type, "mode": self.mode},
+                metrics={"seconds": perf_counter() - start},
+                artifacts={"output.json": final_data},
+            )
+            return final_data
+        else:
+            raise ValueError("Data validation failed")
 
 
 if __name__ == "__main__":
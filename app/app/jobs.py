@@ -0,0 +1,431 @@
+"""Persistent batch extraction jobs
+
+A job is a set of documents uploaded together. Documents are spooled under
+``store/outputs/jobs`` and their status and results are kept in a SQL
+database (SQLite by default, or the ``app_db`` Postgres via
+``JOBS_DATABASE_URL``), so unfinished jobs resume after a restart. Every
+server process resumes them, so each document is claimed atomically by one
+process before it is extracted.
+"""
+
+from asyncio import Semaphore, create_task, gather, sleep
+from json import dumps, loads
+from os import getpid, unlink
+from pathlib import Path
+from shutil import copyfileobj, rmtree
+from socket import gethostname
+from time import perf_counter, time
+from uuid import uuid4
+from zipfile import BadZipFile, ZipFile
+
+from sqlalchemy import (
+    Column,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    and_,
+    create_engine,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+)
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+
+from app.__init__ import (
+    JOBS_DATABASE_URL,
+    JOBS_LEASE_SECONDS,
+    JOBS_MAX_FILES,
+    JOBS_MAX_UNPACKED_BYTES,
+    JOBS_PARALLELISM,
+    JOBS_STORE_PATH,
+    getLogger,
+)
+from app.cache import hash_file
+from app.service import ExtractionService
+
+logger = getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+metadata = MetaData()
+
+jobs_table = Table(
+    "extraction_jobs",
+    metadata,
+    Column("id", String(32), primary_key=True),
+    Column("total", Integer, nullable=False),
+    Column("created_at", Float, nullable=False),
+)
+
+documents_table = Table(
+    "extraction_documents",
+    metadata,
+    Column("job_id", String(32), ForeignKey("extraction_jobs.id"), primary_key=True),
+    Column("position", Integer, primary_key=True),
+    Column("filename", String(255), nullable=False),
+    Column("path", Text, nullable=False),
+    Column("sha256", String(64), nullable=False),
+    Column("status", String(16), nullable=False, index=True),
+    Column("result", Text),
+    Column("error", Text),
+    Column("elapsed", Float),
+    Column("owner", String(64)),
+    Column("heartbeat", Float),
+)
+
+
+def unpack_zip(
+    zip_path: Path,
+    job_path: Path,
+    start: int,
+    max_files: int = JOBS_MAX_FILES,
+    max_bytes: int = JOBS_MAX_UNPACKED_BYTES,
+) -> list[dict]:
+    """copies every PDF in a zip archive into the job directory
+
+    The archive is rejected before anything is extracted when the job would
+    hold more than ``max_files`` documents or its PDFs would uncompress to more
+    than ``max_bytes``. Reading a member stops at its declared size, so the
+    sizes in the archive directory bound what is written.
+    """
+    documents = []
+    try:
+        archive = ZipFile(zip_path)
+    except BadZipFile as e:
+        raise ValueError(f"Invalid zip archive in batch upload: {e}") from e
+    with archive:
+        members = [
+            member
+            for member in archive.infolist()
+            if not member.is_dir() and member.filename.lower().endswith(".pdf")
+        ]
+        if start + len(members) > max_files:
+            raise ValueError(
+                f"Batch upload has more than {max_files} documents with {zip_path.name}"
+            )
+        if sum(member.file_size for member in members) > max_bytes:
+            raise ValueError(
+                f"PDFs in {zip_path.name} uncompress to more than {max_bytes} bytes"
+            )
+        for member in members:
+            path = job_path / f"{start + len(documents):06d}.pdf"
+            with archive.open(member) as source, open(path, "wb") as target:
+                copyfileobj(source, target)
+            documents.append(
+                {
+                    "filename": Path(member.filename).name,
+                    "path": str(path),
+                    "sha256": hash_file(path),
+                }
+            )
+    return documents
+
+
+class JobStore:
+    """SQL-backed record of batch jobs and the status of each document
+
+    A running document is leased to its ``owner`` until ``lease`` seconds
+    after the owner's last heartbeat.
+    """
+
+    def __init__(
+        self,
+        url: str = JOBS_DATABASE_URL,
+        path: Path = JOBS_STORE_PATH,
+        lease: float = JOBS_LEASE_SECONDS,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(exist_ok=True, parents=True)
+        self.lease = lease
+        self.engine = create_engine(url)
+        metadata.create_all(self.engine)
+
+    def job_path(self, job_id: str) -> Path:
+        return self.path / job_id
+
+    def new_job_id(self) -> str:
+        job_id = uuid4().hex
+        self.job_path(job_id).mkdir()
+        return job_id
+
+    def create_job(self, job_id: str, documents: list[dict]):
+        """records a job and its spooled documents as queued"""
+        with self.engine.begin() as conn:
+            conn.execute(
+                insert(jobs_table).values(
+                    id=job_id, total=len(documents), created_at=time()
+                )
+            )
+            if documents:
+                conn.execute(
+                    insert(documents_table),
+                    [
+                        {"job_id": job_id, "position": position, "status": QUEUED}
+                        | document
+                        for position, document in enumerate(documents)
+                    ],
+                )
+
+    def get_job(self, job_id: str) -> dict | None:
+        """returns the job with its per-status document counts"""
+        with self.engine.connect() as conn:
+            job = conn.execute(
+                select(jobs_table).where(jobs_table.c.id == job_id)
+            ).first()
+            if job is None:
+                return None
+            counts = dict(
+                conn.execute(
+                    select(documents_table.c.status, func.count())
+                    .where(documents_table.c.job_id == job_id)
+                    .group_by(documents_table.c.status)
+                ).all()
+            )
+        unfinished = counts.get(QUEUED, 0) + counts.get(RUNNING, 0)
+        if not unfinished:
+            status = DONE
+        elif unfinished == job.total and not counts.get(RUNNING):
+            status = QUEUED
+        else:
+            status = RUNNING
+        return {
+            "job_id": job.id,
+            "status": status,
+            "total": job.total,
+            "created_at": job.created_at,
+            "counts": {
+                state: counts.get(state, 0) for state in (QUEUED, RUNNING, DONE, FAILED)
+            },
+        }
+
+    def list_documents(
+        self,
+        job_id: str,
+        offset: int = 0,
+        limit: int = 100,
+        status: str | None = None,
+    ) -> list[dict]:
+        """returns a page of the job's documents in upload order"""
+        query = select(documents_table).where(documents_table.c.job_id == job_id)
+        if status is not None:
+            query = query.where(documents_table.c.status == status)
+        query = query.order_by(documents_table.c.position).offset(offset).limit(limit)
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).mappings().all()
+        return [
+            {
+                "position": row["position"],
+                "filename": row["filename"],
+                "sha256": row["sha256"],
+                "status": row["status"],
+                "result": loads(row["result"]) if row["result"] is not None else None,
+                "error": row["error"],
+                "elapsed": row["elapsed"],
+            }
+            for row in rows
+        ]
+
+    def pending_documents(self, job_id: str) -> list[dict]:
+        """returns documents that are queued or running; running ones may
+        belong to a process that stopped, and are claimed once their lease
+        lapses"""
+        query = (
+            select(documents_table)
+            .where(documents_table.c.job_id == job_id)
+            .where(documents_table.c.status.in_((QUEUED, RUNNING)))
+            .order_by(documents_table.c.position)
+        )
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(query).mappings().all()]
+
+    def unfinished_jobs(self) -> list[str]:
+        query = (
+            select(documents_table.c.job_id)
+            .where(documents_table.c.status.in_((QUEUED, RUNNING)))
+            .distinct()
+        )
+        with self.engine.connect() as conn:
+            return list(conn.execute(query).scalars())
+
+    def _document(self, job_id: str, position: int):
+        return (
+            update(documents_table)
+            .where(documents_table.c.job_id == job_id)
+            .where(documents_table.c.position == position)
+        )
+
+    def claim_document(self, job_id: str, position: int, owner: str) -> bool:
+        """marks a document running for ``owner`` in one atomic update, and
+        returns False if it is finished or another owner's lease is live"""
+        now = time()
+        stale = or_(
+            documents_table.c.heartbeat.is_(None),
+            documents_table.c.heartbeat < now - self.lease,
+        )
+        query = self._document(job_id, position).where(
+            or_(
+                documents_table.c.status == QUEUED,
+                and_(documents_table.c.status == RUNNING, stale),
+            )
+        )
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                query.values(status=RUNNING, owner=owner, heartbeat=now)
+            )
+        return result.rowcount == 1
+
+    def renew_document(self, job_id: str, position: int, owner: str) -> bool:
+        """extends ``owner``'s lease on a running document"""
+        return self.update_document(job_id, position, owner, heartbeat=time())
+
+    def update_document(
+        self, job_id: str, position: int, owner: str | None = None, **values
+    ) -> bool:
+        """updates a document, only while ``owner`` holds it when one is given,
+        and returns whether it was updated"""
+        query = self._document(job_id, position)
+        if owner is not None:
+            query = query.where(documents_table.c.owner == owner)
+        with self.engine.begin() as conn:
+            return conn.execute(query.values(**values)).rowcount == 1
+
+    def cleanup(self, job_id: str):
+        """removes the job's spooled files once every document has finished"""
+        if not self.pending_documents(job_id):
+            rmtree(self.job_path(job_id), ignore_errors=True)
+
+
+class BatchRunner:
+    """Processes batch jobs in the background with bounded parallelism
+
+    At most ``parallelism`` documents are extracted at a time across all
+    jobs. Results go through the extraction service, so the cache and
+    single-flight group apply to batch documents too. Each runner claims a
+    document under its own ``owner`` name before extracting it, so runners in
+    several server processes can resume the same job without repeating work.
+    """
+
+    def __init__(
+        self,
+        service: ExtractionService,
+        store: JobStore | None = None,
+        parallelism: int = JOBS_PARALLELISM,
+    ):
+        self.service = service
+        self._store = store
+        self.parallelism = parallelism
+        self.owner = f"{gethostname()}:{getpid()}:{uuid4().hex[:8]}"
+        self._semaphore = None
+        self._tasks = set()
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    async def submit(self, uploads: list[UploadFile]) -> dict:
+        """spools uploaded PDFs (or zips of PDFs) into a new job and starts it"""
+        store = self.store
+        job_id = await run_in_threadpool(store.new_job_id)
+        job_path = store.job_path(job_id)
+        try:
+            documents = await self._spool_all(uploads, job_path)
+            if not documents:
+                raise ValueError("No PDF documents in the batch upload")
+        except Exception:
+            rmtree(job_path, ignore_errors=True)
+            raise
+        await run_in_threadpool(store.create_job, job_id, documents)
+        self.start(job_id)
+        return {"job_id": job_id, "total": len(documents)}
+
+    async def _spool_all(self, uploads: list[UploadFile], job_path: Path) -> list[dict]:
+        documents = []
+        for upload in uploads:
+            filename = upload.filename or "document.pdf"
+            if filename.lower().endswith(".zip"):
+                zip_path, _ = await self.service.spool(
+                    upload, ".zip", job_path / "upload.zip"
+                )
+                documents += await run_in_threadpool(
+                    unpack_zip, zip_path, job_path, len(documents)
+                )
+                unlink(zip_path)
+            else:
+                path, digest = await self.service.spool(
+                    upload, ".pdf", job_path / f"{len(documents):06d}.pdf"
+                )
+                documents.append(
+                    {"filename": filename, "path": str(path), "sha256": digest}
+                )
+        return documents
+
+    def start(self, job_id: str):
+        """schedules a job on the running event loop"""
+        task = create_task(self.run(job_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def resume(self) -> list[str]:
+        """restarts every job that has unfinished documents"""
+        job_ids = self.store.unfinished_jobs()
+        for job_id in job_ids:
+            logger.info(f"Resuming batch job {job_id}")
+            self.start(job_id)
+        return job_ids
+
+    async def run(self, job_id: str):
+        if self._semaphore is None:
+            self._semaphore = Semaphore(self.parallelism)
+        documents = await run_in_threadpool(self.store.pending_documents, job_id)
+        await gather(*(self._process(document) for document in documents))
+        await run_in_threadpool(self.store.cleanup, job_id)
+        logger.info(f"Batch job {job_id} finished")
+
+    async def _renew(self, job_id: str, position: int):
+        while True:
+            await sleep(self.store.lease / 3)
+            await run_in_threadpool(
+                self.store.renew_document, job_id, position, self.owner
+            )
+
+    async def _process(self, document: dict):
+        async with self._semaphore:
+            job_id, position = document["job_id"], document["position"]
+            claimed = await run_in_threadpool(
+                self.store.claim_document, job_id, position, self.owner
+            )
+            if not claimed:
+                logger.info(f"Batch document {job_id}/{position} is already claimed")
+                return
+            renewal = create_task(self._renew(job_id, position))
+            start = perf_counter()
+            try:
+                content = await self.service.extract_path(
+                    Path(document["path"]), document["sha256"], "pdf"
+                )
+            except Exception as e:
+                logger.warning(f"Batch document {job_id}/{position} failed: {e}")
+                values = {"status": FAILED, "error": str(e)}
+            else:
+                values = {"status": DONE, "result": dumps(content)}
+            finally:
+                renewal.cancel()
+            values["elapsed"] = perf_counter() - start
+            updated = await run_in_threadpool(
+                self.store.update_document, job_id, position, self.owner, **values
+            )
+            if not updated:
+                logger.warning(f"Batch document {job_id}/{position} lost its lease")
+
+    async def wait(self):
+        """waits for every job started by this runner to finish"""
+        await gather(*self._tasks)
@@ -0,0 +1,191 @@
+"""Word-level page layout in compact NumPy arrays
+
+Each page is read once with pdfplumber and its words are kept as a
+structured array of boxes, font sizes and reading order next to an array of
+the word strings. Field mapping can then ask spatial questions such as "the
+value to the right of label X" with vectorized masks instead of re-parsing
+the PDF or walking per-word dicts.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from numpy import (
+    argsort,
+    array,
+    char,
+    concatenate,
+    cumsum,
+    diff,
+    dtype,
+    empty,
+    flatnonzero,
+    float32,
+    int32,
+    lexsort,
+    maximum,
+    minimum,
+    zeros,
+)
+from numpy.typing import NDArray
+from pdfplumber import open as open_pdf
+
+from app.__init__ import getLogger
+
+logger = getLogger(__name__)
+
+WORD_DTYPE = dtype(
+    [
+        ("x0", float32),
+        ("top", float32),
+        ("x1", float32),
+        ("bottom", float32),
+        ("size", float32),
+        ("line", int32),
+    ]
+)
+# Words whose tops differ by no more than this many points share a line,
+# pdfplumber's default y_tolerance
+LINE_TOLERANCE = 3
+
+
+@dataclass
+class PageLayout:
+    """Words on a (1-indexed) page with boxes in PDF points from the top-left
+    corner. Array position is reading order: by line, then left to right."""
+
+    page_number: int
+    width: float
+    height: float
+    words: NDArray
+    text: NDArray
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @property
+    def lines(self) -> list[str]:
+        """the page's text, one string per line"""
+        if not len(self):
+            return []
+        breaks = flatnonzero(diff(self.words["line"])) + 1
+        starts, ends = [0, *breaks], [*breaks, len(self)]
+        return [
+            " ".join(self.text[start:end])
+            for start, end in zip(starts, ends, strict=True)
+        ]
+
+    def find(self, label: str) -> list[tuple]:
+        """returns the ``(x0, top, x1, bottom)`` box of every case-insensitive
+        occurrence of ``label`` as consecutive words on one line"""
+        tokens = label.upper().split()
+        if not tokens or len(tokens) > len(self):
+            return []
+        upper = char.upper(self.text)
+        count = len(tokens)
+        candidates = flatnonzero(upper[: len(self) - count + 1] == tokens[0])
+        matches = []
+        for start in candidates:
+            end = start + count
+            if list(upper[start:end]) != tokens:
+                continue
+            if self.words["line"][start] != self.words["line"][end - 1]:
+                continue
+            words = self.words[start:end]
+            matches.append(
+                (
+                    float(words["x0"].min()),
+                    float(words["top"].min()),
+                    float(words["x1"].max()),
+                    float(words["bottom"].max()),
+                )
+            )
+        return matches
+
+    def within(self, bbox: tuple) -> NDArray:
+        """returns the indices of words whose centres fall inside ``bbox``"""
+        x0, top, x1, bottom = bbox
+        centre_x = (self.words["x0"] + self.words["x1"]) / 2
+        centre_y = (self.words["top"] + self.words["bottom"]) / 2
+        mask = (
+            (centre_x >= x0)
+            & (centre_x <= x1)
+            & (centre_y >= top)
+            & (centre_y <= bottom)
+        )
+        return flatnonzero(mask)
+
+    def right_of(self, bbox: tuple, max_distance: float = 200) -> NDArray:
+        """returns the indices, left to right, of words that start within
+        ``max_distance`` points right of ``bbox`` and overlap it vertically"""
+        _, top, x1, bottom = bbox
+        overlap = minimum(self.words["bottom"], bottom) - maximum(
+            self.words["top"], top
+        )
+        gap = self.words["x0"] - x1
+        mask = (overlap > 0) & (gap >= 0) & (gap <= max_distance)
+        indices = flatnonzero(mask)
+        return indices[argsort(self.words["x0"][indices], kind="stable")]
+
+    def below(self, bbox: tuple, max_distance: float = 20) -> NDArray:
+        """returns the indices, in reading order, of words that start within
+        ``max_distance`` points below ``bbox`` and overlap it horizontally"""
+        x0, _, x1, bottom = bbox
+        overlap = minimum(self.words["x1"], x1) - maximum(self.words["x0"], x0)
+        gap = self.words["top"] - bottom
+        return flatnonzero((overlap > 0) & (gap >= 0) & (gap <= max_distance))
+
+    def value_right_of(self, label: str, max_distance: float = 200) -> str | None:
+        """returns the words to the right of the first occurrence of ``label``"""
+        for bbox in self.find(label):
+            indices = self.right_of(bbox, max_distance)
+            if len(indices):
+                return " ".join(self.text[indices])
+        return None
+
+    def value_below(self, label: str, max_distance: float = 20) -> str | None:
+        """returns the words below the first occurrence of ``label``"""
+        for bbox in self.find(label):
+            indices = self.below(bbox, max_distance)
+            if len(indices):
+                return " ".join(self.text[indices])
+        return None
+
+
+def page_layout(page) -> PageLayout:
+    """builds the layout of a pdfplumber page from a single word extraction"""
+    raw = page.extract_words(extra_attrs=["size"])
+    words = empty(len(raw), dtype=WORD_DTYPE)
+    if raw:
+        words["x0"] = [word["x0"] for word in raw]
+        words["top"] = [word["top"] for word in raw]
+        words["x1"] = [word["x1"] for word in raw]
+        words["bottom"] = [word["bottom"] for word in raw]
+        words["size"] = [word["size"] for word in raw]
+        # Cluster tops into lines, then order by line and left edge
+        by_top = argsort(words["top"], kind="stable")
+        new_line = diff(words["top"][by_top]) > LINE_TOLERANCE
+        line_of_sorted = concatenate(([0], cumsum(new_line, dtype=int32)))
+        line = zeros(len(raw), dtype=int32)
+        line[by_top] = line_of_sorted
+        words["line"] = line
+        order = lexsort((words["x0"], words["line"]))
+        words = words[order]
+        text = array([raw[index]["text"] for index in order], dtype=str)
+    else:
+        text = array([], dtype=str)
+    return PageLayout(
+        page.page_number, float(page.width), float(page.height), words, text
+    )
+
+
+def extract_layout(pdf_path: Path, pages: list[int] | None = None) -> list[PageLayout]:
+    """extracts the word layout of every (or the given 1-indexed) page of a PDF"""
+    logger.info(f"Extracting word layout from PDF: {pdf_path}")
+    try:
+        with open_pdf(pdf_path, pages=pages) as pdf:
+            return [page_layout(page) for page in pdf.pages]
+    except FileNotFoundError as e:
+        raise RuntimeError(f"PDF file not found: {pdf_path}\n{e}") from e
+    except Exception as e:
+        raise RuntimeError(f"Error in layout extraction from {pdf_path}\n{e}") from e
@@ -0,0 +1,192 @@
+"""Dynamic micro-batching in front of the LLM post-processing step
+
+Concurrent extractions each hand one structured record to the batcher and
+block on its result. A single scheduler thread gathers waiting records into
+a batch, closing it when ``max_batch_size`` records are in or ``max_wait``
+seconds have passed since the first one arrived, and makes one model call
+per batch. Models are plain callables from a list of records to a list of
+results in the same order, so a local stand-in can replace a served model
+for offline load tests.
+"""
+
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from queue import Empty, Queue
+from statistics import fmean, quantiles
+from threading import Lock, Thread
+from time import perf_counter, sleep
+
+from app.__init__ import LLM_MAX_BATCH_SIZE, LLM_MAX_WAIT_MS, LLM_MODEL, getLogger
+from app.data_model import BatchStats
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+Model = Callable[[list], list]
+
+# Batches kept for the latency and occupancy summary
+STATS_WINDOW = 1000
+
+
+class LocalModel:
+    """Stand-in model that returns each record unchanged after a delay of
+    ``batch_latency`` seconds plus ``item_latency`` seconds per record"""
+
+    def __init__(self, batch_latency: float = 0.0, item_latency: float = 0.0):
+        self.batch_latency = batch_latency
+        self.item_latency = item_latency
+        self.calls = 0
+
+    def __call__(self, records: list) -> list:
+        self.calls += 1
+        delay = self.batch_latency + self.item_latency * len(records)
+        if delay:
+            sleep(delay)
+        return list(records)
+
+
+_models: dict[str, Model] = {}
+
+
+def register_model(name: str, model: Model):
+    """makes a model available to batchers, replacing any with the same name"""
+    _models[name] = model
+
+
+def get_model(name: str) -> Model:
+    if name not in _models:
+        raise ValueError(f"Unknown LLM model: {name}")
+    return _models[name]
+
+
+register_model("identity", LocalModel())
+
+
+class MicroBatcher:
+    """Collects records from concurrent callers into bounded model batches"""
+
+    def __init__(
+        self,
+        model: Model | None = None,
+        max_batch_size: int = LLM_MAX_BATCH_SIZE,
+        max_wait: float = LLM_MAX_WAIT_MS / 1000,
+    ):
+        if max_batch_size < 1:
+            raise ValueError(f"Batch size must be at least 1: {max_batch_size}")
+        self.model = model or get_model(LLM_MODEL)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Queue[tuple[object, Future, float] | None] = Queue()
+        self._thread = None
+        self._lock = Lock()
+        self._batches: deque[BatchStats] = deque(maxlen=STATS_WINDOW)
+        self.counters = {"batches": 0, "records": 0, "failed_batches": 0}
+
+    def start(self) -> "MicroBatcher":
+        """starts the scheduler thread if it is not already running"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="llm-batcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def shutdown(self):
+        """stops the scheduler once every record already submitted is done"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def submit(self, record) -> Future:
+        """queues one record for the next batch and returns its future"""
+        self.start()
+        future = Future()
+        self._queue.put((record, future, perf_counter()))
+        return future
+
+    def process(self, record):
+        """runs one record through the model as part of a batch and waits"""
+        return self.submit(record).result()
+
+    def _collect(self, first: tuple) -> tuple[list[tuple], bool]:
+        """gathers up to a full batch behind ``first``; also returns whether
+        the shutdown sentinel was seen"""
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - perf_counter()
+            try:
+                item = self._queue.get(timeout=max(timeout, 0))
+            except Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stopping = self._collect(first)
+            self._call(batch)
+
+    def _call(self, batch: list[tuple]):
+        records = [record for record, _, _ in batch]
+        start = perf_counter()
+        try:
+            results = self.model(records)
+            if len(results) != len(records):
+                raise RuntimeError(
+                    f"LLM model returned {len(results)} results for "
+                    f"{len(records)} records"
+                )
+        except Exception as e:
+            logger.warning(f"LLM batch of {len(records)} records failed: {e}")
+            with self._lock:
+                self.counters["failed_batches"] += 1
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        latency = perf_counter() - start
+        for (_, future, _), result in zip(batch, results, strict=True):
+            future.set_result(result)
+        stats = BatchStats(
+            size=len(batch),
+            occupancy=len(batch) / self.max_batch_size,
+            wait=start - batch[0][2],
+            latency=latency,
+        )
+        with self._lock:
+            self._batches.append(stats)
+            self.counters["batches"] += 1
+            self.counters["records"] += len(batch)
+
+    def stats(self) -> dict:
+        """returns batch counters and the latency and occupancy of recent
+        batches"""
+        with self._lock:
+            batches = list(self._batches)
+            summary = {**self.counters, "queued": self._queue.qsize()}
+        if not batches:
+            return summary
+        latencies = [batch.latency for batch in batches]
+        cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        return {
+            **summary,
+            "mean_batch_size": fmean(batch.size for batch in batches),
+            "mean_occupancy": fmean(batch.occupancy for batch in batches),
+            "mean_wait": fmean(batch.wait for batch in batches),
+            "latency_p50": cuts[49],
+            "latency_p95": cuts[94],
+        }
+
+
+@process_wide
+def get_batcher() -> MicroBatcher:
+    """returns the process-wide LLM batcher, created on first use"""
+    return MicroBatcher()
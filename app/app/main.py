@@ -1,20 +1,43 @@
 """Main FastAPI Application"""
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from json import dumps
 from os import getenv
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pandas import json_normalize
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
 from uvicorn import run
 
-from app.__init__ import getLogger
+from app.__init__ import JOBS_MAX_FILES, getLogger
 from app.data_model import PredictionPayload, TrainPayload
+from app.engine import get_engine, shutdown_engine
 from app.inference import inference
-
-app = FastAPI()
+from app.jobs import BatchRunner
+from app.service import ExtractionSaturated, ExtractionService
+from app.templates import get_registry
 
 logger = getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the extraction engine once, resume unfinished batch jobs and shut
+    the engine down with the server"""
+    get_engine()
+    batch_runner.resume()
+    yield
+    shutdown_engine()
+
+
+app = FastAPI(lifespan=lifespan)
+extraction_service = ExtractionService()
+batch_runner = BatchRunner(extraction_service)
+
+
 @app.get("/ping")
 async def ping():
     """Ping server to determine status
@@ -28,6 +51,199 @@ async def ping():
     return {"message": "Server is Running"}
 
 
+def get_upload(form) -> UploadFile:
+    upload = form.get("file")
+    if upload is None or isinstance(upload, str):
+        raise HTTPException(422, "Expected a multipart file field 'file'")
+    return upload
+
+
+def saturated(error: ExtractionSaturated) -> HTTPException:
+    return HTTPException(
+        503, str(error), headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+async def extract_upload(request: Request, kind: str) -> dict:
+    """Admit, spool and extract the ``file`` field of a multipart upload
+
+    The queue slot is reserved before the body is read, so saturated requests
+    are turned away without buffering their uploads.
+    """
+    try:
+        with extraction_service.admit():
+            async with request.form() as form:
+                upload = get_upload(form)
+                return await extraction_service.extract(upload, kind)
+    except ExtractionSaturated as e:
+        raise saturated(e) from e
+    except RuntimeError as e:
+        raise HTTPException(422, str(e)) from e
+
+
+@app.post("/extract/pdf")
+async def extract_pdf(request: Request):
+    """PDF Extraction Endpoint
+
+    Parameters
+    ----------
+    request : Request
+        multipart request with the PDF in its ``file`` field
+
+    Returns
+    -------
+    dict
+        file name, SHA-256 of the upload and the extracted text
+
+    """
+    return await extract_upload(request, "pdf")
+
+
+async def format_events(events: AsyncIterator[dict], sse: bool) -> AsyncIterator[str]:
+    async for event in events:
+        if sse:
+            yield f"event: {event['event']}\ndata: {dumps(event)}\n\n"
+        else:
+            yield dumps(event) + "\n"
+
+
+@app.post("/extract/pdf/stream")
+async def extract_pdf_stream(request: Request):
+    """Streaming PDF Extraction Endpoint
+    Sends each page's text as soon as it is extracted, as NDJSON or as
+    server-sent events when the client accepts ``text/event-stream``.
+
+    Parameters
+    ----------
+    request : Request
+        multipart request with the PDF in its ``file`` field
+
+    Returns
+    -------
+    StreamingResponse
+        one ``page`` event per page in completion order, then a ``done``
+        (or ``error``) event with the per-path page counts
+
+    """
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    try:
+        extraction_service.reserve()
+    except ExtractionSaturated as e:
+        raise saturated(e) from e
+    try:
+        async with request.form() as form:
+            path, digest = await extraction_service.spool(get_upload(form), ".pdf")
+    except BaseException:
+        extraction_service.release()
+        raise
+    events = extraction_service.stream_pdf(path, digest)
+    return StreamingResponse(
+        format_events(events, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+    )
+
+
+@app.post("/extract/pdf/template/{template}")
+async def extract_pdf_template(template: str, request: Request):
+    """Template PDF Extraction Endpoint
+    OCRs only the field regions that the template's layout index places on
+    the form, instead of whole pages.
+
+    Parameters
+    ----------
+    template : str
+        name of a registered template, e.g. ``ca_app``
+    request : Request
+        multipart request with the PDF in its ``file`` field
+
+    Returns
+    -------
+    dict
+        file name, SHA-256 of the upload and the fields shaped like the
+        template schema
+
+    """
+    if template not in get_registry().names():
+        raise HTTPException(404, f"Unknown template: {template}")
+    try:
+        with extraction_service.admit():
+            async with request.form() as form:
+                upload = get_upload(form)
+                return await extraction_service.extract_template(upload, template)
+    except ExtractionSaturated as e:
+        raise saturated(e) from e
+    except RuntimeError as e:
+        raise HTTPException(422, str(e)) from e
+
+
+@app.post("/extract/image")
+async def extract_image(request: Request):
+    """Image Extraction Endpoint
+
+    Parameters
+    ----------
+    request : Request
+        multipart request with the image in its ``file`` field
+
+    Returns
+    -------
+    dict
+        file name, SHA-256 of the upload and the OCR text
+
+    """
+    return await extract_upload(request, "image")
+
+
+@app.post("/extract/batch", status_code=202)
+async def extract_batch(request: Request):
+    """Batch Extraction Endpoint
+    Spools many PDFs (multipart ``files`` fields, or zips of PDFs) into a job
+    and processes them in the background.
+
+    Parameters
+    ----------
+    request : Request
+        multipart request with one or more PDF or zip files
+
+    Returns
+    -------
+    dict
+        job ID to poll and the number of documents in the job
+
+    """
+    async with request.form(max_files=JOBS_MAX_FILES) as form:
+        uploads = [
+            upload for _, upload in form.multi_items() if isinstance(upload, UploadFile)
+        ]
+        try:
+            return await batch_runner.submit(uploads)
+        except ValueError as e:
+            raise HTTPException(422, str(e)) from e
+
+
+@app.get("/extract/batch/{job_id}")
+async def get_batch(job_id: str):
+    """Batch status with the number of documents in each state"""
+    job = await run_in_threadpool(batch_runner.store.get_job, job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown batch job: {job_id}")
+    return job
+
+
+@app.get("/extract/batch/{job_id}/documents")
+async def get_batch_documents(
+    job_id: str, offset: int = 0, limit: int = 100, status: str | None = None
+):
+    """Page of per-document status and results for a batch job"""
+    job = await run_in_threadpool(batch_runner.store.get_job, job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown batch job: {job_id}")
+    documents = await run_in_threadpool(
+        batch_runner.store.list_documents, job_id, offset, min(limit, 1000), status
+    )
+    return {**job, "offset": offset, "documents": documents}
+
+
 @app.post("/train")
 async def train(payload: TrainPayload):
     """Training Endpoint
@@ -0,0 +1,301 @@
+"""Single-pass field parser that fills the Application tree from extracted text
+
+Each form template's field labels come from its ``{name}_labels.json`` file in
+``store/templates`` and are compiled once into that template's parser, a
+trie-shaped regular expression, so a single scan of a document finds every
+label anchor in order, preferring the longest label at each position. Only the
+labels of the template a document is parsed as can match, so one form's labels
+never capture fields on another. Labels match as printed on the form, case and
+all, but any run of spaces between their words matches. A field's value is the
+text between its anchor and the next one on the same line, or the next line
+when the label stands alone. Named insured blocks keep every line up to the
+next anchor, which holds the name and mailing address.
+"""
+
+from collections.abc import Iterable
+from itertools import pairwise
+from json import loads
+from pathlib import Path
+from re import compile, escape
+from threading import Lock
+
+from app.__init__ import TEMPLATE_PATH, getLogger
+from app.acroform import LEGAL_ENTITIES, to_int, to_number
+from app.data_model import (
+    Address,
+    Agency,
+    Application,
+    BusinessInfo,
+    ContactInfo,
+    Coverage,
+    InsuredInfo,
+    PolicyInfo,
+)
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+LABELS_SUFFIX = "_labels.json"
+# The ACORD 125 labels that text is parsed with unless a caller names another
+DEFAULT_TEMPLATE = "ca_app"
+INSURED_BLOCKS = ("first_named_insured", "additional_insured")
+NUMBER_FIELDS = ("business.annual_revenue",)
+INT_FIELDS = (
+    "business.number_of_members",
+    "business.no_of_employees_fulltime",
+    "business.no_of_employees_parttime",
+)
+# Punctuation left around values by labels such as "ANNUAL REVENUES: $"
+VALUE_STRIP = " \t:$#"
+# A label only matches where it does not continue a word on either side
+LABEL_START = r"(?<!\w)"
+LABEL_END = r"(?!(?<=\w)\w)"
+CITY_STATE_ZIP = compile(r"^(.*?),?\s+([A-Z]{2})\s+(\d{5}(?:-\d{4})?)$")
+
+
+def normalize_label(label: str) -> str:
+    return " ".join(label.split())
+
+
+def trie_pattern(labels) -> str:
+    """returns a regular expression matching any of ``labels``, built as a
+    trie so shared prefixes are tested once and longer labels win"""
+    trie = {}
+    for label in labels:
+        node = trie
+        for char in label:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        alternatives = [
+            (r"[ \t]+" if char == " " else escape(char)) + build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not alternatives:
+            return ""
+        if len(alternatives) == 1:
+            pattern = alternatives[0]
+        else:
+            pattern = f"(?:{'|'.join(alternatives)})"
+        # an optional continuation is greedy, so the longest label matches
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+
+def split_address(lines: list[str]) -> Address:
+    """reads street lines and a trailing "City, ST 12345" line"""
+    match = CITY_STATE_ZIP.match(lines[-1]) if lines else None
+    if match is None:
+        return Address(
+            line1=lines[0] if lines else None,
+            line2=lines[1] if len(lines) > 1 else None,
+            city=None,
+            state=None,
+            zip_code=None,
+        )
+    return Address(
+        line1=lines[0] if len(lines) > 1 else None,
+        line2=lines[1] if len(lines) > 2 else None,
+        city=match.group(1) or None,
+        state=match.group(2),
+        zip_code=match.group(3),
+    )
+
+
+def entity_name(value: str | None) -> str | None:
+    """maps a legal entity value onto its ACORD checkbox name if it is one"""
+    if not value:
+        return None
+    for name, _ in LEGAL_ENTITIES:
+        if value.upper() == name.upper():
+            return name
+    return value
+
+
+def load_labels(
+    name: str = DEFAULT_TEMPLATE, path: Path = TEMPLATE_PATH
+) -> list[tuple[str, str | None]]:
+    """returns the (label, field) pairs of the ``{name}_labels.json`` file in
+    ``path``, raising KeyError when the template has none
+
+    Labels are as printed on a form or a common retyped layout. Fields
+    starting with "insured." belong to the most recent named insured block,
+    "premium." fields hold the premium of the named line of business, and a
+    None field only ends the value of the label before it.
+    """
+    labels_path = Path(path) / f"{name}{LABELS_SUFFIX}"
+    if not labels_path.exists():
+        raise KeyError(f"No field labels for template: {name}")
+    return [
+        (label["label"], label["field"])
+        for label in loads(labels_path.read_text())["labels"]
+    ]
+
+
+class FieldParser:
+    """Label table compiled into one pattern, shared by every document"""
+
+    def __init__(self, labels: list[tuple[str, str | None]] | None = None):
+        if labels is None:
+            labels = load_labels()
+        self.fields = {normalize_label(label): field for label, field in labels}
+        self.pattern = compile(
+            f"{LABEL_START}(?:{trie_pattern(self.fields)}){LABEL_END}"
+        )
+
+    def anchors(self, text: str) -> list[tuple[str | None, int, int]]:
+        """returns (field, start, end) for every label in ``text``, in order"""
+        return [
+            (self.fields[normalize_label(match.group())], match.start(), match.end())
+            for match in self.pattern.finditer(text)
+        ]
+
+    def scan(self, text: str) -> tuple[dict[str, str], list[tuple[str, dict]]]:
+        """returns the first non-empty value of every field and the named
+        insured blocks, in document order"""
+        values, insureds = {}, []
+        anchors = [*self.anchors(text), (None, len(text), len(text))]
+        for (field, _, end), (_, next_start, _) in pairwise(anchors):
+            if field is None:
+                continue
+            following = text[end:next_start]
+            if field in INSURED_BLOCKS:
+                lines = [line.strip(VALUE_STRIP) for line in following.split("\n")]
+                insureds.append((field, {"lines": list(filter(None, lines))}))
+                continue
+            first, newline, rest = following.partition("\n")
+            value = first.strip(VALUE_STRIP)
+            if not value and newline and "\n" in rest:
+                value = rest.partition("\n")[0].strip(VALUE_STRIP)
+            if not value:
+                continue
+            if field.startswith("insured."):
+                if not insureds:
+                    insureds.append(("first_named_insured", {"lines": []}))
+                insureds[-1][1].setdefault(field.removeprefix("insured."), value)
+            else:
+                values.setdefault(field, value)
+        return values, insureds
+
+    def parse(self, text: str, lines_of_business: Iterable[str] = ()) -> Application:
+        """fills an Application from the labelled values in ``text``
+
+        ``lines_of_business`` are the lines checked on the form, which the text
+        does not show; lines with a premium are added after them.
+        """
+        values, blocks = self.scan(text)
+        for field in NUMBER_FIELDS:
+            values[field] = to_number(values.get(field))
+        for field in INT_FIELDS:
+            values[field] = to_int(values.get(field))
+        premiums = {}
+        for field, value in values.items():
+            if field.startswith("premium."):
+                premium = to_number(value)
+                if premium is not None:
+                    premiums[field.removeprefix("premium.")] = premium
+        insureds = [
+            (
+                kind,
+                InsuredInfo(
+                    name=block["lines"][0] if block["lines"] else None,
+                    mailing_address=split_address(block["lines"][1:]),
+                    naics_code=block.get("naics_code"),
+                    sic_code=block.get("sic_code"),
+                    fein_or_ssn=block.get("fein_or_ssn"),
+                    website_address=block.get("website_address"),
+                ),
+            )
+            for kind, block in blocks
+        ]
+        first_named_insured = next(
+            (info for kind, info in insureds if kind == "first_named_insured"),
+            InsuredInfo(None, split_address([]), None, None, None, None),
+        )
+        phone_number = values.get("contact.phone_number")
+        agency_address = split_address([])
+        return Application(
+            agency=Agency(
+                agency_name=values.get("agency.agency_name"),
+                agency_code=values.get("agency.agency_code"),
+                contact_info=ContactInfo(
+                    full_name=values.get("contact.full_name"),
+                    first_name=None,
+                    last_name=None,
+                    phone_number=phone_number,
+                    phone_type="Work" if phone_number else None,
+                    fax_number=values.get("contact.fax_number"),
+                    email=values.get("contact.email"),
+                    mailing_address=agency_address,
+                    physical_address=agency_address,
+                ),
+                address=agency_address,
+                customer_id=values.get("agency.customer_id"),
+            ),
+            first_named_insured=first_named_insured,
+            additional_insureds=[
+                info for _, info in insureds if info is not first_named_insured
+            ],
+            policy_info=PolicyInfo(
+                proposed_eff_date=values.get("policy.proposed_eff_date"),
+                proposed_exp_date=values.get("policy.proposed_exp_date"),
+                lines_of_business=list(dict.fromkeys([*lines_of_business, *premiums])),
+                premium_details=premiums,
+            ),
+            business_info=BusinessInfo(
+                entity_type=entity_name(values.get("business.entity_type")),
+                number_of_members=values["business.number_of_members"],
+                description_of_operations=values.get(
+                    "business.description_of_operations"
+                ),
+                business_started_date=values.get("business.business_started_date"),
+                annual_revenue=values["business.annual_revenue"],
+                no_of_employees_fulltime=values["business.no_of_employees_fulltime"],
+                no_of_employees_parttime=values["business.no_of_employees_parttime"],
+            ),
+            coverages=[
+                Coverage(line_of_business=name, coverage_code=None, premium=premium)
+                for name, premium in premiums.items()
+            ],
+        )
+
+
+class ParserRegistry:
+    """Field parsers by template name, each compiled on first use"""
+
+    def __init__(self, path: Path = TEMPLATE_PATH):
+        self.path = Path(path)
+        self._parsers: dict[str, FieldParser] = {}
+        self._lock = Lock()
+
+    def get(self, name: str) -> FieldParser:
+        with self._lock:
+            parser = self._parsers.get(name)
+            if parser is None:
+                parser = FieldParser(load_labels(name, self.path))
+                self._parsers[name] = parser
+                logger.info(
+                    f"Compiled {name} field parser with {len(parser.fields)} labels"
+                )
+        return parser
+
+
+@process_wide
+def get_parsers() -> ParserRegistry:
+    """returns the process-wide parser registry, created on first use"""
+    return ParserRegistry()
+
+
+def get_parser(template: str = DEFAULT_TEMPLATE) -> FieldParser:
+    """returns the process-wide field parser of a template"""
+    return get_parsers().get(template)
+
+
+def parse_application(
+    text: str, lines_of_business: Iterable[str] = (), template: str = DEFAULT_TEMPLATE
+) -> Application:
+    """parses extracted text with the process-wide parser of ``template``"""
+    return get_parser(template).parse(text, lines_of_business)
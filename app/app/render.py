@@ -0,0 +1,38 @@
+"""Single-page rendering shared by OCR, template regions and checkboxes
+
+Pages are rendered with poppler through pdf2image, one page per call, and go
+through the raster cache when it is enabled, so every pass that needs the same
+page at the same resolution renders it only once.
+"""
+
+from pathlib import Path
+
+from pdf2image import convert_from_path
+from PIL import Image
+
+from app.cache import file_digest, get_raster_cache
+
+# pdf2image's default render resolution, used for whole-page OCR
+OCR_DPI = 200
+
+
+def render_page(
+    pdf_path: Path, page_number: int, dpi: int = OCR_DPI, colorspace: str = "L"
+) -> Image.Image:
+    """renders a single (1-indexed) page, reusing the raster cache when enabled"""
+    cache = get_raster_cache()
+    digest = file_digest(pdf_path) if cache is not None else None
+    if digest is not None:
+        image = cache.get(digest, page_number, dpi, colorspace)
+        if image is not None:
+            return image
+    image = convert_from_path(
+        pdf_path,
+        dpi=dpi,
+        first_page=page_number,
+        last_page=page_number,
+        grayscale=colorspace == "L",
+    )[0]
+    if digest is not None:
+        cache.set(digest, page_number, dpi, colorspace, image)
+    return image
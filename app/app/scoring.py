@@ -0,0 +1,255 @@
+"""Columnar, field-level scoring of extracted records against expected ones
+
+Records are flattened to one row per document and one column per field
+path, so every metric is a whole-array operation over the document set
+instead of a Python loop per record. Flattening is the one per-record step;
+evaluation does it on its workers, next to extraction, and scores the
+flattened fields. Edit similarity, the only metric that
+needs per-pair work, is computed once per distinct mismatched pair with a
+Levenshtein recurrence vectorized across pairs: each step fills one row of
+the edit table for a whole chunk of length-sorted pairs at once.
+"""
+
+from collections.abc import Iterable, Sequence
+
+from numpy import (
+    arange,
+    argsort,
+    asarray,
+    broadcast_to,
+    cumsum,
+    empty,
+    float64,
+    frombuffer,
+    int32,
+    maximum,
+    minimum,
+    ones,
+    percentile,
+    repeat,
+    uint32,
+    where,
+    zeros,
+)
+from numpy.typing import NDArray
+from pandas import DataFrame, MultiIndex, isna
+
+from app.__init__ import getLogger
+
+logger = getLogger(__name__)
+
+# Distinct mismatched pairs whose edit distance is computed together
+EDIT_CHUNK_SIZE = 2048
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+SCORE_COLUMNS = [
+    "support",
+    "extracted",
+    "matched",
+    "exact_match",
+    "similarity",
+    "precision",
+    "recall",
+    "f1",
+]
+
+
+def flatten_record(record, prefix: str = "") -> dict:
+    """returns the leaf values of a nested record keyed by path, e.g.
+    ``agency.address.city`` or ``additional_insureds[0].name``"""
+    if isinstance(record, dict):
+        items = (
+            (f"{prefix}.{key}" if prefix else str(key), value)
+            for key, value in record.items()
+        )
+    elif isinstance(record, list):
+        items = ((f"{prefix}[{n}]", value) for n, value in enumerate(record))
+    else:
+        return {prefix: record}
+    leaves = {}
+    for path, value in items:
+        leaves.update(flatten_record(value, path))
+    return leaves
+
+
+def normalize_value(value) -> str | None:
+    """returns a field value as the string it is compared by, None if empty;
+    whole floats compare equal to ints so 1200.0 matches 1200"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def record_fields(record: dict) -> dict[str, str]:
+    """returns the non-empty leaf fields of a nested record by path, with
+    values normalized for comparison"""
+    fields = {}
+    for path, value in flatten_record(record).items():
+        normalized = normalize_value(value)
+        if normalized is not None:
+            fields[path] = normalized
+    return fields
+
+
+def fields_frame(rows: Iterable[dict[str, str]]) -> DataFrame:
+    """returns one row per ``record_fields`` dict and one column per field
+    path, missing where the record left the field empty"""
+    return DataFrame(list(rows), dtype=object)
+
+
+def encode(strings: Sequence[str]) -> tuple[NDArray, NDArray]:
+    """returns the code points of ``strings`` as a zero-padded 2D array and
+    their lengths"""
+    lengths = asarray([len(string) for string in strings], dtype=int32)
+    codes = zeros((len(strings), max(lengths.max(initial=0), 1)), dtype=uint32)
+    points = frombuffer("".join(strings).encode("utf-32-le"), dtype=uint32)
+    rows = repeat(arange(len(strings)), lengths)
+    starts = cumsum(lengths) - lengths
+    codes[rows, arange(len(points)) - repeat(starts, lengths)] = points
+    return codes, lengths
+
+
+def edit_distances(a: Sequence[str], b: Sequence[str]) -> NDArray:
+    """returns the Levenshtein distance of each ``(a[n], b[n])`` pair
+
+    Row ``i`` of every pair's edit table is computed at once; insertions,
+    which chain along a row, are resolved with a running minimum. Each pair
+    takes its distance from the row of its own length, so padding never
+    reaches the result.
+    """
+    a_codes, a_lengths = encode(a)
+    b_codes, b_lengths = encode(b)
+    rows = arange(len(a))
+    steps = arange(b_codes.shape[1] + 1, dtype=int32)
+    previous = broadcast_to(steps, (len(a), len(steps))).copy()
+    distances = previous[rows, b_lengths]
+    for i in range(1, a_lengths.max(initial=0) + 1):
+        cost = a_codes[:, i - 1, None] != b_codes
+        current = empty((len(a), len(steps)), dtype=int32)
+        current[:, 0] = i
+        current[:, 1:] = minimum(previous[:, :-1] + cost, previous[:, 1:] + 1)
+        current = minimum.accumulate(current - steps, axis=1) + steps
+        done = a_lengths == i
+        distances[done] = current[done, b_lengths[done]]
+        previous = current
+    return distances
+
+
+def edit_similarity(a: Sequence[str], b: Sequence[str]) -> NDArray:
+    """returns ``1 - distance / longer length`` for each pair, computing
+    each distinct pair once in chunks of similar length"""
+    if not len(a):
+        return empty(0, dtype=float64)
+    codes, uniques = MultiIndex.from_arrays([asarray(a), asarray(b)]).factorize()
+    left = list(uniques.get_level_values(0))
+    right = list(uniques.get_level_values(1))
+    longest = maximum(asarray([len(s) for s in left]), asarray([len(s) for s in right]))
+    similarity = ones(len(left), dtype=float64)
+    order = argsort(longest, kind="stable")
+    for start in range(0, len(order), EDIT_CHUNK_SIZE):
+        chunk = order[start : start + EDIT_CHUNK_SIZE]
+        distances = edit_distances([left[n] for n in chunk], [right[n] for n in chunk])
+        similarity[chunk] = where(
+            longest[chunk] > 0, 1 - distances / maximum(longest[chunk], 1), 1.0
+        )
+    return similarity[codes]
+
+
+def score_fields(expected: DataFrame, extracted: DataFrame) -> DataFrame:
+    """returns per-field scores of ``extracted`` against the ``expected``
+    row at the same position, with no fields when there are no rows
+
+    ``support`` and ``extracted`` count documents with a value for the field
+    and ``matched`` those whose extracted value equals the expected one.
+    Exact match and similarity count a field left empty on both sides as
+    correct; precision and recall only count extracted values equal to
+    expected ones.
+    """
+    if not len(expected):
+        return DataFrame(columns=SCORE_COLUMNS)
+    columns = expected.columns.union(extracted.columns, sort=True)
+    truth = expected.reindex(columns=columns).to_numpy(dtype=object)
+    found = (
+        extracted.reindex(columns=columns)
+        .reindex(range(len(expected)))
+        .to_numpy(dtype=object)
+    )
+    has_truth, has_found = ~isna(truth), ~isna(found)
+    both = has_truth & has_found
+    equal = both & (truth == found)
+    correct = equal | (~has_truth & ~has_found)
+
+    similarity = correct.astype(float64)
+    mismatched = both & ~equal
+    similarity[mismatched] = edit_similarity(truth[mismatched], found[mismatched])
+
+    support, extracted_count, true_positives = (
+        has_truth.sum(axis=0),
+        has_found.sum(axis=0),
+        equal.sum(axis=0),
+    )
+    precision = true_positives / maximum(extracted_count, 1)
+    recall = true_positives / maximum(support, 1)
+    return DataFrame(
+        {
+            "support": support,
+            "extracted": extracted_count,
+            "matched": true_positives,
+            "exact_match": correct.mean(axis=0),
+            "similarity": similarity.mean(axis=0),
+            "precision": precision,
+            "recall": recall,
+            "f1": 2 * precision * recall / maximum(precision + recall, 1e-12),
+        },
+        index=columns,
+    )
+
+
+def latency_percentiles(
+    seconds: Iterable[float], percentiles: Sequence[int] = LATENCY_PERCENTILES
+) -> dict:
+    """returns ``seconds_p<N>`` for each percentile of the latencies"""
+    seconds = asarray(list(seconds), dtype=float64)
+    if not len(seconds):
+        return {}
+    values = percentile(seconds, percentiles)
+    return {
+        f"seconds_p{p}": float(value)
+        for p, value in zip(percentiles, values, strict=True)
+    }
+
+
+def summarize(fields: DataFrame) -> dict:
+    """returns document-set metrics from per-field scores, micro-averaged
+    over every field value"""
+    if fields.empty:
+        return {}
+    support = int(fields["support"].sum())
+    extracted = int(fields["extracted"].sum())
+    true_positives = int(fields["matched"].sum())
+    precision = true_positives / extracted if extracted else 0.0
+    recall = true_positives / support if support else 0.0
+    return {
+        "exact_match": float(fields["exact_match"].mean()),
+        "similarity": float(fields["similarity"].mean()),
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall)
+        if precision + recall
+        else 0.0,
+    }
+
+
+def score_records(
+    expected: Iterable[dict[str, str]],
+    extracted: Iterable[dict[str, str]],
+    seconds: Iterable[float] = (),
+) -> tuple[DataFrame, dict]:
+    """scores ``record_fields`` dicts of extracted records against those of
+    expected ones, in the same order, and returns the per-field scores and
+    the document-set metrics"""
+    expected = fields_frame(expected)
+    fields = score_fields(expected, fields_frame(extracted))
+    logger.info(f"Scored {len(expected)} documents on {len(fields)} fields")
+    return fields, {**summarize(fields), **latency_percentiles(seconds)}
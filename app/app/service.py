@@ -0,0 +1,328 @@
+"""Async front end that the API endpoints use to run extractions
+
+Uploads are streamed to temporary files in chunks while being hashed, and the
+CPU-bound extraction runs on the extraction engine's worker processes so the
+event loop only ever awaits. A bounded number of requests is admitted at a
+time; beyond that callers are told to retry later.
+"""
+
+from asyncio import as_completed, ensure_future
+from collections.abc import AsyncIterator, Callable
+from contextlib import contextmanager
+from dataclasses import asdict
+from hashlib import sha256
+from os import unlink
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+
+from app.__init__ import (
+    ACROFORM_FAST_PATH,
+    CHECKBOX_FILL_RATIO,
+    EXTRACTION_MODE,
+    EXTRACTION_QUEUE_DEPTH,
+    EXTRACTION_RETRY_AFTER,
+    PAGE_CLASSIFIER,
+    TEMPLATE_OCR_DPI,
+    getLogger,
+)
+from app.acroform import extract_form_data
+from app.cache import ExtractionCache, digest_cache_key, get_cache
+from app.classify import classify_pdf, document_template
+from app.data_model import ExtractionReport, PageResult
+from app.engine import ExtractionEngine, get_engine
+from app.extract import (
+    EXTRACTOR_VERSION,
+    add_checked_lines,
+    extract_document,
+    extract_image_data,
+    extract_page,
+    extraction_config,
+    open_pdf,
+)
+from app.singleflight import SingleFlight, get_single_flight
+from app.templates import extract_template_fields, get_registry
+
+logger = getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 2**20
+
+
+def count_pages(pdf_path: Path) -> int:
+    """returns the number of pages in a PDF file using its pdfplumber index"""
+    with open_pdf(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_classified(pdf_path: Path, mode: str) -> str | dict:
+    """extracts a PDF after tagging its pages with known templates
+
+    Documents whose pages all match one registered template are read from
+    their AcroForm fields when filled, otherwise by OCRing the template's field
+    regions. Other documents go through ``extract_document`` without their
+    blank pages.
+    """
+    classes = classify_pdf(pdf_path)
+    template = document_template(classes)
+    if template in get_registry().names():
+        application = extract_form_data(pdf_path) if ACROFORM_FAST_PATH else None
+        if application is not None:
+            return application
+        return extract_template_fields(pdf_path, template, workers=1)
+    skip_pages = [page.page_number for page in classes if page.template == "blank"]
+    return extract_document(pdf_path, False, mode, skip_pages)
+
+
+class ExtractionSaturated(Exception):
+    """Raised when the extraction queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Extraction queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ExtractionService:
+    """Admission control, upload spooling and CPU offload for extraction requests"""
+
+    def __init__(
+        self,
+        engine: ExtractionEngine | None = None,
+        cache: ExtractionCache | None = None,
+        single_flight: SingleFlight | None = None,
+        max_pending: int = EXTRACTION_QUEUE_DEPTH,
+        retry_after: int = EXTRACTION_RETRY_AFTER,
+        mode: str = EXTRACTION_MODE,
+    ):
+        self._engine = engine
+        self._cache = cache
+        self._single_flight = single_flight
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.mode = mode
+        self.pending = 0
+        self.counters = {"admitted": 0, "rejected": 0}
+
+    @property
+    def engine(self) -> ExtractionEngine:
+        return self._engine or get_engine()
+
+    @property
+    def cache(self) -> ExtractionCache:
+        return self._cache or get_cache()
+
+    @property
+    def single_flight(self) -> SingleFlight:
+        return self._single_flight or get_single_flight()
+
+    def reserve(self):
+        """reserves a queue slot for the request or raises ExtractionSaturated
+
+        Only called from the event loop, so the counter needs no lock.
+        """
+        if self.pending >= self.max_pending:
+            self.counters["rejected"] += 1
+            raise ExtractionSaturated(self.retry_after)
+        self.pending += 1
+        self.counters["admitted"] += 1
+
+    def release(self):
+        self.pending -= 1
+
+    @contextmanager
+    def admit(self):
+        """holds a queue slot for the duration of the block"""
+        self.reserve()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def spool(
+        self, upload: UploadFile, suffix: str, path: Path | None = None
+    ) -> tuple[Path, str]:
+        """streams an upload to ``path`` (a temporary file by default) and returns
+        the path and the content hash"""
+        digest = sha256()
+        if path is None:
+            file = NamedTemporaryFile(suffix=suffix, delete=False)
+        else:
+            file = open(path, "wb")
+        with file:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                await run_in_threadpool(file.write, chunk)
+        return Path(file.name), digest.hexdigest()
+
+    def _run(self, key: str, func: Callable, *args) -> str | dict:
+        result = self.engine.submit(func, *args).get()
+        self.cache.set(key, result)
+        return result
+
+    def _run_sharded(self, key: str, func: Callable, *args) -> str | dict:
+        # func shards its own work across the engine from this thread
+        result = func(*args, engine=self.engine)
+        self.cache.set(key, result)
+        return result
+
+    def _pdf_key(self, digest: str, output: str) -> str:
+        """returns the cache key of a PDF result; ``output`` names the kind of
+        result, so endpoints returning different kinds never share entries"""
+        config = extraction_config(self.mode) | {"output": output}
+        return digest_cache_key(digest, EXTRACTOR_VERSION, config)
+
+    def _extract(
+        self, key: str, func: Callable, *args, sharded: bool = False
+    ) -> str | dict:
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info(f"Extraction cache hit: {key}")
+            return cached
+        run = self._run_sharded if sharded else self._run
+        return self.single_flight.do(key, run, key, func, *args)
+
+    async def extract_path(self, path: Path, digest: str, kind: str) -> str | dict:
+        """extracts text from a PDF or image file on disk off the event loop
+
+        Filled fillable PDFs return their ``Application`` dict instead, and with
+        the page classifier on, documents matching a template return its fields.
+        """
+        if kind == "pdf":
+            if PAGE_CLASSIFIER:
+                key = self._pdf_key(digest, "classified")
+                func, args = extract_classified, (path, self.mode)
+            else:
+                key = self._pdf_key(digest, "document")
+                # Worker processes cannot start children, so run single-process
+                func, args = extract_document, (path, False, self.mode)
+        else:
+            key = digest_cache_key(digest, EXTRACTOR_VERSION, {"mode": "image"})
+            func, args = extract_image_data, (path,)
+        return await run_in_threadpool(self._extract, key, func, *args)
+
+    async def extract(self, upload: UploadFile, kind: str) -> dict:
+        """extracts text from an uploaded PDF or image off the event loop"""
+        suffix = ".pdf" if kind == "pdf" else Path(upload.filename or "").suffix
+        path, digest = await self.spool(upload, suffix)
+        try:
+            content = await self.extract_path(path, digest, kind)
+        finally:
+            unlink(path)
+        return {"filename": upload.filename, "sha256": digest, "content": content}
+
+    async def extract_template(self, upload: UploadFile, template: str) -> dict:
+        """OCRs only the field regions of a known form template in an uploaded PDF
+
+        Raises KeyError for an unregistered template.
+        """
+        layout = get_registry().get(template)
+        config = {
+            "mode": "template",
+            "layout": layout.to_dict(),
+            "dpi": TEMPLATE_OCR_DPI,
+            "checkbox_fill_ratio": CHECKBOX_FILL_RATIO,
+        }
+        path, digest = await self.spool(upload, ".pdf")
+        try:
+            key = digest_cache_key(digest, EXTRACTOR_VERSION, config)
+            fields = await run_in_threadpool(
+                self._extract, key, extract_template_fields, path, layout, sharded=True
+            )
+        finally:
+            unlink(path)
+        return {
+            "filename": upload.filename,
+            "sha256": digest,
+            "template": template,
+            "fields": fields,
+        }
+
+    async def stream_pdf(self, path: Path, digest: str) -> AsyncIterator[dict]:
+        """yields each page's result as soon as it is extracted, then a summary
+
+        Pages are extracted in parallel on the engine and arrive in completion
+        order, so ``page_number`` says where each belongs. A filled fillable PDF
+        yields one "form" event with its ``Application`` dict instead of pages.
+        With the page classifier on, blank pages are reported as skipped rather
+        than extracted. Unless the classifier is on, when ``extract_path``
+        returns template fields instead, the form dict and the joined "route"
+        mode text, with checked lines of business added as ``extract_document``
+        adds them, are cached as ``extract_path``'s result. The caller must have
+        reserved a queue slot, which is released when the stream ends.
+        """
+        start = perf_counter()
+        pages = []
+        try:
+            page_count = await run_in_threadpool(count_pages, path)
+            if ACROFORM_FAST_PATH:
+                application = await self.engine.run(extract_form_data, path)
+                if application is not None:
+                    if not PAGE_CLASSIFIER:
+                        key = self._pdf_key(digest, "document")
+                        await run_in_threadpool(self.cache.set, key, application)
+                    yield {
+                        "event": "form",
+                        "application": application,
+                        "elapsed": perf_counter() - start,
+                    }
+                    yield {
+                        "event": "done",
+                        "pages": page_count,
+                        "method_counts": {"acroform": page_count},
+                        "elapsed": perf_counter() - start,
+                    }
+                    return
+            skip_pages = set()
+            if PAGE_CLASSIFIER:
+                classes = await self.engine.run(classify_pdf, path)
+                skip_pages = {
+                    page.page_number for page in classes if page.template == "blank"
+                }
+                for number in sorted(skip_pages):
+                    page = PageResult(number, "", "skipped")
+                    pages.append(page)
+                    yield {"event": "page", "elapsed": perf_counter() - start} | asdict(
+                        page
+                    )
+            tasks = [
+                ensure_future(self.engine.run(extract_page, path, number, self.mode))
+                for number in range(1, page_count + 1)
+                if number not in skip_pages
+            ]
+            try:
+                for task in as_completed(tasks):
+                    page = await task
+                    pages.append(page)
+                    yield {"event": "page", "elapsed": perf_counter() - start} | asdict(
+                        page
+                    )
+            finally:
+                for task in tasks:
+                    task.cancel()
+            report = ExtractionReport(sorted(pages, key=lambda page: page.page_number))
+            if self.mode == "route" and not PAGE_CLASSIFIER:
+                key = self._pdf_key(digest, "document")
+                result = await run_in_threadpool(add_checked_lines, path, report.text)
+                await run_in_threadpool(self.cache.set, key, result)
+            yield {
+                "event": "done",
+                "pages": len(pages),
+                "method_counts": report.method_counts,
+                "elapsed": perf_counter() - start,
+            }
+        except Exception as e:
+            logger.warning(f"Streaming extraction of {path} failed: {e}")
+            yield {"event": "error", "detail": str(e), "pages": len(pages)}
+        finally:
+            unlink(path)
+            self.release()
+
+    def stats(self) -> dict:
+        """returns queue depth and admission counters"""
+        return {
+            **self.counters,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+        }
@@ -0,0 +1,68 @@
+"""In-flight deduplication of concurrent identical extraction requests
+
+Concurrent callers with the same key share one computation: the first caller
+runs it and every caller that arrives while it is running waits for, and
+receives, the same result. Nothing is kept once the computation finishes;
+that is the job of ``app.cache``.
+"""
+
+from collections.abc import Callable
+from concurrent.futures import Future
+from threading import Lock
+
+from app.__init__ import getLogger
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+
+class SingleFlight:
+    """Group of keyed computations where each key runs at most once at a time"""
+
+    def __init__(self):
+        self._calls: dict[str, Future] = {}
+        self._lock = Lock()
+        self.counters = {"executed": 0, "coalesced": 0}
+
+    def do(self, key: str, func: Callable, *args, **kwargs):
+        """runs ``func(*args, **kwargs)`` unless a call for ``key`` is already
+        in flight, in which case waits for that call and returns its result"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.counters["executed"] += 1
+            else:
+                self.counters["coalesced"] += 1
+        if not leader:
+            logger.info(f"Coalescing request onto in-flight extraction: {key}")
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        """returns the number of computations currently running"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        """returns how many requests ran and how many were coalesced"""
+        with self._lock:
+            return {**self.counters, "in_flight": len(self._calls)}
+
+
+@process_wide
+def get_single_flight() -> SingleFlight:
+    """returns the process-wide single-flight group, creating it on first use"""
+    return SingleFlight()
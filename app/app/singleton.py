@@ -0,0 +1,37 @@
+"""Lazily built, process-wide objects shared by every caller"""
+
+from collections.abc import Callable
+from functools import update_wrapper
+from threading import Lock
+
+
+class ProcessWide:
+    """Factory wrapper that builds its object once per process, on first call
+
+    Every later call returns the same object. Unlike ``functools.cache``, the
+    factory runs under a lock, so concurrent first calls cannot build two
+    objects (e.g. two worker pools).
+    """
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._instance = None
+        self._lock = Lock()
+        update_wrapper(self, factory)
+
+    def __call__(self):
+        with self._lock:
+            if self._instance is None:
+                self._instance = self._factory()
+            return self._instance
+
+    def clear(self):
+        """forgets the object and returns it, None if it was never built"""
+        with self._lock:
+            instance, self._instance = self._instance, None
+        return instance
+
+
+def process_wide(factory: Callable) -> ProcessWide:
+    """decorates a factory of a process-wide object created on first use"""
+    return ProcessWide(factory)
@@ -0,0 +1,450 @@
+"""Template-driven region OCR for known form layouts
+
+A template pairs a JSON schema in ``store/templates`` with a layout index that
+maps each schema field to a page and bounding box on the form. Extraction
+renders only the pages that hold fields and OCRs only the field boxes, one
+page per worker, then assembles the text into a dict shaped like the schema.
+Checkbox regions are read from their ink coverage instead of OCR.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable, Collection
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import pairwise, repeat
+from json import dumps, loads
+from multiprocessing import current_process, get_context
+from pathlib import Path
+from threading import Lock
+
+from pdfplumber import open as open_pdf
+from pytesseract import image_to_string
+
+from app.__init__ import (
+    MP_START_METHOD,
+    OCR_WORKERS,
+    TEMPLATE_OCR_DPI,
+    TEMPLATE_PATH,
+    getLogger,
+)
+from app.acroform import (
+    LEGAL_ENTITIES,
+    LINES_OF_BUSINESS,
+    read_form_widgets,
+    to_int,
+    to_number,
+)
+from app.checkboxes import detect_checkboxes
+from app.classify import classify_pdf
+from app.data_model import FieldRegion
+from app.engine import ExtractionEngine
+from app.render import render_page
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+# Tesseract page segmentation mode 6: a single uniform block of text
+REGION_OCR_CONFIG = "--psm 6"
+# Tesseract runs as a subprocess, so a page's regions are OCRed on threads
+REGION_OCR_THREADS = 4
+LAYOUT_SUFFIX = "_layout.json"
+# The ACORD 125 template and its line of business checkbox field
+CA_APP = "ca_app"
+LINES_OF_BUSINESS_PATH = "PolicyInformation.LinesOfBusiness"
+
+# ACORD AcroForm fields that locate each ca_app_template.json field. The
+# ACORD_CA_APP.pdf form has no vehicle or driver schedule, so those fields
+# have no region.
+CA_APP_FIELDS = {
+    "ApplicantInformation.BusinessName": "NamedInsured_FullName_A",
+    "ApplicantInformation.Address.Street": "NamedInsured_MailingAddress_LineOne_A",
+    "ApplicantInformation.Address.City": "NamedInsured_MailingAddress_CityName_A",
+    "ApplicantInformation.Address.State": (
+        "NamedInsured_MailingAddress_StateOrProvinceCode_A"
+    ),
+    "ApplicantInformation.Address.ZipCode": "NamedInsured_MailingAddress_PostalCode_A",
+    "ApplicantInformation.NAICS": "NamedInsured_NAICSCode_A",
+    "ApplicantInformation.SICCode": "NamedInsured_SICCode_A",
+    "ApplicantInformation.FEIN": "NamedInsured_TaxIdentifier_A",
+    "PolicyInformation.PolicyNumber": "Policy_PolicyNumberIdentifier_A",
+    "PolicyInformation.EffectiveDate": "Policy_EffectiveDate_A",
+    "PolicyInformation.ExpirationDate": "Policy_ExpirationDate_A",
+    "CoverageDetails.Liability": "GeneralLiabilityLineOfBusiness_TotalPremiumAmount_A",
+}
+# ACORD checkboxes and the (field path, value) each sets when checked. Boxes
+# for an array field each add their value, the others act as a radio group.
+CA_APP_CHECKBOXES = {
+    **{
+        indicator: (LINES_OF_BUSINESS_PATH, name)
+        for name, indicator, _ in LINES_OF_BUSINESS
+    },
+    **{
+        f"NamedInsured_LegalEntity_{indicator}_A": (
+            "ApplicantInformation.EntityType",
+            name,
+        )
+        for name, indicator in LEGAL_ENTITIES
+    },
+}
+
+
+class TemplateLayout:
+    """Field regions of one form template, indexed by page"""
+
+    def __init__(
+        self,
+        name: str,
+        regions: list[FieldRegion],
+        page_sizes: dict[int, tuple[float, float]],
+        schema: dict | None = None,
+        checkboxes: list[FieldRegion] | None = None,
+    ):
+        self.name = name
+        self.regions = regions
+        self.page_sizes = page_sizes
+        self.schema = schema or {}
+        self.checkboxes = checkboxes or []
+        self.index = defaultdict(list)
+        for region in regions:
+            self.index[region.page_number].append(region)
+        self.checkbox_index = defaultdict(list)
+        for checkbox in self.checkboxes:
+            self.checkbox_index[checkbox.page_number].append(checkbox)
+
+    @property
+    def pages(self) -> list[int]:
+        return sorted(self.index)
+
+    @property
+    def checkbox_pages(self) -> list[int]:
+        return sorted(self.checkbox_index)
+
+    def regions_on_page(self, page_number: int) -> list[FieldRegion]:
+        return self.index.get(page_number, [])
+
+    def checkboxes_on_page(self, page_number: int) -> list[FieldRegion]:
+        return self.checkbox_index.get(page_number, [])
+
+    def ocr_area_ratio(self) -> float:
+        """returns the share of the form's page area that is OCRed"""
+        page_area = sum(width * height for width, height in self.page_sizes.values())
+        region_area = sum(
+            (x1 - x0) * (bottom - top)
+            for x0, top, x1, bottom in (region.bbox for region in self.regions)
+        )
+        return region_area / page_area if page_area else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "page_sizes": {str(page): size for page, size in self.page_sizes.items()},
+            "regions": [
+                {
+                    "path": region.path,
+                    "page_number": region.page_number,
+                    "bbox": list(region.bbox),
+                    "source": region.source,
+                }
+                for region in self.regions
+            ],
+            "checkboxes": [
+                {
+                    "path": checkbox.path,
+                    "page_number": checkbox.page_number,
+                    "bbox": list(checkbox.bbox),
+                    "source": checkbox.source,
+                    "value": checkbox.value,
+                }
+                for checkbox in self.checkboxes
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, schema: dict | None = None) -> "TemplateLayout":
+        return cls(
+            name=data["name"],
+            regions=[
+                FieldRegion(
+                    path=region["path"],
+                    page_number=region["page_number"],
+                    bbox=tuple(region["bbox"]),
+                    source=region.get("source"),
+                )
+                for region in data["regions"]
+            ],
+            page_sizes={
+                int(page): tuple(size) for page, size in data["page_sizes"].items()
+            },
+            schema=schema,
+            checkboxes=[
+                FieldRegion(
+                    path=checkbox["path"],
+                    page_number=checkbox["page_number"],
+                    bbox=tuple(checkbox["bbox"]),
+                    source=checkbox.get("source"),
+                    value=checkbox["value"],
+                )
+                for checkbox in data.get("checkboxes", [])
+            ],
+        )
+
+    @classmethod
+    def from_form(
+        cls,
+        name: str,
+        pdf_path: Path,
+        field_map: dict[str, str],
+        schema: dict | None = None,
+        checkbox_map: dict[str, tuple[str, str]] | None = None,
+    ) -> "TemplateLayout":
+        """builds a layout from the widget boxes of a fillable copy of the form
+
+        ``field_map`` maps schema field paths to AcroForm field names and
+        ``checkbox_map`` maps AcroForm checkbox names to the schema field path
+        and value they set.
+        """
+        checkbox_map = checkbox_map or {}
+        widgets = read_form_widgets(pdf_path)
+        missing = [
+            source
+            for source in [*field_map.values(), *checkbox_map]
+            if source not in widgets
+        ]
+        if missing:
+            raise ValueError(f"Form fields not found in {pdf_path}: {missing}")
+        regions = [
+            FieldRegion(path, *widgets[source], source=source)
+            for path, source in field_map.items()
+        ]
+        checkboxes = [
+            FieldRegion(path, *widgets[source], source=source, value=value)
+            for source, (path, value) in checkbox_map.items()
+        ]
+        with open_pdf(pdf_path) as pdf:
+            page_sizes = {
+                page.page_number: (page.width, page.height) for page in pdf.pages
+            }
+        return cls(name, regions, page_sizes, schema, checkboxes)
+
+
+class TemplateRegistry:
+    """Named template layouts, loaded from ``*_layout.json`` files"""
+
+    def __init__(self, path: Path = TEMPLATE_PATH):
+        self.path = Path(path)
+        self._layouts: dict[str, TemplateLayout] = {}
+        self._lock = Lock()
+        for layout_path in sorted(self.path.glob(f"*{LAYOUT_SUFFIX}")):
+            self._load(layout_path)
+
+    def _load(self, layout_path: Path):
+        name = layout_path.name.removesuffix(LAYOUT_SUFFIX)
+        schema_path = self.path / f"{name}_template.json"
+        schema = loads(schema_path.read_text()) if schema_path.exists() else None
+        layout = TemplateLayout.from_dict(loads(layout_path.read_text()), schema)
+        self._layouts[layout.name] = layout
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return sorted(self._layouts)
+
+    def get(self, name: str) -> TemplateLayout:
+        with self._lock:
+            layout = self._layouts.get(name)
+        if layout is None:
+            raise KeyError(f"Unknown template: {name}")
+        return layout
+
+    def register(self, layout: TemplateLayout, save: bool = False):
+        """adds a layout, replacing any with the same name, and optionally
+        writes it next to the schemas so it is loaded on restart"""
+        with self._lock:
+            self._layouts[layout.name] = layout
+        if save:
+            layout_path = self.path / f"{layout.name}{LAYOUT_SUFFIX}"
+            layout_path.write_text(dumps(layout.to_dict(), indent=2) + "\n")
+        logger.info(
+            f"Registered template {layout.name}: {len(layout.regions)} fields and "
+            f"{len(layout.checkboxes)} checkboxes on {len(layout.pages)} pages "
+            f"({layout.ocr_area_ratio():.1%} of page area)"
+        )
+
+
+@process_wide
+def get_registry() -> TemplateRegistry:
+    """returns the process-wide template registry, loading it on first use"""
+    return TemplateRegistry()
+
+
+def ocr_regions(
+    pdf_path: Path, page_number: int, bboxes: list[tuple], dpi: int = TEMPLATE_OCR_DPI
+) -> list[str]:
+    """renders one (1-indexed) page and OCRs only the given boxes on it"""
+    scale = dpi / 72
+    image = render_page(pdf_path, page_number, dpi)
+    crops = [
+        image.crop(tuple(round(point * scale) for point in bbox)) for bbox in bboxes
+    ]
+    with ThreadPoolExecutor(max_workers=REGION_OCR_THREADS) as executor:
+        texts = executor.map(
+            lambda crop: image_to_string(crop, config=REGION_OCR_CONFIG), crops
+        )
+        return [text.strip() for text in texts]
+
+
+def schema_type(schema: dict, parts: list[str]) -> str | None:
+    """returns the JSON schema type of the field at ``parts``"""
+    for part in parts:
+        if part.isdigit():
+            schema = schema.get("items", {})
+        else:
+            schema = schema.get("properties", {}).get(part, {})
+    return schema.get("type")
+
+
+def coerce(value: str, field_type: str | None):
+    if not value:
+        return None
+    if field_type == "integer":
+        return to_int(value)
+    if field_type == "number":
+        return to_number(value)
+    return value
+
+
+def set_path(result: dict, parts: list[str], value):
+    """sets ``value`` in nested dicts, with numeric parts indexing lists"""
+    keys = [int(part) if part.isdigit() else part for part in parts]
+    target = result
+    for key, next_key in pairwise(keys):
+        if isinstance(key, int):
+            target.extend([None] * (key + 1 - len(target)))
+            current = target[key]
+        else:
+            current = target.get(key)
+        if current is None:
+            current = target[key] = [] if isinstance(next_key, int) else {}
+        target = current
+    if isinstance(keys[-1], int):
+        target.extend([None] * (keys[-1] + 1 - len(target)))
+    target[keys[-1]] = value
+
+
+def map_pages(
+    func: Callable,
+    pdf_path: Path,
+    pages: list[int],
+    bboxes: list[list[tuple]],
+    workers: int = OCR_WORKERS,
+    engine: ExtractionEngine | None = None,
+) -> list:
+    """calls ``func(pdf_path, page, boxes)`` for each page, one page per worker"""
+    workers = min(workers, len(pages))
+    if engine is not None:
+        return engine.map(func, repeat(pdf_path, len(pages)), pages, bboxes)
+    if workers <= 1 or current_process().daemon:
+        return [
+            func(pdf_path, page, boxes)
+            for page, boxes in zip(pages, bboxes, strict=True)
+        ]
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=get_context(MP_START_METHOD)
+    ) as executor:
+        return list(executor.map(func, repeat(pdf_path), pages, bboxes))
+
+
+def extract_template_fields(
+    pdf_path: Path,
+    layout: TemplateLayout | str,
+    workers: int = OCR_WORKERS,
+    engine: ExtractionEngine | None = None,
+) -> dict:
+    """OCRs a form's field regions and reads its checkboxes, one page per
+    worker, into a dict shaped like the template schema"""
+    if isinstance(layout, str):
+        layout = get_registry().get(layout)
+    pages = layout.pages
+    bboxes = [
+        [region.bbox for region in layout.regions_on_page(page)] for page in pages
+    ]
+    logger.info(
+        f"OCRing {len(layout.regions)} {layout.name} regions on {len(pages)} pages "
+        f"({layout.ocr_area_ratio():.1%} of page area)"
+    )
+    texts = map_pages(ocr_regions, pdf_path, pages, bboxes, workers, engine)
+    result = {}
+    for page, page_texts in zip(pages, texts, strict=True):
+        for region, text in zip(layout.regions_on_page(page), page_texts, strict=True):
+            parts = region.path.split(".")
+            set_path(result, parts, coerce(text, schema_type(layout.schema, parts)))
+    for path, value in read_checkboxes(pdf_path, layout, workers, engine).items():
+        set_path(result, path.split("."), value)
+    return result
+
+
+def read_checkboxes(
+    pdf_path: Path,
+    layout: TemplateLayout,
+    workers: int = OCR_WORKERS,
+    engine: ExtractionEngine | None = None,
+    pages: dict[int, int] | None = None,
+) -> dict:
+    """reads a form's checkboxes, one page per worker, into the value of each
+    checkbox field by its path
+
+    ``pages`` maps the template pages to read onto the document pages that
+    hold them; by default every checkbox page is read in place. Array fields
+    take the values of all their checked boxes, the others the first one.
+    """
+    if pages is None:
+        pages = {page: page for page in layout.checkbox_pages}
+    template_pages = [page for page in layout.checkbox_pages if page in pages]
+    bboxes = [
+        [checkbox.bbox for checkbox in layout.checkboxes_on_page(page)]
+        for page in template_pages
+    ]
+    document_pages = [pages[page] for page in template_pages]
+    marks = map_pages(
+        detect_checkboxes, pdf_path, document_pages, bboxes, workers, engine
+    )
+    selected = defaultdict(list)
+    for page, page_marks in zip(template_pages, marks, strict=True):
+        boxes = layout.checkboxes_on_page(page)
+        for checkbox, mark in zip(boxes, page_marks, strict=True):
+            values = selected[checkbox.path]
+            if mark:
+                values.append(checkbox.value)
+    checked = {}
+    for path, values in selected.items():
+        if schema_type(layout.schema, path.split(".")) == "array":
+            checked[path] = values
+        else:
+            checked[path] = values[0] if values else None
+    return checked
+
+
+def read_lines_of_business(
+    pdf_path: Path, skip_pages: Collection[int] = ()
+) -> list[str] | None:
+    """returns the checked line of business boxes on a PDF's ACORD 125 pages,
+    or None when the page classifier finds none or cannot read the PDF
+
+    The text layer and OCR miss checkmarks, so extracted text only shows the
+    lines that carry a premium.
+    """
+    if CA_APP not in get_registry().names():
+        return None
+    try:
+        classes = classify_pdf(pdf_path)
+    except RuntimeError as e:
+        logger.warning(f"Skipping checkbox read: {e}")
+        return None
+    pages = {
+        page.template_page: page.page_number
+        for page in classes
+        if page.template == CA_APP and page.page_number not in skip_pages
+    }
+    if not pages:
+        return None
+    layout = get_registry().get(CA_APP)
+    checked = read_checkboxes(pdf_path, layout, workers=1, pages=pages)
+    return checked.get(LINES_OF_BUSINESS_PATH) or []
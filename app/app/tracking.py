@@ -0,0 +1,268 @@
+"""Buffered MLflow logging kept off the extraction request path
+
+Callers hand a finished run's params, metrics and artifacts to the sink and
+return immediately. A background thread sends queued runs in groups, each
+run as one ``log_batch`` call plus one artifact upload. When the tracking
+server fails, runs are appended to a local JSON lines spool and the sink
+stops trying for a while; the spool is replayed, oldest first, before the
+next group once the server answers again. A replayed spool is only deleted
+once it has been sent, so runs survive a crash during the replay. A full
+queue, which means the server is slower than extraction, spools or drops new
+runs by policy.
+"""
+
+from dataclasses import asdict
+from json import dumps, loads
+from pathlib import Path
+from queue import Empty, Full, Queue
+from random import random
+from tempfile import TemporaryDirectory
+from threading import Event, Lock, Thread
+from time import monotonic, time
+
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+
+from app.__init__ import (
+    TRACKING_BATCH_SIZE,
+    TRACKING_FLUSH_SECONDS,
+    TRACKING_OVERFLOW,
+    TRACKING_QUEUE_SIZE,
+    TRACKING_RETRY_SECONDS,
+    TRACKING_SAMPLE_RATE,
+    TRACKING_SPOOL_PATH,
+    getLogger,
+)
+from app.data_model import TrackedRun
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+EXPERIMENT_NAME = "PDF_Extraction"
+SPOOL_FILE = "runs.jsonl"
+# The spool being replayed, kept until its runs are sent or spooled again
+SENDING_FILE = "runs.jsonl.sending"
+OVERFLOW_POLICIES = ("spool", "drop")
+
+
+class TrackingSink:
+    """Queue of runs logged to MLflow by a background thread"""
+
+    def __init__(
+        self,
+        tracking_uri: str | None = None,
+        experiment: str = EXPERIMENT_NAME,
+        spool_path: Path = TRACKING_SPOOL_PATH,
+        queue_size: int = TRACKING_QUEUE_SIZE,
+        batch_size: int = TRACKING_BATCH_SIZE,
+        flush_interval: float = TRACKING_FLUSH_SECONDS,
+        retry_interval: float = TRACKING_RETRY_SECONDS,
+        sample_rate: float = TRACKING_SAMPLE_RATE,
+        overflow: str = TRACKING_OVERFLOW,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown tracking overflow policy: {overflow}")
+        self.tracking_uri = tracking_uri
+        self.experiment = experiment
+        self.spool_path = Path(spool_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.sample_rate = sample_rate
+        self.overflow = overflow
+        self._queue: Queue[TrackedRun | Event | None] = Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = Lock()
+        self._spool_lock = Lock()
+        self._client = None
+        self._experiment_id = None
+        self._retry_at = 0.0
+        self.counters = {
+            "logged": 0,
+            "sampled_out": 0,
+            "dropped": 0,
+            "spooled": 0,
+            "replayed": 0,
+            "failed_flushes": 0,
+        }
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def start(self) -> "TrackingSink":
+        """starts the logging thread if it is not already running"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="mlflow-sink", daemon=True)
+                self._thread.start()
+        return self
+
+    def shutdown(self):
+        """sends or spools every queued run and stops the logging thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def log_run(
+        self,
+        params: dict | None = None,
+        metrics: dict | None = None,
+        artifacts: dict | None = None,
+    ) -> bool:
+        """queues a run without waiting on MLflow; ``artifacts`` maps file
+        names to JSON-serializable data. Returns False if the run was sampled
+        out or dropped"""
+        if self.sample_rate < 1 and random() >= self.sample_rate:
+            self._count("sampled_out")
+            return False
+        run = TrackedRun(
+            params=params or {},
+            metrics=metrics or {},
+            artifacts=artifacts or {},
+            timestamp=int(time() * 1000),
+        )
+        self.start()
+        try:
+            self._queue.put_nowait(run)
+        except Full:
+            if self.overflow == "drop":
+                self._count("dropped")
+                return False
+            self._spool([run])
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """waits until every run queued so far has been sent or spooled"""
+        done = Event()
+        self.start()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        pending = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except Empty:
+                item = Event()
+            if isinstance(item, TrackedRun):
+                pending.append(item)
+                if len(pending) < self.batch_size:
+                    continue
+            self._write(pending)
+            pending = []
+            if item is None:
+                return
+            if isinstance(item, Event):
+                item.set()
+
+    def _write(self, runs: list[TrackedRun]):
+        """sends spooled then queued runs, spooling whatever could not be sent"""
+        if monotonic() < self._retry_at:
+            self._spool(runs)
+            return
+        spooled = self._take_spool()
+        if not runs and not spooled:
+            return
+        pending = spooled + runs
+        sent = 0
+        try:
+            for run in pending:
+                self._send(run)
+                sent += 1
+        except Exception as e:
+            logger.warning(
+                f"MLflow logging failed, spooling {len(pending) - sent} runs "
+                f"for {self.retry_interval}s: {e}"
+            )
+            self._count("failed_flushes")
+            self._retry_at = monotonic() + self.retry_interval
+            self._spool(pending[sent:])
+        self._release_spool()
+        self._count("logged", sent)
+        self._count("replayed", min(sent, len(spooled)))
+
+    def _connect(self) -> MlflowClient:
+        if self._client is None:
+            client = MlflowClient(self.tracking_uri)
+            experiment = client.get_experiment_by_name(self.experiment)
+            if experiment is None:
+                self._experiment_id = client.create_experiment(self.experiment)
+            else:
+                self._experiment_id = experiment.experiment_id
+            self._client = client
+        return self._client
+
+    def _send(self, run: TrackedRun):
+        client = self._connect()
+        run_id = client.create_run(
+            self._experiment_id, start_time=run.timestamp
+        ).info.run_id
+        client.log_batch(
+            run_id,
+            metrics=[
+                Metric(key, float(value), run.timestamp, 0)
+                for key, value in run.metrics.items()
+            ],
+            params=[Param(key, str(value)) for key, value in run.params.items()],
+        )
+        if run.artifacts:
+            with TemporaryDirectory() as tmpdir:
+                for name, data in run.artifacts.items():
+                    (Path(tmpdir) / name).write_text(dumps(data, default=str))
+                client.log_artifacts(run_id, tmpdir)
+        client.set_terminated(run_id, end_time=run.timestamp)
+
+    def _spool(self, runs: list[TrackedRun]):
+        if not runs:
+            return
+        with self._spool_lock:
+            self.spool_path.mkdir(parents=True, exist_ok=True)
+            with open(self.spool_path / SPOOL_FILE, "a") as file:
+                for run in runs:
+                    file.write(dumps(asdict(run), default=str) + "\n")
+        self._count("spooled", len(runs))
+
+    def _take_spool(self) -> list[TrackedRun]:
+        """reads the spool file, moved aside until ``_release_spool``; a spool
+        left aside by a crash during its replay is read instead"""
+        with self._spool_lock:
+            path = self.spool_path / SPOOL_FILE
+            sending = self.spool_path / SENDING_FILE
+            if not sending.exists():
+                if not path.exists():
+                    return []
+                path.rename(sending)
+            lines = sending.read_text().splitlines()
+        return [TrackedRun(**loads(line)) for line in lines if line]
+
+    def _release_spool(self):
+        """deletes the spool taken by ``_take_spool`` once its runs are handled"""
+        with self._spool_lock:
+            (self.spool_path / SENDING_FILE).unlink(missing_ok=True)
+
+    def spooled(self) -> int:
+        """returns the number of runs waiting in the spool files"""
+        with self._spool_lock:
+            return sum(
+                len(path.read_text().splitlines())
+                for path in (
+                    self.spool_path / SENDING_FILE,
+                    self.spool_path / SPOOL_FILE,
+                )
+                if path.exists()
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "queued": self._queue.qsize()}
+
+
+@process_wide
+def get_sink() -> TrackingSink:
+    """returns the process-wide MLflow sink, created on first use; it logs to
+    whichever tracking URI MLflow is configured with when it first sends"""
+    return TrackingSink()
@@ -4,9 +4,8 @@ Module to train and prediction using XGBoost Classifier
 # !/usr/bin/env python
 # coding: utf-8
 
-from json import load
 from logging import DEBUG, basicConfig, getLogger
-from os import getenv, makedirs
+from os import getenv
 from pathlib import Path
 from sys import exit
 from warnings import filterwarnings
@@ -15,17 +14,17 @@ from joblib import dump
 from mlflow import (
     create_experiment,
     log_artifact,
-    log_metrics,
     set_experiment,
     set_tracking_uri,
     start_run,
 )
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 from sklearn.model_selection import train_test_split
 
-from app.extract import PDFExtractor
-from app.__init__ import MLFLOW_TRACKING_URI
+from app.__init__ import EVALUATION_PATH, EXTRACTION_WORKERS, MLFLOW_TRACKING_URI
+from app.corpus import generate_corpus
+from app.engine import ExtractionEngine
+from app.evaluate import evaluate
+from app.tracking import EXPERIMENT_NAME, TrackingSink
 
 STORE_PATH = Path("/app/store")
 OUTPUTS_PATH = STORE_PATH / "outputs"
@@ -44,40 +43,13 @@ set_tracking_uri(getenv("MLFLOW_TRACKING_URI"))
 set_experiment(getenv("MLFLOW_EXPERIMENT_NAME"))
 
 
-# Function to generate PDFs and their expected outputs
 def generate_pdfs(
     num_pdfs: int,
     output_dir: Path = TRAINING_DATA_PATH,
 ) -> list[tuple[str, str]]:
-    makedirs(output_dir, exist_ok=True)
-    data_pairs = []
-
-    for i in range(num_pdfs):
-        pdf_path = f"{output_dir}/doc_{i}.pdf"
-        json_path = f"{output_dir}/doc_{i}.json"
-
-        # Simulate structured data for PDF content
-        content = {"title": f"Document {i}", "section": f"Content of document {i}"}
-        expected_output = {
-            "title": content["title"],
-            "content": content["section"],
-            "summary": f"This is a summary of document {i}.",
-        }
-
-        # Create a PDF file using ReportLab
-        pdf = canvas.Canvas(pdf_path, pagesize=letter)
-        pdf.setFont("Helvetica", 12)
-        pdf.drawString(72, 750, content["title"])  # Positioning text at x=72, y=750
-        pdf.drawString(72, 730, content["section"])  # Positioning text at x=72, y=730
-        pdf.save()
-
-        # Write the expected output
-        with open(json_path, "w") as f:
-            dump(expected_output, f)
-
-        data_pairs.append((pdf_path, json_path))
-
-    return data_pairs
+    """generates filled ACORD forms and their expected records as JSON,
+    resuming a partly generated set in ``output_dir``"""
+    return generate_corpus(num_pdfs, output_dir)
 
 
 class PDFExtraction:
@@ -114,41 +86,44 @@ class PDFExtraction:
             set_experiment(experiment)
             self.active_experiment = experiment
 
-    def train(self, data_pairs: list[tuple[str, str]]):
-        """trains the model and logs the model as mlflow artifact
+    def train(
+        self,
+        data_pairs: list[tuple[str, str]],
+        workers: int = EXTRACTION_WORKERS,
+        checkpoint_path: Path = EVALUATION_PATH,
+        resume: bool = True,
+    ):
+        """evaluates extraction on the train and validation splits and logs
+        each split's metrics and per-document table to mlflow once
 
         Parameters
         ----------
-        ncpu : int, optional
-            number of CPU threads used for training, by default 4
+        workers : int, optional
+            number of processes documents are extracted on
+        checkpoint_path : Path, optional
+            directory of the per-split checkpoints an interrupted run resumes
+            from
+        resume : bool, optional
+            whether documents already in a checkpoint are skipped, by default
+            True
         """
         train_data, val_data = train_test_split(
             data_pairs, test_size=0.2, random_state=42
         )
-
-        extractor = PDFExtractor(MLFLOW_TRACKING_URI)
-
-        for phase, data in [("train", train_data), ("validation", val_data)]:
-            with start_run():
-                for pdf_path, json_path in data:
-                    logger.info(f"Extracting {phase} data using the PDFExtractor")
-                    extracted_data = extractor.extract_data(pdf_path, input_type="file")
-
-                    # Read the expected data
-                    with open(json_path, "r") as f:
-                        expected_data = load(f)
-
-                    # Calculate performance metrics (e.g., accuracy)
-                    accuracy = sum(
-                        1
-                        for key in extracted_data
-                        if extracted_data.get(key) == expected_data.get(key)
-                    ) / len(expected_data)
-
-                    # Log to MLflow
-                    log_metrics({"accuracy": accuracy})
-
-                    print(f"Processed {pdf_path}: Accuracy = {accuracy}")
+        sink = TrackingSink(experiment=self.active_experiment or EXPERIMENT_NAME)
+
+        with ExtractionEngine(processes=workers) as engine:
+            for phase, data in [("train", train_data), ("validation", val_data)]:
+                summary = evaluate(
+                    data,
+                    phase=phase,
+                    engine=engine,
+                    checkpoint=checkpoint_path / f"{self.model_name}_{phase}.jsonl",
+                    resume=resume,
+                    sink=sink,
+                )
+                logger.info(f"Evaluated {phase}: Accuracy = {summary.get('accuracy')}")
+        sink.shutdown()
 
     def validate(self):
         """performs model validation with testing data
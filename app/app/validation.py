@@ -0,0 +1,333 @@
+"""Compiled schema validation for extracted records
+
+A JSON schema is compiled once into a tree of small check functions, so
+validating a record walks the record and never re-reads the schema. Compiled
+validators are cached by name: ``{name}_template.json`` schemas are loaded
+from the templates directory, and the "application" schema is derived from
+the ``Application`` dataclass tree that text and AcroForm extraction produce.
+
+Supported keywords are the draft-07 subset the templates use: ``type``,
+``properties``, ``required``, ``additionalProperties`` (as a schema),
+``items``, ``enum``, ``format`` ("date"), ``minimum``/``maximum``,
+``minLength``/``maxLength`` and ``pattern``. Other keywords are ignored.
+"""
+
+from collections.abc import Callable, Iterable
+from dataclasses import fields, is_dataclass
+from json import loads
+from pathlib import Path
+from re import compile
+from threading import Lock
+from types import NoneType, UnionType
+from typing import Any, Union, get_args, get_origin, get_type_hints
+
+from app.__init__ import TEMPLATE_PATH, getLogger
+from app.data_model import Application, FieldError
+from app.singleton import process_wide
+
+logger = getLogger(__name__)
+
+# Check functions append to ``errors`` and return whether deeper checks apply
+Check = Callable[[Any, str, list[FieldError]], bool]
+
+# Exact Python types accepted by each JSON type, checked first
+TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "object": (dict,),
+    "array": (list,),
+    "null": (NoneType,),
+}
+# Fallbacks for values whose exact type is not listed, e.g. 2.0 is an integer
+TYPE_CHECKS = {
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: (
+        (isinstance(value, int) and not isinstance(value, bool))
+        or (isinstance(value, float) and value.is_integer())
+    ),
+    "number": lambda value: (
+        isinstance(value, int | float) and not isinstance(value, bool)
+    ),
+    "boolean": lambda value: isinstance(value, bool),
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "null": lambda value: value is None,
+}
+# ISO dates per the spec, plus M/D/YYYY as filled in on ACORD forms, where the
+# leading zeros are often left out
+FORMAT_PATTERNS = {"date": compile(r"\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{4}")}
+PYTHON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+# Constraints on Application fields beyond their type, by field name, which is
+# unique across the dataclass tree
+FIELD_CONSTRAINTS = {
+    "proposed_eff_date": {"format": "date"},
+    "proposed_exp_date": {"format": "date"},
+    "business_started_date": {"format": "date"},
+    "premium": {"minimum": 0},
+    # a line of business can be checked with its premium left blank
+    "premium_details": {
+        "additionalProperties": {"type": ["number", "null"], "minimum": 0}
+    },
+    "annual_revenue": {"minimum": 0},
+    "number_of_members": {"minimum": 0},
+    "no_of_employees_fulltime": {"minimum": 0},
+    "no_of_employees_parttime": {"minimum": 0},
+}
+APPLICATION = "application"
+SCHEMA_SUFFIX = "_template.json"
+
+
+def join_path(path: str, key: str) -> str:
+    return f"{path}.{key}" if path else key
+
+
+def compile_type(types: str | list[str]) -> Check:
+    names = [types] if isinstance(types, str) else list(types)
+    exact = frozenset(kind for name in names for kind in TYPES.get(name, ()))
+    checks = [TYPE_CHECKS[name] for name in names if name in TYPE_CHECKS]
+    expected = " or ".join(names)
+
+    def check(value, path, errors):
+        if type(value) in exact or any(type_check(value) for type_check in checks):
+            return True
+        errors.append(
+            FieldError(path, "type", f"expected {expected}, got {type(value).__name__}")
+        )
+        return False
+
+    return check
+
+
+def compile_properties(properties: dict, required: list[str]) -> Check:
+    children = {key: compile_schema(schema) for key, schema in properties.items()}
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            return True
+        for key in required:
+            if key not in value:
+                errors.append(
+                    FieldError(join_path(path, key), "required", f"missing {key}")
+                )
+        for key, child in children.items():
+            if key in value:
+                child(value[key], join_path(path, key), errors)
+        return True
+
+    return check
+
+
+def compile_additional(properties: dict, additional: dict) -> Check:
+    child = compile_schema(additional)
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key not in properties:
+                    child(item, join_path(path, key), errors)
+        return True
+
+    return check
+
+
+def compile_items(items: dict) -> Check:
+    child = compile_schema(items)
+
+    def check(value, path, errors):
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                child(item, f"{path}[{index}]", errors)
+        return True
+
+    return check
+
+
+def compile_enum(options: list) -> Check:
+    def check(value, path, errors):
+        if value not in options:
+            errors.append(
+                FieldError(path, "enum", f"{value!r} is not one of {options}")
+            )
+        return True
+
+    return check
+
+
+def compile_pattern(keyword: str, pattern: str) -> Check:
+    regex = FORMAT_PATTERNS[pattern] if keyword == "format" else compile(pattern)
+
+    def check(value, path, errors):
+        if isinstance(value, str) and not regex.fullmatch(value):
+            errors.append(
+                FieldError(path, keyword, f"{value!r} does not match {pattern}")
+            )
+        return True
+
+    return check
+
+
+def compile_bound(keyword: str, bound: float) -> Check:
+    length = keyword.endswith("Length")
+    lower = keyword.startswith("min")
+
+    def check(value, path, errors):
+        if length:
+            if not isinstance(value, str):
+                return True
+            measure = len(value)
+        elif TYPE_CHECKS["number"](value):
+            measure = value
+        else:
+            return True
+        if measure < bound if lower else measure > bound:
+            errors.append(FieldError(path, keyword, f"{keyword} is {bound}"))
+        return True
+
+    return check
+
+
+def compile_schema(schema: dict) -> Check:
+    """compiles one (sub)schema into a check function"""
+    checks = []
+    if "type" in schema:
+        checks.append(compile_type(schema["type"]))
+    if "enum" in schema:
+        checks.append(compile_enum(schema["enum"]))
+    if schema.get("format") in FORMAT_PATTERNS:
+        checks.append(compile_pattern("format", schema["format"]))
+    if "pattern" in schema:
+        checks.append(compile_pattern("pattern", schema["pattern"]))
+    for keyword in ("minimum", "maximum", "minLength", "maxLength"):
+        if keyword in schema:
+            checks.append(compile_bound(keyword, schema[keyword]))
+    if "properties" in schema or "required" in schema:
+        checks.append(
+            compile_properties(schema.get("properties", {}), schema.get("required", []))
+        )
+    if isinstance(schema.get("additionalProperties"), dict):
+        checks.append(
+            compile_additional(
+                schema.get("properties", {}), schema["additionalProperties"]
+            )
+        )
+    if "items" in schema:
+        checks.append(compile_items(schema["items"]))
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(value, path, errors):
+        for step in checks:
+            if not step(value, path, errors):
+                return False
+        return True
+
+    return check
+
+
+def type_schema(hint) -> dict:
+    """returns the schema of a dataclass field type; extracted values may be
+    missing, so every scalar and nested record also accepts null"""
+    origin = get_origin(hint)
+    if origin in (Union, UnionType):
+        options = [type_schema(arg) for arg in get_args(hint) if arg is not NoneType]
+        return options[0] if len(options) == 1 else {}
+    if origin is list:
+        args = get_args(hint)
+        return {"type": "array", "items": type_schema(args[0]) if args else {}}
+    if hint is dict or origin is dict:
+        return {"type": ["object", "null"]}
+    if is_dataclass(hint):
+        return {**dataclass_schema(hint), "type": ["object", "null"]}
+    if hint in PYTHON_TYPES:
+        return {"type": [PYTHON_TYPES[hint], "null"]}
+    return {}
+
+
+def dataclass_schema(cls) -> dict:
+    """derives an object schema, with every field required, from a dataclass,
+    adding the ``FIELD_CONSTRAINTS`` of its fields"""
+    hints = get_type_hints(cls)
+    return {
+        "type": "object",
+        "properties": {
+            field.name: {
+                **type_schema(hints[field.name]),
+                **FIELD_CONSTRAINTS.get(field.name, {}),
+            }
+            for field in fields(cls)
+        },
+        "required": [field.name for field in fields(cls)],
+    }
+
+
+class SchemaValidator:
+    """One schema compiled into checks, reusable across any number of records"""
+
+    def __init__(self, schema: dict, name: str = ""):
+        self.name = name
+        self.schema = schema
+        self._check = compile_schema(schema)
+
+    def errors(self, record) -> list[FieldError]:
+        errors = []
+        self._check(record, "", errors)
+        return errors
+
+    def is_valid(self, record) -> bool:
+        return not self.errors(record)
+
+    def validate_batch(self, records: Iterable) -> list[list[FieldError]]:
+        """returns each record's errors, in order; valid records get []"""
+        check = self._check
+        results = []
+        for record in records:
+            errors = []
+            check(record, "", errors)
+            results.append(errors)
+        return results
+
+
+class ValidatorCache:
+    """Compiled validators by name, each schema read and compiled once"""
+
+    def __init__(self, path: Path = TEMPLATE_PATH):
+        self.path = Path(path)
+        self._validators: dict[str, SchemaValidator] = {}
+        self._lock = Lock()
+
+    def _load(self, name: str) -> SchemaValidator:
+        if name == APPLICATION:
+            return SchemaValidator(dataclass_schema(Application), name)
+        schema_path = self.path / f"{name}{SCHEMA_SUFFIX}"
+        if not schema_path.exists():
+            raise KeyError(f"Unknown schema: {name}")
+        return SchemaValidator(loads(schema_path.read_text()), name)
+
+    def get(self, name: str) -> SchemaValidator:
+        with self._lock:
+            validator = self._validators.get(name)
+            if validator is None:
+                validator = self._validators[name] = self._load(name)
+                logger.info(f"Compiled schema validator {name}")
+            return validator
+
+
+@process_wide
+def get_validators() -> ValidatorCache:
+    """returns the process-wide validator cache, creating it on first use"""
+    return ValidatorCache()
+
+
+def validate_record(record, schema: str = APPLICATION) -> list[FieldError]:
+    """validates one record with the cached validator for ``schema``"""
+    return get_validators().get(schema).errors(record)
+
+
+def validate_records(
+    records: Iterable, schema: str = APPLICATION
+) -> list[list[FieldError]]:
+    """validates many records with one lookup of the cached validator"""
+    return get_validators().get(schema).validate_batch(records)
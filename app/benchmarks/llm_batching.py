@@ -0,0 +1,63 @@
+"""Load-test the LLM micro-batcher offline against the local stand-in model
+
+The stand-in sleeps a fixed time per call plus a smaller time per record,
+like a served model that amortizes its per-call overhead across a batch.
+
+Usage (from the ``app`` directory)::
+
+    python -m benchmarks.llm_batching --clients 32 --batch-sizes 1 8 32
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from app.llm import LocalModel, MicroBatcher
+
+
+def run(
+    clients: int,
+    records: int,
+    batch_sizes: list[int],
+    max_wait: float,
+    batch_latency: float,
+    item_latency: float,
+):
+    print(
+        f"{'batch':>6}{'records/s':>12}{'batches':>9}{'mean size':>11}"
+        f"{'occupancy':>11}{'p50 ms':>9}{'p95 ms':>9}"
+    )
+    for batch_size in batch_sizes:
+        model = LocalModel(batch_latency, item_latency)
+        batcher = MicroBatcher(model, max_batch_size=batch_size, max_wait=max_wait)
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(batcher.process, range(records)))
+        seconds = perf_counter() - start
+        batcher.shutdown()
+        stats = batcher.stats()
+        print(
+            f"{batch_size:>6}{records / seconds:>12.0f}{stats['batches']:>9}"
+            f"{stats['mean_batch_size']:>11.1f}{stats['mean_occupancy']:>11.2f}"
+            f"{stats['latency_p50'] * 1000:>9.1f}{stats['latency_p95'] * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--batch-latency-ms", type=float, default=20)
+    parser.add_argument("--item-latency-ms", type=float, default=1)
+    FLAGS = parser.parse_args()
+
+    run(
+        FLAGS.clients,
+        FLAGS.records,
+        FLAGS.batch_sizes,
+        FLAGS.max_wait_ms / 1000,
+        FLAGS.batch_latency_ms / 1000,
+        FLAGS.item_latency_ms / 1000,
+    )
@@ -0,0 +1,72 @@
+"""Benchmark serial vs page-sharded OCR on the ACORD template and synthetic packets
+
+Usage (from the ``app`` directory)::
+
+    python -m benchmarks.ocr_pages --pages 1 4 12 --workers 1 2 4
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from app.__init__ import DOCSTORE_PATH, OCR_WORKERS
+from app.extract import extract_ocr_data
+
+TEMPLATE_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+
+
+def make_packet(path: Path, num_pages: int) -> Path:
+    """writes a synthetic multi-page packet of form-like text to ``path``"""
+    pdf = canvas.Canvas(str(path), pagesize=letter)
+    for page in range(num_pages):
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(72, 740, "COMMERCIAL INSURANCE APPLICATION")
+        pdf.setFont("Helvetica", 10)
+        for line in range(40):
+            y = 710 - line * 16
+            pdf.drawString(72, y, f"PAGE {page + 1} FIELD {line + 1}: POLICY NUMBER")
+            pdf.drawString(340, y, f"VALUE {page:03d}-{line:03d}")
+        pdf.showPage()
+    pdf.save()
+    return path
+
+
+def time_ocr(pdf_path: Path, workers: int, repeat: int) -> float:
+    """returns the best wall time in seconds over ``repeat`` OCR runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        extract_ocr_data(pdf_path, workers=workers)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def run(pdf_paths: dict[str, Path], workers: list[int], repeat: int):
+    print(f"{'document':<24}{'workers':>8}{'seconds':>10}{'speedup':>10}")
+    for name, pdf_path in pdf_paths.items():
+        baseline = None
+        for n in workers:
+            seconds = time_ocr(pdf_path, n, repeat)
+            baseline = baseline or seconds
+            print(f"{name:<24}{n:>8}{seconds:>10.2f}{baseline / seconds:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[4, 12, 32])
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=sorted({1, 2, OCR_WORKERS})
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    FLAGS = parser.parse_args()
+
+    with TemporaryDirectory() as tmpdir:
+        pdf_paths = {"ACORD_CA_APP.pdf": TEMPLATE_PDF_PATH}
+        for num_pages in FLAGS.pages:
+            path = Path(tmpdir) / f"packet_{num_pages}.pdf"
+            pdf_paths[f"synthetic {num_pages}p"] = make_packet(path, num_pages)
+        run(pdf_paths, FLAGS.workers, FLAGS.repeat)
@@ -0,0 +1,79 @@
+"""Benchmark the compiled field parser against per-label regex scanning
+
+Parses synthetic ACORD 125 text rendered from random ``Application`` records,
+so it measures structuring alone on already-extracted text.
+
+Usage (from the ``app`` directory)::
+
+    python -m benchmarks.parse_fields --documents 1000 10000
+"""
+
+from argparse import ArgumentParser
+from re import compile, escape
+from time import perf_counter
+
+from faker import Faker
+
+from app.corpus import render_text
+from app.data_model import Application
+from app.parse import LABEL_END, LABEL_START, get_parser, load_labels
+
+
+def per_label_anchors(patterns: list, text: str) -> list[tuple[str | None, int, int]]:
+    """the ad-hoc alternative: one regex scan over the text per label, then a
+    merge that keeps the longest label at each position"""
+    matches = sorted(
+        (match.start(), -match.end(), field)
+        for field, pattern in patterns
+        for match in pattern.finditer(text)
+    )
+    anchors, end = [], 0
+    for start, negative_end, field in matches:
+        if start >= end:
+            anchors.append((field, start, -negative_end))
+            end = -negative_end
+    return anchors
+
+
+def time_documents(func, texts: list[str], repeat: int) -> float:
+    """returns the best documents per second over ``repeat`` passes"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, perf_counter() - start)
+    return len(texts) / best
+
+
+def run(documents: list[int], repeat: int, seed: int):
+    faker = Faker()
+    Faker.seed(seed)
+    parser = get_parser()
+    patterns = [
+        (field, compile(f"{LABEL_START}{escape(label)}{LABEL_END}"))
+        for label, field in load_labels()
+    ]
+    print(f"{'documents':>10}{'method':>20}{'docs/s':>12}{'speedup':>10}")
+    for count in documents:
+        texts = [render_text(Application.rand(faker)) for _ in range(count)]
+        baseline = time_documents(
+            lambda text: per_label_anchors(patterns, text), texts, repeat
+        )
+        print(f"{count:>10}{'per-label anchors':>20}{baseline:>12.0f}{1:>9.2f}x")
+        for name, func in [
+            ("trie anchors", parser.anchors),
+            ("parse application", parser.parse),
+        ]:
+            rate = time_documents(func, texts, repeat)
+            print(f"{count:>10}{name:>20}{rate:>12.0f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--documents", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    FLAGS = parser.parse_args()
+
+    run(FLAGS.documents, FLAGS.repeat, FLAGS.seed)
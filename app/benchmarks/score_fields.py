@@ -0,0 +1,109 @@
+"""Benchmark columnar field scoring against a per-document Python loop
+
+Expected records are synthetic Applications and the extracted ones are
+parsed back from their rendered ACORD 125 text, so mismatches look like real
+extraction errors. A pool of distinct pairs is repeated up to each document
+count. Both methods score the records' flattened fields, which evaluation
+workers produce next to extraction. The loop baseline compares one document
+at a time with a pure Python edit distance, and runs on at most
+``--loop-limit`` documents.
+
+Usage (from the ``app`` directory)::
+
+    python -m benchmarks.score_fields --documents 10000 100000
+"""
+
+from argparse import ArgumentParser
+from itertools import islice
+from time import perf_counter
+
+from faker import Faker
+
+from app.corpus import render_text
+from app.data_model import Application
+from app.parse import parse_application
+from app.scoring import record_fields, score_records
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char != other),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def loop_scores(pairs: list[tuple[dict, dict]]) -> dict:
+    """scores one document at a time into per-field running totals"""
+    totals = {}
+    for expected, extracted in pairs:
+        for path in expected.keys() | extracted.keys():
+            truth, guess = expected.get(path), extracted.get(path)
+            if truth is None or guess is None:
+                similarity = float(truth == guess)
+            elif truth == guess:
+                similarity = 1.0
+            else:
+                similarity = 1 - levenshtein(truth, guess) / max(len(truth), len(guess))
+            field = totals.setdefault(path, [0, 0.0])
+            field[0] += truth == guess
+            field[1] += similarity
+    return totals
+
+
+def run(counts: list[int], pool: int, loop_limit: int, seed: int):
+    faker = Faker()
+    Faker.seed(seed)
+    expected = [Application.rand(faker) for _ in range(pool)]
+    pairs = [
+        (
+            record_fields(record.to_dict()),
+            record_fields(parse_application(render_text(record)).to_dict()),
+        )
+        for record in expected
+    ]
+    print(f"{'documents':>10}{'method':>10}{'seconds':>10}{'docs/s':>10}{'fields':>8}")
+    for count in counts:
+        documents = [pairs[n % pool] for n in range(count)]
+        start = perf_counter()
+        fields, metrics = score_records(
+            (expected for expected, _ in documents),
+            (extracted for _, extracted in documents),
+        )
+        seconds = perf_counter() - start
+        print(
+            f"{count:>10}{'columnar':>10}{seconds:>10.3f}{count / seconds:>10.0f}"
+            f"{len(fields):>8}"
+        )
+        looped = min(count, loop_limit)
+        start = perf_counter()
+        totals = loop_scores(list(islice(documents, looped)))
+        seconds = perf_counter() - start
+        print(
+            f"{looped:>10}{'loop':>10}{seconds:>10.3f}{looped / seconds:>10.0f}"
+            f"{len(totals):>8}"
+        )
+    print(
+        f"exact match {metrics['exact_match']:.3f}, similarity "
+        f"{metrics['similarity']:.3f}, precision {metrics['precision']:.3f}, "
+        f"recall {metrics['recall']:.3f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--documents", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--pool", type=int, default=1000)
+    parser.add_argument("--loop-limit", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    FLAGS = parser.parse_args()
+
+    run(FLAGS.documents, FLAGS.pool, FLAGS.loop_limit, FLAGS.seed)
@@ -0,0 +1,51 @@
+"""Benchmark batch validation with the cached compiled Application schema
+
+Validates Application records parsed from synthetic ACORD 125 text, once
+through the cached validator and once re-deriving and compiling the schema
+per record the way uncached validation would.
+
+Usage (from the ``app`` directory)::
+
+    python -m benchmarks.validate_records --records 1000 10000
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+from faker import Faker
+
+from app.corpus import render_text
+from app.data_model import Application
+from app.parse import parse_application
+from app.validation import SchemaValidator, dataclass_schema, validate_records
+
+
+def run(counts: list[int], seed: int):
+    faker = Faker()
+    Faker.seed(seed)
+    print(f"{'records':>10}{'method':>12}{'seconds':>10}{'records/s':>12}{'errors':>8}")
+    for count in counts:
+        records = [
+            parse_application(render_text(Application.rand(faker))).to_dict()
+            for _ in range(count)
+        ]
+        start = perf_counter()
+        results = validate_records(records)
+        cached = perf_counter() - start
+        errors = sum(map(len, results))
+        rate = count / cached
+        print(f"{count:>10}{'cached':>12}{cached:>10.3f}{rate:>12.0f}{errors:>8}")
+        start = perf_counter()
+        for record in records:
+            SchemaValidator(dataclass_schema(Application)).errors(record)
+        uncached = perf_counter() - start
+        print(f"{count:>10}{'uncached':>12}{uncached:>10.3f}{count / uncached:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--records", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    FLAGS = parser.parse_args()
+
+    run(FLAGS.records, FLAGS.seed)
@@ -0,0 +1,156 @@
+from json import loads
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from reportlab.pdfgen.canvas import Canvas
+
+from app import main as app_main
+from app.__init__ import DOCSTORE_PATH
+from app.acroform import extract_form_data, fields_to_application, read_form_fields
+from app.cache import ExtractionCache
+from app.engine import ExtractionEngine
+from app.extract import extract_document
+from app.service import ExtractionService
+
+TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+
+TEXT_FIELDS = {
+    "Producer_FullName_A[0]": "Acme Agency",
+    "NamedInsured_FullName_A[0]": "Widgets Inc",
+    "NamedInsured_MailingAddress_CityName_A[0]": "Springfield",
+    "NamedInsured_FullName_B[0]": "Widgets Holdings",
+    "CommercialVehicleLineOfBusiness_PremiumAmount_A[0]": "$1,200.50",
+    "BusinessInformation_FullTimeEmployeeCount_A[0]": "12",
+}
+CHECKBOXES = {
+    "Policy_LineOfBusiness_BusinessAutoIndicator_A[0]": True,
+    "Policy_LineOfBusiness_CrimeIndicator_A[0]": False,
+    "NamedInsured_LegalEntity_LimitedLiabilityCorporationIndicator_A[0]": True,
+}
+
+
+# Fields of a filled ACORD 127 (Business Auto Section), which shares the
+# producer and insured names with the 125 but has no line of business boxes
+OTHER_FORM_FIELDS = {
+    "Producer_FullName_A[0]": "Acme Agency",
+    "NamedInsured_FullName_A[0]": "Widgets Inc",
+    "Driver_GivenName_A[0]": "Jane",
+    "Vehicle_ModelYear_A[0]": "2019",
+}
+
+
+def write_filled_form(
+    path: Path, text_fields: dict = TEXT_FIELDS, checkboxes: dict = CHECKBOXES
+) -> Path:
+    canvas = Canvas(str(path))
+    for index, (name, value) in enumerate(text_fields.items()):
+        canvas.acroForm.textfield(name=name, value=value, x=50, y=750 - 30 * index)
+    for index, (name, checked) in enumerate(checkboxes.items()):
+        canvas.acroForm.checkbox(name=name, checked=checked, x=50 + 30 * index, y=500)
+    canvas.showPage()
+    canvas.save()
+    return path
+
+
+class TestAcroForm(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.pdf_path = write_filled_form(Path(self.tmpdir.name) / "filled.pdf")
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_read_form_fields(self):
+        fields = read_form_fields(self.pdf_path)
+        self.assertEqual(fields["Producer_FullName_A"], "Acme Agency")
+        self.assertEqual(fields["Policy_LineOfBusiness_CrimeIndicator_A"], "Off")
+        self.assertNotEqual(
+            fields["Policy_LineOfBusiness_BusinessAutoIndicator_A"], "Off"
+        )
+
+    def test_fields_to_application(self):
+        application = fields_to_application(read_form_fields(self.pdf_path))
+        self.assertEqual(application.agency.agency_name, "Acme Agency")
+        self.assertEqual(application.first_named_insured.name, "Widgets Inc")
+        self.assertEqual(
+            application.first_named_insured.mailing_address.city, "Springfield"
+        )
+        self.assertEqual(
+            [insured.name for insured in application.additional_insureds],
+            ["Widgets Holdings"],
+        )
+        self.assertEqual(application.policy_info.lines_of_business, ["Business Auto"])
+        self.assertEqual(application.coverages[0].premium, 1200.5)
+        self.assertEqual(application.business_info.entity_type, "LLC")
+        self.assertEqual(application.business_info.no_of_employees_fulltime, 12)
+
+    def test_unfilled_form_falls_back(self):
+        self.assertGreater(len(read_form_fields(TEST_PDF_PATH)), 500)
+        self.assertIsNone(extract_form_data(TEST_PDF_PATH))
+
+    def test_other_filled_forms_fall_back(self):
+        other = write_filled_form(
+            Path(self.tmpdir.name) / "acord_127.pdf", OTHER_FORM_FIELDS, {}
+        )
+        self.assertIsNone(extract_form_data(other))
+        with patch("app.extract.process_pdf", return_value="text") as process_pdf:
+            self.assertEqual(extract_document(other, False, "route"), "text")
+        process_pdf.assert_called_once()
+
+        unmapped = write_filled_form(
+            Path(self.tmpdir.name) / "unmapped.pdf",
+            {"Premises_StreetAddress_A[0]": "1 Main St"},
+            {"Policy_LineOfBusiness_CrimeIndicator_A[0]": False},
+        )
+        self.assertIsNone(extract_form_data(unmapped))
+
+    def test_extract_document_skips_text_and_ocr(self):
+        with patch("app.extract.process_pdf") as process_pdf:
+            result = extract_document(self.pdf_path, False, "route")
+        process_pdf.assert_not_called()
+        self.assertEqual(result["agency"]["agency_name"], "Acme Agency")
+
+
+class TestAcroFormEndpoints(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.pdf_path = write_filled_form(Path(self.tmpdir.name) / "filled.pdf")
+        self.engine = ExtractionEngine(processes=1).start()
+        self.service = ExtractionService(
+            engine=self.engine,
+            cache=ExtractionCache(Path(self.tmpdir.name) / "cache"),
+            mode="route",
+        )
+        self.patcher = patch.object(app_main, "extraction_service", self.service)
+        self.patcher.start()
+        self.client = TestClient(app_main.app)
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        self.engine.shutdown()
+        self.tmpdir.cleanup()
+
+    def test_extract_pdf_returns_application(self):
+        files = {"file": ("form.pdf", self.pdf_path.read_bytes(), "application/pdf")}
+        response = self.client.post("/extract/pdf", files=files)
+        self.assertEqual(response.status_code, 200)
+        content = response.json()["content"]
+        self.assertEqual(content["first_named_insured"]["name"], "Widgets Inc")
+
+    def test_stream_pdf_form_event(self):
+        files = {"file": ("form.pdf", self.pdf_path.read_bytes(), "application/pdf")}
+        with self.client.stream("POST", "/extract/pdf/stream", files=files) as response:
+            events = [loads(line) for line in response.iter_lines() if line]
+        self.assertEqual([event["event"] for event in events], ["form", "done"])
+        self.assertEqual(
+            events[0]["application"]["agency"]["agency_name"], "Acme Agency"
+        )
+        self.assertEqual(events[1]["method_counts"], {"acroform": 1})
+        self.assertEqual(self.service.pending, 0)
+
+
+if __name__ == "__main__":
+    main()
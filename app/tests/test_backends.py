@@ -0,0 +1,159 @@
+from time import sleep
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from app.__init__ import DOCSTORE_PATH
+from app.backends import (
+    MIN_PROFILE_SAMPLES,
+    BackendRouter,
+    TextBackend,
+    document_profile,
+    extract_pdfium_data,
+    read_signals,
+)
+from app.data_model import DocumentSignals
+from app.extract import extraction_config, process_pdf
+
+TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+
+
+def make_signals(page_count=4, has_text_layer=True, producer="Acme PDF 1.0"):
+    return DocumentSignals(
+        page_count=page_count,
+        file_size=page_count * 50 * 2**10,
+        producer=producer,
+        text_chars=1000 if has_text_layer else 0,
+        has_text_layer=has_text_layer,
+    )
+
+
+class TestSignals(TestCase):
+    def test_read_signals(self):
+        signals = read_signals(TEST_PDF_PATH)
+        self.assertEqual(signals.page_count, 4)
+        self.assertTrue(signals.has_text_layer)
+        self.assertTrue(signals.producer.startswith("Silverlake"))
+        self.assertEqual(signals.file_size, TEST_PDF_PATH.stat().st_size)
+        self.assertEqual(document_profile(signals), "silverlake/light")
+
+    def test_pdfium_backend(self):
+        text = extract_pdfium_data(TEST_PDF_PATH)
+        self.assertIn("COMMERCIAL INSURANCE APPLICATION", text)
+        self.assertNotIn("\r", text)
+        skipped = extract_pdfium_data(TEST_PDF_PATH, skip_pages={1})
+        self.assertNotIn("COMMERCIAL INSURANCE APPLICATION", skipped)
+        self.assertTrue(skipped)
+
+    def test_missing_file(self):
+        with self.assertRaises(RuntimeError):
+            read_signals("missing.pdf")
+        with self.assertRaises(RuntimeError):
+            extract_pdfium_data("missing.pdf")
+
+
+class TestBackendRouter(TestCase):
+    def setUp(self) -> None:
+        self.fast = TextBackend("fast", MagicMock(return_value="fast"), 0.01)
+        self.slow = TextBackend("slow", MagicMock(return_value="slow"), 0.3)
+        self.ocr = TextBackend(
+            "ocr",
+            MagicMock(return_value="ocr"),
+            2.0,
+            needs_text_layer=False,
+            sharded=True,
+        )
+        self.router = BackendRouter(
+            [self.fast, self.slow, self.ocr], pinned="auto", explore_rate=0
+        )
+
+    def test_cheapest_backend_by_prior(self):
+        self.assertIs(self.router.choose(make_signals()), self.fast)
+
+    def test_ocr_without_text_layer(self):
+        self.assertIs(self.router.choose(make_signals(has_text_layer=False)), self.ocr)
+
+    def test_sharding_lowers_estimate(self):
+        signals = make_signals(page_count=8)
+        self.assertEqual(self.ocr.estimate(signals, workers=4), 4.0)
+        self.assertEqual(self.slow.estimate(signals, workers=4), 2.4)
+
+    def test_measured_latency_overrides_prior(self):
+        self.fast.record(4, 4.0)
+        self.assertEqual(self.fast.seconds_per_page(), 1.0)
+        self.assertIs(self.router.choose(make_signals()), self.slow)
+
+    def test_profile_latency_after_enough_samples(self):
+        scanned = make_signals(producer="Scanner 2.0")
+        profile = document_profile(scanned)
+        self.fast.record(4, 0.04)
+        for _ in range(MIN_PROFILE_SAMPLES):
+            self.fast.record(4, 4.0, profile)
+        self.assertIs(self.router.choose(scanned), self.slow)
+        self.assertLess(self.fast.seconds_per_page("acme/light"), 1.0)
+
+    def test_exploration_corrects_a_wrong_prior(self):
+        # Priors claim the opposite of how fast these backends really are
+        quick = TextBackend("quick", lambda pdf_path, **_: sleep(0.001) or "quick", 1.0)
+        sluggish = TextBackend(
+            "sluggish", lambda pdf_path, **_: sleep(0.02) or "sluggish", 0.1
+        )
+        router = BackendRouter([quick, sluggish], pinned="auto", seed=0)
+        self.assertIs(router.choose(make_signals()), sluggish)
+        router.explore_rate = 0.5
+        with patch("app.backends.read_signals", return_value=make_signals()):
+            for _ in range(10):
+                router.extract("doc.pdf")
+        self.assertGreater(quick.documents, 0)
+        router.explore_rate = 0
+        self.assertIs(router.choose(make_signals()), quick)
+
+    def test_exploration_never_picks_ocr_for_a_text_layer(self):
+        router = BackendRouter([self.fast, self.ocr], pinned="auto", explore_rate=1)
+        self.assertIs(router.choose(make_signals()), self.fast)
+        router = BackendRouter(
+            [self.fast, self.slow, self.ocr], pinned="auto", explore_rate=1
+        )
+        self.assertIs(router.choose(make_signals()), self.slow)
+
+    def test_pinned_backend(self):
+        router = BackendRouter([self.fast, self.slow, self.ocr], pinned="ocr")
+        self.assertIs(router.choose(make_signals()), self.ocr)
+        with self.assertRaises(ValueError):
+            BackendRouter([self.fast], pinned="missing").choose(make_signals())
+
+    def test_extract_reports_throughput(self):
+        with patch("app.backends.read_signals", return_value=make_signals()):
+            self.assertEqual(self.router.extract("doc.pdf"), "fast")
+        self.fast.func.assert_called_once_with("doc.pdf", skip_pages=())
+        stats = self.router.stats()
+        self.assertEqual(stats["fast"]["documents"], 1)
+        self.assertEqual(stats["fast"]["pages"], 4)
+        self.assertEqual(stats["slow"]["pages_per_second"], None)
+
+    def test_sharded_backend_gets_engine(self):
+        engine = MagicMock(processes=2)
+        signals = make_signals(has_text_layer=False)
+        with patch("app.backends.read_signals", return_value=signals):
+            self.assertEqual(self.router.extract("doc.pdf", engine=engine), "ocr")
+        self.ocr.func.assert_called_once_with("doc.pdf", skip_pages=(), engine=engine)
+
+    def test_skipped_pages_are_not_counted(self):
+        with patch("app.backends.read_signals", return_value=make_signals()):
+            self.router.extract("doc.pdf", skip_pages={2, 3})
+        self.fast.func.assert_called_once_with("doc.pdf", skip_pages={2, 3})
+        self.assertEqual(self.router.stats()["fast"]["pages"], 2)
+
+
+class TestBackendMode(TestCase):
+    def test_process_pdf_backend_mode(self):
+        with patch("app.backends.TextBackend.extract", return_value="text") as extract:
+            self.assertEqual(process_pdf(TEST_PDF_PATH, False, mode="backend"), "text")
+        extract.assert_called_once()
+
+    def test_backend_pin_in_cache_key(self):
+        self.assertEqual(extraction_config("backend")["text_backend"], "auto")
+        self.assertIsNone(extraction_config("route")["text_backend"])
+
+
+if __name__ == "__main__":
+    main()
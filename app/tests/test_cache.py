@@ -0,0 +1,159 @@
+from os import utime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from PIL import Image
+
+from app.cache import (
+    ExtractionCache,
+    RasterCache,
+    content_hash,
+    file_digest,
+    make_cache_key,
+)
+from app.extract import PDFExtractor
+from app.render import render_page
+
+PDF_BYTES = b"%PDF-1.4 test document"
+
+
+class TestExtractionCache(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.path = self.tmpdir.name
+        self.key = make_cache_key(PDF_BYTES, "1", {"mode": "compare"})
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_key_depends_on_version_and_config(self):
+        self.assertTrue(self.key.startswith(content_hash(PDF_BYTES)))
+        self.assertNotEqual(
+            self.key, make_cache_key(PDF_BYTES, "2", {"mode": "compare"})
+        )
+        self.assertNotEqual(self.key, make_cache_key(PDF_BYTES, "1", {"mode": "route"}))
+
+    def test_memory_then_disk_hit(self):
+        cache = ExtractionCache(self.path)
+        self.assertIsNone(cache.get(self.key))
+        cache.set(self.key, "extracted text")
+        self.assertEqual(cache.get(self.key), "extracted text")
+        restarted = ExtractionCache(self.path)
+        self.assertEqual(restarted.get(self.key), "extracted text")
+        self.assertEqual(cache.stats()["memory_hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+    def test_hits_are_copies(self):
+        cache = ExtractionCache(self.path)
+        cache.set(self.key, {"pages": ["text"]})
+        cache.get(self.key)["pages"].append("mutated")
+        self.assertEqual(cache.get(self.key), {"pages": ["text"]})
+        restarted = ExtractionCache(self.path)
+        restarted.get(self.key)["pages"].clear()
+        self.assertEqual(restarted.get(self.key), {"pages": ["text"]})
+
+    def test_unreadable_entry_is_a_miss(self):
+        cache = ExtractionCache(self.path)
+        cache.set(self.key, "extracted text")
+        file = cache._file(self.key)
+        file.write_text('{"created": 1')
+        restarted = ExtractionCache(self.path)
+        self.assertIsNone(restarted.get(self.key))
+        self.assertFalse(file.exists())
+        self.assertEqual(restarted.stats()["disk_bytes"], 0)
+        restarted.set(self.key, "extracted text")
+        self.assertEqual(ExtractionCache(self.path).get(self.key), "extracted text")
+        self.assertEqual(list(Path(self.path).glob("*/*.tmp")), [])
+
+    def test_ttl_expiry(self):
+        cache = ExtractionCache(self.path, ttl=60)
+        with patch("app.cache.time", return_value=1000.0):
+            cache.set(self.key, "extracted text")
+        with patch("app.cache.time", return_value=1100.0):
+            self.assertIsNone(cache.get(self.key))
+        self.assertEqual(cache.stats()["expirations"], 2)
+        self.assertEqual(cache.stats()["disk_bytes"], 0)
+
+    def test_lru_eviction(self):
+        cache = ExtractionCache(self.path, max_entries=2, max_bytes=0)
+        for key in ("a1", "b2", "c3"):
+            cache.set(key, key)
+        self.assertEqual(cache.stats()["memory_entries"], 2)
+        self.assertEqual(cache.stats()["disk_bytes"], 0)
+        self.assertIsNone(cache.get("a1"))
+        self.assertEqual(cache.get("c3"), "c3")
+
+    def test_invalidate(self):
+        cache = ExtractionCache(self.path)
+        cache.set(self.key, "extracted text")
+        cache.set(make_cache_key(b"other", "1", {}), "other text")
+        self.assertEqual(cache.invalidate(content_hash(PDF_BYTES)), 1)
+        self.assertIsNone(cache.get(self.key))
+        self.assertEqual(cache.invalidate(), 1)
+        self.assertEqual(cache.stats()["disk_bytes"], 0)
+
+
+class TestRasterCache(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.path = Path(self.tmpdir.name)
+        self.page = Image.linear_gradient("L").resize((85, 110))
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_round_trip_is_grayscale(self):
+        cache = RasterCache(self.path / "rasters")
+        self.assertIsNone(cache.get("ab12", 1, 200))
+        cache.set("ab12", 1, 200, "L", self.page.convert("RGB"))
+        cached = cache.get("ab12", 1, 200)
+        self.assertEqual(cached.mode, "L")
+        self.assertEqual(cached.tobytes(), self.page.tobytes())
+        self.assertIsNone(cache.get("ab12", 1, 300))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_size_capped_lru_eviction(self):
+        cache = RasterCache(self.path / "rasters", max_bytes=25000)
+        for page_number in (1, 2):
+            cache.set("ab12", page_number, 200, "L", self.page)
+        # Age page 2 so it is the least recently used
+        old = cache._file("ab12", 2, 200, "L")
+        utime(old, (0, 0))
+        cache.set("ab12", 3, 200, "L", self.page)
+        self.assertIsNone(cache.get("ab12", 2, 200))
+        self.assertIsNotNone(cache.get("ab12", 1, 200))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_render_page_skips_rasterization_on_hit(self):
+        pdf_path = self.path / "document.pdf"
+        pdf_path.write_bytes(PDF_BYTES)
+        cache = RasterCache(self.path / "rasters")
+        with (
+            patch("app.render.get_raster_cache", return_value=cache),
+            patch("app.render.convert_from_path", return_value=[self.page]) as render,
+        ):
+            first = render_page(pdf_path, 1)
+            second = render_page(pdf_path, 1)
+        render.assert_called_once()
+        self.assertEqual(first.tobytes(), second.tobytes())
+        self.assertEqual(file_digest(pdf_path), content_hash(PDF_BYTES))
+
+
+class TestPDFExtractorCache(TestCase):
+    @patch("app.extract.set_experiment")
+    @patch("app.extract.set_tracking_uri")
+    def test_cache_hit_skips_extraction(self, *_):
+        with TemporaryDirectory() as path:
+            extractor = PDFExtractor(None, cache=ExtractionCache(path))
+            with patch("app.extract.process_pdf", return_value="text") as mock_process:
+                self.assertEqual(extractor.process_pdf(PDF_BYTES), "text")
+                self.assertEqual(extractor.process_pdf(PDF_BYTES), "text")
+            mock_process.assert_called_once()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from numpy import full, uint8
+from PIL import ImageDraw
+from pypdfium2 import PdfDocument
+
+from app.__init__ import DOCSTORE_PATH
+from app.checkboxes import detect_checkboxes, fill_ratios
+from app.extract import extract_document, structure_text
+from app.templates import TemplateRegistry
+
+TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+DPI = 144
+
+
+def render_form(marked: set[str]):
+    """renders page 1 of the blank ACORD form with an X drawn in the boxes of
+    the ``marked`` values"""
+    pdf = PdfDocument(str(TEST_PDF_PATH))
+    image = pdf[0].render(scale=DPI / 72, grayscale=True).to_pil()
+    pdf.close()
+    draw = ImageDraw.Draw(image)
+    scale = DPI / 72
+    for checkbox in TemplateRegistry().get("ca_app").checkboxes_on_page(1):
+        if checkbox.value in marked:
+            x0, top, x1, bottom = (point * scale for point in checkbox.bbox)
+            draw.line((x0 + 3, top + 3, x1 - 3, bottom - 3), fill=0, width=3)
+            draw.line((x0 + 3, bottom - 3, x1 - 3, top + 3), fill=0, width=3)
+    return image
+
+
+class TestFillRatios(TestCase):
+    def test_ratios_for_all_boxes_in_one_pass(self):
+        page = full((144, 144), 255, dtype=uint8)
+        page[0:72, 0:72] = 0
+        page[100:110, 100:105] = 0
+        ratios = fill_ratios(
+            page, [(0, 0, 36, 36), (48, 48, 58, 58), (60, 0, 70, 10)], 144, 0
+        )
+        self.assertEqual(ratios.tolist(), [1.0, 0.125, 0.0])
+
+    def test_inset_excludes_outline(self):
+        page = full((40, 40), 255, dtype=uint8)
+        page[0, :] = page[-1, :] = page[:, 0] = page[:, -1] = 0
+        self.assertEqual(fill_ratios(page, [(0, 0, 40, 40)], 72).tolist(), [0.0])
+        self.assertGreater(fill_ratios(page, [(0, 0, 40, 40)], 72, 0)[0], 0.09)
+
+    def test_no_boxes(self):
+        self.assertEqual(len(fill_ratios(full((10, 10), 255), [], 72)), 0)
+
+
+class TestDetectCheckboxes(TestCase):
+    def test_detects_marked_form_boxes(self):
+        checkboxes = TemplateRegistry().get("ca_app").checkboxes_on_page(1)
+        marked = {"Business Auto", "Umbrella", "LLC"}
+        with patch("app.checkboxes.render_page", return_value=render_form(marked)):
+            marks = detect_checkboxes(
+                TEST_PDF_PATH, 1, [checkbox.bbox for checkbox in checkboxes], DPI
+            )
+        self.assertEqual(
+            {
+                checkbox.value
+                for checkbox, mark in zip(checkboxes, marks, strict=True)
+                if mark
+            },
+            marked,
+        )
+
+    def test_blank_form_has_no_marks(self):
+        checkboxes = TemplateRegistry().get("ca_app").checkboxes_on_page(1)
+        with patch("app.checkboxes.render_page", return_value=render_form(set())):
+            marks = detect_checkboxes(
+                TEST_PDF_PATH, 1, [checkbox.bbox for checkbox in checkboxes], DPI
+            )
+        self.assertFalse(any(marks))
+
+
+class TestCheckedLinesOfBusiness(TestCase):
+    def test_checked_line_without_premium_is_extracted(self):
+        with (
+            patch("app.extract.ACROFORM_FAST_PATH", False),
+            patch("app.extract.CHECKBOX_LINES_OF_BUSINESS", True),
+            patch("app.extract.process_pdf", return_value="AGENCY Acme Agency\n"),
+            patch(
+                "app.checkboxes.render_page",
+                return_value=render_form({"Business Auto", "LLC"}),
+            ),
+            patch(
+                "app.templates.detect_checkboxes",
+                side_effect=lambda *args: detect_checkboxes(*args, DPI),
+            ),
+        ):
+            application = structure_text(
+                extract_document(TEST_PDF_PATH, False, "route")
+            )
+        self.assertEqual(application["agency"]["agency_name"], "Acme Agency")
+        self.assertEqual(
+            application["policy_info"]["lines_of_business"], ["Business Auto"]
+        )
+        self.assertEqual(application["policy_info"]["premium_details"], {})
+
+    def test_other_documents_stay_text(self):
+        with (
+            patch("app.extract.ACROFORM_FAST_PATH", False),
+            patch("app.extract.CHECKBOX_LINES_OF_BUSINESS", True),
+            patch("app.extract.process_pdf", return_value="text"),
+            patch("app.templates.classify_pdf", return_value=[]),
+        ):
+            self.assertEqual(extract_document(TEST_PDF_PATH, False, "route"), "text")
+
+    def test_checkboxes_are_not_read_by_default(self):
+        with (
+            patch("app.extract.ACROFORM_FAST_PATH", False),
+            patch("app.extract.process_pdf", return_value="text"),
+            patch("app.extract.read_lines_of_business") as read,
+        ):
+            self.assertEqual(extract_document(TEST_PDF_PATH, False, "route"), "text")
+        read.assert_not_called()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from PIL import Image
+from reportlab.pdfgen.canvas import Canvas
+
+from app.__init__ import DOCSTORE_PATH
+from app.classify import (
+    PageClassifier,
+    PageFingerprint,
+    difference_hash,
+    document_template,
+)
+from app.data_model import PageClass
+from app.extract import route_pdf
+from app.service import extract_classified
+
+TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+TEST_IMAGE_PATH = DOCSTORE_PATH / "ACORD_CA_APP.jpg"
+
+LETTER = (
+    "Dear underwriter, please find enclosed the renewal submission for our "
+    "client together with their loss history for the last five years. "
+)
+
+
+def write_letter(path: Path) -> Path:
+    """writes a cover letter page followed by a blank page"""
+    canvas = Canvas(str(path))
+    text = canvas.beginText(50, 750)
+    for _ in range(5):
+        text.textLine(LETTER[:80])
+        text.textLine(LETTER[80:])
+    canvas.drawText(text)
+    canvas.showPage()
+    canvas.showPage()
+    canvas.save()
+    return path
+
+
+class TestPageClassifier(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.letter_path = write_letter(Path(self.tmpdir.name) / "letter.pdf")
+        self.classifier = PageClassifier()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_template_pages_match_by_text(self):
+        classes = self.classifier.classify_pdf(TEST_PDF_PATH)
+        self.assertEqual(
+            [(page.template, page.template_page) for page in classes],
+            [("ca_app", 1), ("ca_app", 2), ("ca_app", 3), ("ca_app", 4)],
+        )
+        self.assertEqual({page.method for page in classes}, {"text"})
+        self.assertEqual(document_template(classes), "ca_app")
+
+    def test_scanned_page_matches_by_thumbnail(self):
+        with Image.open(TEST_IMAGE_PATH) as image:
+            fingerprint = PageFingerprint(difference_hash(image), frozenset(), 50.0)
+        page = self.classifier.classify(1, fingerprint)
+        self.assertEqual((page.template, page.template_page), ("ca_app", 1))
+        self.assertEqual(page.method, "image")
+
+    def test_unknown_and_blank_pages(self):
+        classes = self.classifier.classify_pdf(self.letter_path)
+        self.assertEqual([page.template for page in classes], ["unknown", "blank"])
+        self.assertIsNone(document_template(classes))
+
+    def test_add_form_and_reload(self):
+        with TemporaryDirectory() as path:
+            PageClassifier(path).add_form("letter", self.letter_path, save=True)
+            reloaded = PageClassifier(path)
+        self.assertEqual(reloaded.names(), ["letter"])
+        classes = reloaded.classify_pdf(self.letter_path)
+        self.assertEqual(classes[0].template, "letter")
+        self.assertEqual(classes[0].score, 1.0)
+
+    def test_missing_file(self):
+        with self.assertRaises(RuntimeError):
+            self.classifier.classify_pdf("missing.pdf")
+
+
+class TestClassifiedExtraction(TestCase):
+    def test_document_template(self):
+        self.assertEqual(
+            document_template([PageClass(1, "ca_app", 1), PageClass(2, "blank", None)]),
+            "ca_app",
+        )
+        self.assertIsNone(
+            document_template([PageClass(1, "ca_app", 1), PageClass(2, "unknown")])
+        )
+
+    def test_template_document_takes_region_path(self):
+        with (
+            patch("app.service.extract_template_fields", return_value={}) as fields,
+            patch("app.service.extract_document") as document,
+        ):
+            self.assertEqual(extract_classified(TEST_PDF_PATH, "route"), {})
+        fields.assert_called_once_with(TEST_PDF_PATH, "ca_app", workers=1)
+        document.assert_not_called()
+
+    def test_blank_pages_are_skipped(self):
+        with TemporaryDirectory() as path:
+            letter_path = write_letter(Path(path) / "letter.pdf")
+            with patch("app.service.extract_template_fields") as fields:
+                text = extract_classified(letter_path, "route")
+            report = route_pdf(letter_path, workers=1, skip_pages=[2])
+        fields.assert_not_called()
+        self.assertIn("renewal submission", text)
+        self.assertEqual(report.method_counts, {"text": 1, "skipped": 1})
+
+
+if __name__ == "__main__":
+    main()
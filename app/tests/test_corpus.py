@@ -0,0 +1,140 @@
+from json import loads
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from pypdfium2 import PdfDocument
+
+from app.corpus import (
+    corpus_pairs,
+    generate_corpus,
+    generate_shard,
+    read_manifest,
+    shard_seed,
+)
+from app.engine import ExtractionEngine
+from app.parse import parse_application
+from app.scoring import record_fields
+
+
+def pdf_text(pdf_path: Path) -> str:
+    pdf = PdfDocument(str(pdf_path))
+    try:
+        text = "\n".join(page.get_textpage().get_text_range() for page in pdf)
+        return text.replace("\r\n", "\n")
+    finally:
+        pdf.close()
+
+
+class TestGenerateShard(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.directory = Path(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_form_round_trips_through_parser(self):
+        shard = generate_shard(str(self.directory), 3, 30, 2, seed=7)
+        self.assertEqual(shard.shard, 3)
+        self.assertEqual(shard.seed, shard_seed(7, 3))
+        self.assertEqual(
+            shard.documents,
+            [
+                ("shard_00003/doc_0000030.pdf", "shard_00003/doc_0000030.json"),
+                ("shard_00003/doc_0000031.pdf", "shard_00003/doc_0000031.json"),
+            ],
+        )
+        self.assertEqual(shard.scanned, [False, False])
+        pdf_path, json_path = shard.documents[0]
+        expected = loads((self.directory / json_path).read_text())
+        text = pdf_text(self.directory / pdf_path)
+        self.assertIn("COMMERCIAL INSURANCE APPLICATION", text)
+        parsed = parse_application(text).to_dict()
+        self.assertEqual(record_fields(parsed), record_fields(expected))
+        self.assertEqual(read_manifest(self.directory), [shard])
+
+    def test_shards_are_deterministic(self):
+        first = generate_shard(str(self.directory / "a"), 1, 0, 3, seed=1)
+        second = generate_shard(str(self.directory / "b"), 1, 0, 3, seed=1)
+        other = generate_shard(str(self.directory / "c"), 2, 0, 3, seed=1)
+        for (_, a), (_, b), (_, c) in zip(
+            first.documents, second.documents, other.documents, strict=True
+        ):
+            self.assertEqual(
+                (self.directory / "a" / a).read_text(),
+                (self.directory / "b" / b).read_text(),
+            )
+            self.assertNotEqual(
+                (self.directory / "a" / a).read_text(),
+                (self.directory / "c" / c).read_text(),
+            )
+
+    def test_scanned_variant_has_no_text_layer(self):
+        shard = generate_shard(str(self.directory), 0, 0, 1, seed=0, scanned_ratio=1.0)
+        self.assertEqual(shard.scanned, [True])
+        self.assertEqual(pdf_text(self.directory / shard.documents[0][0]).strip(), "")
+
+
+class TestGenerateCorpus(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.directory = Path(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_machines_split_and_resume(self):
+        with ExtractionEngine(processes=2) as engine:
+            pairs = generate_corpus(
+                5, self.directory, shard_size=2, machine=0, machines=2, engine=engine
+            )
+            self.assertEqual(
+                [shard.shard for shard in read_manifest(self.directory)], [0, 2]
+            )
+            self.assertEqual(len(pairs), 3)
+            first_pdf = Path(pairs[0][0])
+            modified = first_pdf.stat().st_mtime_ns
+
+            pairs = generate_corpus(
+                5, self.directory, shard_size=2, machine=1, machines=2, engine=engine
+            )
+            self.assertEqual(len(pairs), 5)
+            self.assertEqual(pairs, corpus_pairs(self.directory))
+            self.assertEqual(
+                [Path(pdf_path).name for pdf_path, _ in pairs],
+                [f"doc_{n:07}.pdf" for n in range(5)],
+            )
+            self.assertTrue(all(Path(json_path).exists() for _, json_path in pairs))
+
+            # everything is finished, so nothing is generated again
+            generate_corpus(5, self.directory, shard_size=2, engine=engine)
+        self.assertEqual(first_pdf.stat().st_mtime_ns, modified)
+
+    def test_changed_document_count_regenerates_last_shard(self):
+        with ExtractionEngine(processes=1) as engine:
+            generate_corpus(3, self.directory, shard_size=2, engine=engine)
+            first = Path(corpus_pairs(self.directory)[0][0])
+            modified = first.stat().st_mtime_ns
+
+            # only the shard that was one document short is generated again
+            pairs = generate_corpus(4, self.directory, shard_size=2, engine=engine)
+            self.assertEqual(len(pairs), 4)
+            self.assertEqual(first.stat().st_mtime_ns, modified)
+
+            pairs = generate_corpus(1, self.directory, shard_size=2, engine=engine)
+        self.assertEqual(
+            [Path(pdf_path).name for pdf_path, _ in pairs], ["doc_0000000.pdf"]
+        )
+        self.assertEqual([shard.shard for shard in read_manifest(self.directory)], [0])
+
+    def test_settings_must_match_existing_corpus(self):
+        generate_corpus(0, self.directory, shard_size=2)
+        with self.assertRaises(ValueError):
+            generate_corpus(0, self.directory, shard_size=3)
+        with self.assertRaises(ValueError):
+            generate_corpus(2, self.directory, shard_size=2, machine=2, machines=2)
+
+
+if __name__ == "__main__":
+    main()
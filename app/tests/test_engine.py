@@ -0,0 +1,53 @@
+from unittest import TestCase, main
+
+from app.__init__ import DOCSTORE_PATH
+from app.engine import ExtractionEngine, get_engine, shutdown_engine
+from app.extract import compare_results, process_pdf
+
+TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+
+
+class TestExtractionEngine(TestCase):
+    def test_submit_and_map(self):
+        with ExtractionEngine(processes=2, max_tasks_per_child=1) as engine:
+            self.assertTrue(engine.running)
+            task = engine.submit(compare_results, "longer", "short")
+            self.assertEqual(task.get(timeout=30), "longer")
+            results = engine.map(compare_results, ["a", "bbb", "cc"], ["dd", "e", "f"])
+            self.assertEqual(results, ["dd", "bbb", "cc"])
+            with self.assertRaises(ValueError):
+                engine.map(compare_results, ["a", "bbb"], ["dd"])
+            results = engine.imap_unordered(
+                compare_results, ["a", "bbb", "cc"], ["dd", "e", "f"]
+            )
+            self.assertEqual(sorted(results), ["bbb", "cc", "dd"])
+        self.assertFalse(engine.running)
+
+    def test_submit_after_shutdown(self):
+        engine = ExtractionEngine(processes=1).start()
+        engine.shutdown()
+        with self.assertRaises(RuntimeError):
+            engine.submit(compare_results, "a", "b")
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            ExtractionEngine(processes=0)
+
+    def test_get_engine_is_shared(self):
+        try:
+            self.assertIs(get_engine(), get_engine())
+        finally:
+            shutdown_engine()
+
+    def test_process_pdf_reuses_engine(self):
+        try:
+            first = process_pdf(TEST_PDF_PATH)
+            second = process_pdf(TEST_PDF_PATH)
+            self.assertEqual(first, second)
+            self.assertIn("COMMERCIAL INSURANCE APPLICATION", first)
+        finally:
+            shutdown_engine()
+
+
+if __name__ == "__main__":
+    main()
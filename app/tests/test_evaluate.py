@@ -0,0 +1,166 @@
+from dataclasses import asdict
+from json import dumps, loads
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+
+from reportlab.pdfgen.canvas import Canvas
+
+from app.data_model import EvaluationResult
+from app.engine import ExtractionEngine
+from app.evaluate import (
+    EvaluationAggregator,
+    evaluate,
+    evaluate_document,
+    read_checkpoint,
+)
+from app.parse import parse_application
+
+FORM_TEXT = """COMMERCIAL INSURANCE APPLICATION DATE (MM/DD/YYYY) 01/15/2024
+AGENCY Acme Insurance Agency CARRIER Great Lakes Mutual NAIC CODE 12345
+CONTACT NAME: Jane Broker
+PROPOSED EFF DATE 02/{n:02}/2024
+"""
+
+
+def write_document(directory: Path, n: int, wrong: bool = False) -> tuple[str, str]:
+    """writes a text PDF and its expected record, with the agency name
+    expected wrong if ``wrong`` is set"""
+    text = FORM_TEXT.format(n=n)
+    pdf_path, json_path = directory / f"doc_{n}.pdf", directory / f"doc_{n}.json"
+    canvas = Canvas(str(pdf_path))
+    lines = canvas.beginText(50, 750)
+    for line in text.splitlines():
+        lines.textLine(line)
+    canvas.drawText(lines)
+    canvas.save()
+    expected = parse_application(text).to_dict()
+    if wrong:
+        expected["agency"]["agency_name"] = "unknown"
+    json_path.write_text(dumps(expected))
+    return str(pdf_path), str(json_path)
+
+
+class TestEvaluateDocument(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.directory = Path(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_scores_against_expected(self):
+        result = evaluate_document(*write_document(self.directory, 1), mode="route")
+        self.assertIsNone(result.error)
+        self.assertEqual(result.accuracy, 1.0)
+        self.assertEqual(result.matched, result.fields)
+        self.assertTrue(result.valid)
+        self.assertEqual(
+            result.extracted["agency.agency_name"], "Acme Insurance Agency"
+        )
+
+        result = evaluate_document(
+            *write_document(self.directory, 2, wrong=True), mode="route"
+        )
+        self.assertEqual(result.matched, result.fields - 1)
+
+    def test_failure_is_recorded(self):
+        result = evaluate_document("missing.pdf", "missing.json", mode="route")
+        self.assertIn("FileNotFoundError", result.error)
+        self.assertEqual(result.accuracy, 0.0)
+
+
+class TestEvaluationAggregator(TestCase):
+    def test_summary_and_table(self):
+        aggregator = EvaluationAggregator()
+        aggregator.add(EvaluationResult("a", "a", 1.0, 1.0, 4, 4, True))
+        aggregator.add(EvaluationResult("b", "b", 3.0, 0.5, 4, 2, False))
+        aggregator.add(EvaluationResult("c", "c", 2.0, error="boom"), resumed=True)
+        summary = aggregator.summary()
+        self.assertEqual(summary["documents"], 3)
+        self.assertEqual((summary["failed"], summary["invalid"]), (1, 1))
+        self.assertEqual(summary["resumed"], 1)
+        self.assertEqual(summary["accuracy"], 0.5)
+        self.assertEqual(summary["field_accuracy"], 0.75)
+        self.assertEqual(summary["seconds_p50"], 2.0)
+        table = aggregator.table()
+        self.assertEqual(table["columns"][0], "pdf_path")
+        self.assertEqual([row[0] for row in table["data"]], ["a", "b", "c"])
+
+    def test_empty(self):
+        self.assertEqual(EvaluationAggregator().summary(), {"documents": 0})
+
+
+class TestEvaluate(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.directory = Path(self.tmpdir.name)
+        self.pairs = [write_document(self.directory, n) for n in range(4)]
+        self.checkpoint = self.directory / "checkpoint" / "train.jsonl"
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_parallel_run_checkpoints_and_logs_once(self):
+        sink = MagicMock()
+        with ExtractionEngine(processes=2) as engine:
+            summary = evaluate(
+                self.pairs,
+                phase="train",
+                mode="route",
+                engine=engine,
+                checkpoint=self.checkpoint,
+                sink=sink,
+            )
+        self.assertEqual(summary["documents"], 4)
+        self.assertEqual(summary["accuracy"], 1.0)
+        lines = self.checkpoint.read_text().splitlines()
+        self.assertEqual(
+            sorted(loads(line)["pdf_path"] for line in lines),
+            sorted(pdf_path for pdf_path, _ in self.pairs),
+        )
+        sink.log_run.assert_called_once()
+        _, kwargs = sink.log_run.call_args
+        self.assertEqual(kwargs["params"]["phase"], "train")
+        self.assertEqual(len(kwargs["artifacts"]["train_documents.json"]["data"]), 4)
+        self.assertNotIn(
+            "extracted", kwargs["artifacts"]["train_documents.json"]["columns"]
+        )
+        fields = kwargs["artifacts"]["train_fields.json"]
+        self.assertEqual(fields["columns"][:2], ["field", "support"])
+        self.assertEqual((summary["precision"], summary["recall"]), (1.0, 1.0))
+        sink.flush.assert_called_once()
+
+    def test_resume_skips_finished_documents(self):
+        finished = EvaluationResult(*self.pairs[0], 123.0, 1.0, 1, 1, True)
+        self.checkpoint.parent.mkdir()
+        # the second line was cut short by an interrupted run
+        self.checkpoint.write_text(dumps(asdict(finished)) + '\n{"pdf_path": "do')
+        with ExtractionEngine(processes=2) as engine:
+            summary = evaluate(
+                self.pairs,
+                mode="route",
+                engine=engine,
+                checkpoint=self.checkpoint,
+                sink=MagicMock(),
+            )
+        self.assertEqual((summary["documents"], summary["resumed"]), (4, 1))
+        self.assertGreaterEqual(summary["seconds_p95"], 100)
+        self.assertEqual(len(read_checkpoint(self.checkpoint)), 4)
+
+        with ExtractionEngine(processes=1) as engine:
+            summary = evaluate(
+                self.pairs[:1],
+                mode="route",
+                engine=engine,
+                checkpoint=self.checkpoint,
+                resume=False,
+                sink=MagicMock(),
+            )
+        self.assertEqual(summary["resumed"], 0)
+        self.assertEqual(len(self.checkpoint.read_text().splitlines()), 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
+from pathlib import Path
+from signal import SIGKILL
+from threading import Lock
+from time import sleep
 from unittest import TestCase, main
 from unittest.mock import MagicMock, patch
 
+from PIL import Image
+
 from app.__init__ import DOCSTORE_PATH
 from app.extract import (
+    CancellableOCR,
     compare_results,
     extract_ocr_data,
     extract_pdf_data,
+    ocr_page_tiered,
+    ocr_pages_pipelined,
     process_pdf,
+    race_pdf,
+    route_pdf,
+    score_text_layer,
 )
 
 TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
@@ -67,6 +79,21 @@ class TestOCRExtraction(TestCase):
         self.assertIn("COMMERCIAL INSURANCE APPLICATION", result)
         self.assertIn("POLICY NUMBER", result)
 
+    def test_ocr_pdf_data_sharded(self):
+        result = extract_ocr_data(TEST_PDF_PATH, workers=2)
+        self.assertIn("COMMERCIAL INSURANCE APPLICATION", result)
+        self.assertIn("POLICY NUMBER", result)
+
+    def test_ocr_single_page_skips_pool(self):
+        with (
+            patch("app.extract.get_page_count", return_value=1),
+            patch("app.extract.extract_ocr_data_sharded") as mock_sharded,
+            patch("app.extract.convert_from_path", return_value=["page"]),
+            patch("app.extract.image_to_string", return_value="page text"),
+        ):
+            self.assertEqual(extract_ocr_data("one_page.pdf", workers=4), "page text")
+            mock_sharded.assert_not_called()
+
     def test_ocr_pdf_data_failure(self):
         with patch(
             "pdf2image.convert_from_path", side_effect=Exception("Conversion failed")
@@ -76,6 +103,137 @@ class TestOCRExtraction(TestCase):
             self.assertIn("Error in OCR process:", str(context.exception))
 
 
+class TestOCRPipeline(TestCase):
+    def render(self, pdf_path, first_page, output_folder, **_):
+        path = Path(output_folder) / f"page-{first_page}.ppm"
+        path.write_bytes(b"P5 1 1 255 \0")
+        with self.lock:
+            self.on_disk = len(list(Path(output_folder).iterdir()))
+            self.peak = max(self.peak, self.on_disk)
+        return [str(path)]
+
+    def ocr(self, path):
+        sleep(0.01)
+        return Path(path).stem
+
+    def setUp(self) -> None:
+        self.lock = Lock()
+        self.peak = 0
+
+    def test_pages_in_order_with_bounded_rasters(self):
+        with (
+            patch("app.extract.convert_from_path", side_effect=self.render),
+            patch("app.extract.image_to_string", side_effect=self.ocr),
+        ):
+            texts = list(ocr_pages_pipelined("doc.pdf", range(1, 21), prefetch=2))
+        self.assertEqual(texts, [f"page-{number}" for number in range(1, 21)])
+        # queued pages, one being OCRed and one just rendered
+        self.assertLessEqual(self.peak, 4)
+
+    def test_render_error_is_raised(self):
+        with (
+            patch("app.extract.convert_from_path", side_effect=OSError("bad page")),
+            self.assertRaises(OSError),
+        ):
+            list(ocr_pages_pipelined("doc.pdf", range(1, 3)))
+
+    def test_closing_early_stops_renderer(self):
+        with (
+            patch("app.extract.convert_from_path", side_effect=self.render) as render,
+            patch("app.extract.image_to_string", side_effect=self.ocr),
+        ):
+            pages = ocr_pages_pipelined("doc.pdf", range(1, 101), prefetch=1)
+            self.assertEqual(next(pages), "page-1")
+            pages.close()
+        self.assertLess(render.call_count, 10)
+
+
+def ocr_data(*words):
+    """builds image_to_data output from (text, confidence, line, left) words"""
+    return {
+        "text": [word[0] for word in words],
+        "conf": [word[1] for word in words],
+        "block_num": [1] * len(words),
+        "par_num": [1] * len(words),
+        "line_num": [word[2] for word in words],
+        "left": [word[3] for word in words],
+        "top": [20 * word[2] for word in words],
+        "width": [40] * len(words),
+        "height": [10] * len(words),
+    }
+
+
+class TestTieredOCR(TestCase):
+    def render(self, pdf_path, dpi, **_):
+        self.rendered.append(dpi)
+        return [Image.new("L", (dpi * 8, dpi * 11), 255)]
+
+    def setUp(self) -> None:
+        self.rendered = []
+
+    def test_confident_page_stays_at_low_dpi(self):
+        page = ocr_data(("ACORD", 95, 1, 10), ("APPLICATION", 91, 2, 10))
+        with (
+            patch("app.render.convert_from_path", side_effect=self.render),
+            patch("app.extract.image_to_data", return_value=page),
+        ):
+            text, stats = ocr_page_tiered("doc.pdf", 1, tiers=[150, 300])
+        self.assertEqual(text, "ACORD\nAPPLICATION")
+        self.assertEqual(self.rendered, [150])
+        self.assertEqual((stats.dpi, stats.tiers, stats.words), (150, [150], 2))
+        self.assertEqual(stats.escalated_lines, 0)
+
+    def test_only_low_confidence_lines_are_reocred(self):
+        page = ocr_data(
+            ("ACORD", 95, 1, 10), ("P0L1CY", 40, 2, 10), ("NAME", 90, 3, 10)
+        )
+        line = ocr_data(("POLICY", 92, 1, 0))
+        with (
+            patch("app.render.convert_from_path", side_effect=self.render),
+            patch(
+                "app.extract.image_to_data",
+                side_effect=lambda image, config, output_type: (
+                    line if config == "--psm 7" else page
+                ),
+            ) as mock_data,
+        ):
+            text, stats = ocr_page_tiered("doc.pdf", 1, tiers=[300, 150])
+        self.assertEqual(text, "ACORD\nPOLICY\nNAME")
+        self.assertEqual(self.rendered, [150, 300])
+        self.assertEqual(mock_data.call_count, 2)
+        self.assertEqual(
+            (stats.dpi, stats.tiers, stats.escalated_lines), (300, [150, 300], 1)
+        )
+        self.assertAlmostEqual(stats.confidence, (95 + 92 + 90) / 3)
+
+    def test_unreadable_page_is_reocred_whole(self):
+        pages = [ocr_data(), ocr_data(("ACORD", 90, 1, 10))]
+        with (
+            patch("app.render.convert_from_path", side_effect=self.render),
+            patch("app.extract.image_to_data", side_effect=pages),
+        ):
+            text, stats = ocr_page_tiered("doc.pdf", 1, tiers=[150, 300])
+        self.assertEqual(text, "ACORD")
+        self.assertEqual(stats.tiers, [150, 300])
+
+    def test_route_records_tier_stats(self):
+        with (
+            patch("app.extract.OCR_TIERED", True),
+            patch("app.extract.open_pdf", MagicMock()) as mock_pdf,
+            patch("app.render.convert_from_path", side_effect=self.render),
+            patch(
+                "app.extract.image_to_data",
+                return_value=ocr_data(("SCANNED", 93, 1, 10)),
+            ),
+        ):
+            mock_pdf.return_value.__enter__.return_value.pages = [
+                MagicMock(extract_text=MagicMock(return_value=""))
+            ]
+            report = route_pdf("scanned.pdf", workers=1)
+        self.assertEqual(report.pages[0].text, "SCANNED")
+        self.assertEqual(report.pages[0].ocr.tiers, [150])
+
+
 class TestPDFProcessing(TestCase):
     def test_compare_results(self):
         self.assertEqual(compare_results("Text longer", "short"), "Text longer")
@@ -86,6 +244,85 @@ class TestPDFProcessing(TestCase):
         with self.assertRaises(FileNotFoundError):
             process_pdf("non_existent_path.pdf")
 
+    def test_compare_mode_leaves_out_skipped_pages(self):
+        with (
+            patch("app.extract.get_page_count", return_value=3),
+            patch("app.extract.ocr_pages_pipelined", return_value=["1", "3"]) as ocr,
+        ):
+            text = process_pdf(TEST_PDF_PATH, False, "compare", skip_pages={2})
+        self.assertEqual(list(ocr.call_args.args[1]), [1, 3])
+        self.assertEqual(text, extract_pdf_data(TEST_PDF_PATH, skip_pages={2}))
+        self.assertLess(len(text), len(extract_pdf_data(TEST_PDF_PATH)))
+
+
+class TestPageRouting(TestCase):
+    def test_score_text_layer(self):
+        clean = score_text_layer("COMMERCIAL INSURANCE APPLICATION POLICY NUMBER")
+        self.assertTrue(clean.is_usable(10, 0.1, 0.5))
+        garbled = score_text_layer("(cid:12)(cid:13)(cid:14)(cid:15) \ufffd\ufffd ab")
+        self.assertGreater(garbled.garbage_ratio, 0.5)
+        self.assertFalse(garbled.is_usable(1, 0.1, 0.5))
+        empty = score_text_layer(None)
+        self.assertEqual(empty.char_count, 0)
+        self.assertFalse(empty.is_usable(1, 1.0, 0.0))
+
+    def test_route_template_pdf_uses_text_layer(self):
+        report = route_pdf(TEST_PDF_PATH, workers=1)
+        self.assertEqual(report.method_counts, {"text": len(report.pages)})
+        self.assertIn("COMMERCIAL INSURANCE APPLICATION", report.text)
+
+    def test_route_ocrs_only_failing_pages(self):
+        good = "APPLICANT INFORMATION SECTION " * 5
+        with (
+            patch("app.extract.open_pdf", MagicMock()) as mock_pdf,
+            patch("app.extract.ocr_page", return_value="ocr text") as mock_ocr,
+        ):
+            mock_pdf.return_value.__enter__.return_value.pages = [
+                MagicMock(extract_text=MagicMock(return_value=text))
+                for text in (good, "", good, "(cid:3)(cid:4)")
+            ]
+            report = route_pdf("scanned.pdf", workers=1)
+        self.assertEqual(report.method_counts, {"text": 2, "ocr": 2})
+        self.assertEqual([call.args[1] for call in mock_ocr.call_args_list], [2, 4])
+        self.assertEqual(report.pages[1].text, "ocr text")
+        self.assertEqual(report.to_dict()["method_counts"], {"text": 2, "ocr": 2})
+
+
+class TestSpeculativeRace(TestCase):
+    def test_cancel_kills_running_ocr(self):
+        with patch(
+            "app.extract.extract_ocr_data", side_effect=lambda *_, **__: sleep(60)
+        ):
+            job = CancellableOCR("slow.pdf", start_method="fork")
+        sleep(0.2)
+        job.cancel()
+        self.assertFalse(job.process.is_alive())
+        self.assertEqual(job.process.exitcode, -SIGKILL)
+
+    def test_result_from_ocr_process(self):
+        with patch("app.extract.extract_ocr_data", return_value="ocr text"):
+            job = CancellableOCR("scanned.pdf", start_method="fork")
+        self.assertEqual(job.result(timeout=30), "ocr text")
+
+    def test_good_text_layer_cancels_ocr(self):
+        text = "COMMERCIAL INSURANCE APPLICATION POLICY NUMBER " * 3
+        with (
+            patch("app.extract.extract_pdf_data", return_value=text),
+            patch("app.extract.CancellableOCR") as mock_job,
+        ):
+            self.assertEqual(race_pdf("digital.pdf"), text)
+        mock_job.return_value.result.assert_not_called()
+        mock_job.return_value.cancel.assert_called_once()
+
+    def test_poor_text_layer_waits_for_ocr(self):
+        with (
+            patch("app.extract.extract_pdf_data", return_value=""),
+            patch("app.extract.CancellableOCR") as mock_job,
+        ):
+            mock_job.return_value.result.return_value = "ocr text"
+            self.assertEqual(race_pdf("scanned.pdf", timeout=5), "ocr text")
+        mock_job.return_value.result.assert_called_once_with(5)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,212 @@
+from asyncio import gather, run
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import sleep
+from unittest import TestCase, main
+from unittest.mock import patch
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from fastapi.testclient import TestClient
+
+from app import main as app_main
+from app.__init__ import DOCSTORE_PATH
+from app.cache import ExtractionCache
+from app.engine import ExtractionEngine
+from app.jobs import DONE, QUEUED, RUNNING, BatchRunner, JobStore, unpack_zip
+from app.service import ExtractionService
+
+TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+
+
+class TestUnpackZip(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.path = Path(self.tmpdir.name)
+        self.zip_path = self.path / "upload.zip"
+        with ZipFile(self.zip_path, "w", ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("a.pdf", b"0" * 2**20)
+            zip_file.writestr("b.pdf", b"0" * 2**20)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_limits_checked_before_extracting(self):
+        for limits in [{"max_files": 3}, {"max_bytes": 2**21 - 1}]:
+            with self.subTest(**limits), self.assertRaises(ValueError):
+                unpack_zip(self.zip_path, self.path, 2, **limits)
+        self.assertEqual([path.name for path in self.path.iterdir()], ["upload.zip"])
+        documents = unpack_zip(self.zip_path, self.path, 1, 3, 2**21)
+        self.assertEqual([doc["filename"] for doc in documents], ["a.pdf", "b.pdf"])
+
+
+class TestJobStore(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        path = Path(self.tmpdir.name)
+        self.store = JobStore(f"sqlite:///{path / 'jobs.db'}", path / "jobs")
+
+    def tearDown(self) -> None:
+        self.store.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_job_lifecycle(self):
+        job_id = self.store.new_job_id()
+        documents = [
+            {"filename": f"doc_{i}.pdf", "path": f"/tmp/{i}.pdf", "sha256": str(i)}
+            for i in range(3)
+        ]
+        self.store.create_job(job_id, documents)
+        self.assertEqual(self.store.get_job(job_id)["status"], QUEUED)
+        self.assertEqual(self.store.unfinished_jobs(), [job_id])
+
+        self.store.update_document(job_id, 0, status=DONE, result='"text"')
+        job = self.store.get_job(job_id)
+        self.assertEqual(job["status"], "running")
+        self.assertEqual(job["counts"][DONE], 1)
+        self.assertEqual(len(self.store.pending_documents(job_id)), 2)
+
+        page = self.store.list_documents(job_id, offset=0, limit=2)
+        self.assertEqual([doc["position"] for doc in page], [0, 1])
+        self.assertEqual(page[0]["result"], "text")
+        done = self.store.list_documents(job_id, status=DONE)
+        self.assertEqual([doc["filename"] for doc in done], ["doc_0.pdf"])
+
+    def test_unknown_job(self):
+        self.assertIsNone(self.store.get_job("missing"))
+
+    def test_claims_are_exclusive_until_the_lease_lapses(self):
+        job_id = self.store.new_job_id()
+        self.store.create_job(
+            job_id, [{"filename": "a.pdf", "path": "/tmp/a.pdf", "sha256": "a"}]
+        )
+        with patch("app.jobs.time", return_value=1000.0):
+            self.assertTrue(self.store.claim_document(job_id, 0, "first"))
+            self.assertFalse(self.store.claim_document(job_id, 0, "second"))
+        with patch("app.jobs.time", return_value=1000.0 + self.store.lease / 2):
+            self.assertTrue(self.store.renew_document(job_id, 0, "first"))
+        with patch("app.jobs.time", return_value=1000.0 + self.store.lease):
+            self.assertFalse(self.store.claim_document(job_id, 0, "second"))
+        with patch("app.jobs.time", return_value=1000.0 + 2 * self.store.lease):
+            self.assertTrue(self.store.claim_document(job_id, 0, "second"))
+        self.assertFalse(self.store.update_document(job_id, 0, "first", status=DONE))
+        self.assertTrue(self.store.update_document(job_id, 0, "second", status=DONE))
+        self.assertFalse(self.store.claim_document(job_id, 0, "first"))
+
+
+class CountingService:
+    def __init__(self):
+        self.extracted = []
+
+    async def extract_path(self, path: Path, digest: str, kind: str) -> str:
+        self.extracted.append(digest)
+        return f"text {digest}"
+
+
+class TestBatchRunner(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        path = Path(self.tmpdir.name)
+        self.store = JobStore(f"sqlite:///{path / 'jobs.db'}", path / "jobs")
+
+    def tearDown(self) -> None:
+        self.store.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_processes_resuming_together_extract_each_document_once(self):
+        job_id = self.store.new_job_id()
+        self.store.create_job(
+            job_id,
+            [
+                {"filename": f"{i}.pdf", "path": f"/tmp/{i}.pdf", "sha256": str(i)}
+                for i in range(6)
+            ],
+        )
+        # A document held by a live process elsewhere is left alone
+        self.assertTrue(self.store.claim_document(job_id, 5, "elsewhere"))
+        service = CountingService()
+        runners = [BatchRunner(service, self.store, parallelism=2) for _ in range(3)]
+
+        async def resume_all():
+            for runner in runners:
+                runner.resume()
+            await gather(*(runner.wait() for runner in runners))
+
+        run(resume_all())
+        self.assertEqual(sorted(service.extracted), ["0", "1", "2", "3", "4"])
+        job = self.store.get_job(job_id)
+        self.assertEqual((job["counts"][DONE], job["counts"][RUNNING]), (5, 1))
+
+
+class TestBatchEndpoints(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        path = Path(self.tmpdir.name)
+        self.engine = ExtractionEngine(processes=2).start()
+        service = ExtractionService(
+            engine=self.engine, cache=ExtractionCache(path / "cache"), mode="route"
+        )
+        store = JobStore(f"sqlite:///{path / 'jobs.db'}", path / "jobs")
+        self.runner = BatchRunner(service, store, parallelism=2)
+        self.patchers = [
+            patch.object(app_main, "batch_runner", self.runner),
+            patch.object(app_main, "get_engine"),
+            patch.object(app_main, "shutdown_engine"),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self) -> None:
+        for patcher in self.patchers:
+            patcher.stop()
+        self.engine.shutdown()
+        self.runner.store.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_batch_of_pdfs_and_zip(self):
+        pdf_bytes = TEST_PDF_PATH.read_bytes()
+        archive = BytesIO()
+        with ZipFile(archive, "w") as zip_file:
+            zip_file.writestr("nested/zipped.pdf", pdf_bytes)
+            zip_file.writestr("notes.txt", "not a pdf")
+        files = [
+            ("files", ("first.pdf", pdf_bytes, "application/pdf")),
+            ("files", ("second.pdf", pdf_bytes, "application/pdf")),
+            ("files", ("bundle.zip", archive.getvalue(), "application/zip")),
+        ]
+        with TestClient(app_main.app) as client:
+            response = client.post("/extract/batch", files=files)
+            self.assertEqual(response.status_code, 202)
+            job_id = response.json()["job_id"]
+            self.assertEqual(response.json()["total"], 3)
+
+            for _ in range(300):
+                job = client.get(f"/extract/batch/{job_id}").json()
+                if job["status"] == DONE:
+                    break
+                sleep(0.1)
+            self.assertEqual(job["counts"][DONE], 3)
+
+            page = client.get(
+                f"/extract/batch/{job_id}/documents", params={"offset": 1, "limit": 5}
+            ).json()
+            self.assertEqual(
+                [doc["filename"] for doc in page["documents"]],
+                ["second.pdf", "zipped.pdf"],
+            )
+            self.assertIn(
+                "COMMERCIAL INSURANCE APPLICATION", page["documents"][0]["result"]
+            )
+            self.assertEqual(client.get("/extract/batch/missing").status_code, 404)
+
+    def test_empty_batch_rejected(self):
+        with TestClient(app_main.app) as client:
+            response = client.post(
+                "/extract/batch",
+                files=[("files", ("notes.zip", b"", "application/zip"))],
+            )
+        self.assertEqual(response.status_code, 422)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from numpy import array, zeros
+
+from app.__init__ import DOCSTORE_PATH
+from app.extract import extract_pdf_data
+from app.layout import WORD_DTYPE, PageLayout, extract_layout
+
+TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+
+
+def make_layout(*words) -> PageLayout:
+    """builds a layout from (text, x0, top, x1, line) words in reading order"""
+    boxes = zeros(len(words), dtype=WORD_DTYPE)
+    for index, (_, x0, top, x1, line) in enumerate(words):
+        boxes[index] = (x0, top, x1, top + 8, 8, line)
+    return PageLayout(1, 612, 792, boxes, array([word[0] for word in words]))
+
+
+class TestPageLayout(TestCase):
+    def setUp(self) -> None:
+        self.layout = make_layout(
+            ("Named", 20, 100, 50, 0),
+            ("Insured:", 52, 100, 90, 0),
+            ("Widgets", 100, 101, 140, 0),
+            ("Inc", 142, 100, 160, 0),
+            ("FEIN", 20, 120, 45, 1),
+            ("12-3456789", 20, 130, 80, 2),
+        )
+
+    def test_lines_in_reading_order(self):
+        self.assertEqual(
+            self.layout.lines, ["Named Insured: Widgets Inc", "FEIN", "12-3456789"]
+        )
+
+    def test_find_multi_word_label(self):
+        self.assertEqual(self.layout.find("named insured:"), [(20, 100, 90, 108)])
+        self.assertEqual(self.layout.find("Insured: FEIN"), [])
+
+    def test_spatial_queries(self):
+        self.assertEqual(self.layout.value_right_of("Named Insured:"), "Widgets Inc")
+        self.assertEqual(self.layout.value_right_of("Insured:", 5), None)
+        self.assertEqual(self.layout.value_below("FEIN"), "12-3456789")
+        self.assertEqual(list(self.layout.within((0, 95, 95, 110))), [0, 1])
+
+
+class TestExtractLayout(TestCase):
+    def test_template_pdf_layout(self):
+        layouts = extract_layout(TEST_PDF_PATH, pages=[1])
+        page = layouts[0]
+        self.assertEqual(page.page_number, 1)
+        self.assertEqual(page.words.dtype, WORD_DTYPE)
+        self.assertEqual(page.lines[0], "COMMERCIAL INSURANCE APPLICATION")
+        self.assertTrue(page.find("POLICY NUMBER"))
+        self.assertTrue((page.words["size"] > 0).all())
+
+    def test_missing_file(self):
+        with self.assertRaises(RuntimeError):
+            extract_layout("missing.pdf")
+
+    def test_extract_pdf_data_runs_layout_once_per_page(self):
+        pages = [
+            MagicMock(extract_text=MagicMock(return_value=text)) for text in ("a", "")
+        ]
+        with patch("app.extract.open_pdf", MagicMock()) as mock_pdf:
+            mock_pdf.return_value.__enter__.return_value.pages = pages
+            self.assertEqual(extract_pdf_data("doc.pdf"), "a")
+        for page in pages:
+            page.extract_text.assert_called_once()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from app.extract import PDFExtractor
+from app.llm import LocalModel, MicroBatcher, get_model
+
+
+class RecordingModel(LocalModel):
+    """local model that remembers the size of every batch it was called with"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batch_sizes = []
+
+    def __call__(self, records: list) -> list:
+        self.batch_sizes.append(len(records))
+        return [{**record, "seen": True} for record in super().__call__(records)]
+
+
+class TestMicroBatcher(TestCase):
+    def setUp(self) -> None:
+        self.model = RecordingModel(batch_latency=0.02)
+        self.batcher = MicroBatcher(self.model, max_batch_size=4, max_wait=0.5)
+
+    def tearDown(self) -> None:
+        self.batcher.shutdown()
+
+    def test_concurrent_records_share_batches(self):
+        records = [{"id": n} for n in range(10)]
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(self.batcher.process, records))
+        self.assertEqual(results, [{"id": n, "seen": True} for n in range(10)])
+        self.assertEqual(sum(self.model.batch_sizes), 10)
+        self.assertTrue(all(size <= 4 for size in self.model.batch_sizes))
+        self.assertLess(len(self.model.batch_sizes), 10)
+
+        stats = self.batcher.stats()
+        self.assertEqual(stats["records"], 10)
+        self.assertEqual(stats["batches"], len(self.model.batch_sizes))
+        self.assertGreater(stats["mean_occupancy"], 0.25)
+        self.assertGreaterEqual(stats["latency_p95"], stats["latency_p50"])
+        self.assertGreaterEqual(stats["latency_p50"], 0.02)
+
+    def test_max_wait_closes_partial_batch(self):
+        batcher = MicroBatcher(self.model, max_batch_size=100, max_wait=0.01)
+        try:
+            self.assertEqual(batcher.process({"id": 1}), {"id": 1, "seen": True})
+        finally:
+            batcher.shutdown()
+        self.assertEqual(self.model.batch_sizes, [1])
+        self.assertEqual(batcher.stats()["mean_occupancy"], 0.01)
+
+    def test_model_error_fails_whole_batch(self):
+        def broken(records):
+            raise ValueError("model unavailable")
+
+        batcher = MicroBatcher(broken, max_batch_size=2, max_wait=0.5)
+        try:
+            futures = [batcher.submit({"id": n}) for n in range(2)]
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result()
+            self.assertEqual(batcher.stats()["failed_batches"], 1)
+        finally:
+            batcher.shutdown()
+
+    def test_result_count_mismatch(self):
+        batcher = MicroBatcher(lambda records: [], max_batch_size=1)
+        try:
+            with self.assertRaises(RuntimeError):
+                batcher.process({"id": 1})
+        finally:
+            batcher.shutdown()
+
+    def test_shutdown_finishes_queued_records(self):
+        started, release = Event(), Event()
+
+        def slow(records):
+            started.set()
+            release.wait()
+            return records
+
+        batcher = MicroBatcher(slow, max_batch_size=1, max_wait=0)
+        first = batcher.submit(1)
+        started.wait()
+        second = batcher.submit(2)
+        release.set()
+        batcher.shutdown()
+        self.assertEqual((first.result(), second.result()), (1, 2))
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            MicroBatcher(self.model, max_batch_size=0)
+
+    def test_unknown_model(self):
+        with self.assertRaises(ValueError):
+            get_model("missing")
+
+
+class TestPassToLLM(TestCase):
+    @patch("app.extract.set_experiment")
+    @patch("app.extract.set_tracking_uri")
+    def test_pass_to_llm_uses_batcher(self, *_):
+        model = RecordingModel()
+        batcher = MicroBatcher(model, max_batch_size=2, max_wait=0)
+        try:
+            extractor = PDFExtractor(None, use_cache=False, batcher=batcher)
+            self.assertEqual(extractor.pass_to_llm({"a": 1}), {"a": 1, "seen": True})
+        finally:
+            batcher.shutdown()
+        self.assertEqual(model.batch_sizes, [1])
+
+
+if __name__ == "__main__":
+    main()
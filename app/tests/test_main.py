@@ -0,0 +1,119 @@
+from json import loads
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app import main as app_main
+from app.__init__ import DOCSTORE_PATH
+from app.cache import ExtractionCache
+from app.engine import ExtractionEngine
+from app.service import ExtractionService
+
+TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+
+
+class TestExtractionEndpoints(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.engine = ExtractionEngine(processes=1).start()
+        self.service = ExtractionService(
+            engine=self.engine, cache=ExtractionCache(self.tmpdir.name), mode="route"
+        )
+        self.patcher = patch.object(app_main, "extraction_service", self.service)
+        self.patcher.start()
+        self.client = TestClient(app_main.app)
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        self.engine.shutdown()
+        self.tmpdir.cleanup()
+
+    def test_ping(self):
+        response = self.client.get("/ping")
+        self.assertEqual(response.status_code, 200)
+
+    def test_extract_pdf(self):
+        files = {
+            "file": ("document.pdf", TEST_PDF_PATH.read_bytes(), "application/pdf")
+        }
+        response = self.client.post("/extract/pdf", files=files)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("COMMERCIAL INSURANCE APPLICATION", response.json()["content"])
+        self.assertEqual(self.service.pending, 0)
+
+        cached = self.client.post("/extract/pdf", files=files)
+        self.assertEqual(cached.json(), response.json())
+        self.assertEqual(self.service.cache.stats()["memory_hits"], 1)
+
+    def test_stream_pdf_ndjson(self):
+        files = {
+            "file": ("document.pdf", TEST_PDF_PATH.read_bytes(), "application/pdf")
+        }
+        with self.client.stream("POST", "/extract/pdf/stream", files=files) as response:
+            self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+            events = [loads(line) for line in response.iter_lines() if line]
+        pages = [event for event in events if event["event"] == "page"]
+        self.assertEqual(sorted(page["page_number"] for page in pages), [1, 2, 3, 4])
+        self.assertEqual(events[-1]["event"], "done")
+        self.assertEqual(events[-1]["method_counts"], {"text": 4})
+        self.assertEqual(self.service.pending, 0)
+
+    def test_stream_result_is_shared_only_with_the_same_output(self):
+        files = {
+            "file": ("document.pdf", TEST_PDF_PATH.read_bytes(), "application/pdf")
+        }
+        with patch("app.service.PAGE_CLASSIFIER", True):
+            self.client.post("/extract/pdf/stream", files=files)
+        # With the classifier on /extract/pdf returns template fields, not text
+        self.assertEqual(self.service.cache.stats()["memory_entries"], 0)
+
+        self.client.post("/extract/pdf/stream", files=files)
+        response = self.client.post("/extract/pdf", files=files)
+        self.assertIn("COMMERCIAL INSURANCE APPLICATION", response.json()["content"])
+        self.assertEqual(self.service.cache.stats()["memory_hits"], 1)
+
+    def test_stream_caches_what_extract_pdf_returns(self):
+        files = {
+            "file": ("document.pdf", TEST_PDF_PATH.read_bytes(), "application/pdf")
+        }
+        with (
+            patch("app.extract.CHECKBOX_LINES_OF_BUSINESS", True),
+            patch("app.extract.read_lines_of_business", return_value=["Umbrella"]),
+        ):
+            self.client.post("/extract/pdf/stream", files=files)
+            response = self.client.post("/extract/pdf", files=files)
+        self.assertEqual(self.service.cache.stats()["memory_hits"], 1)
+        self.assertEqual(
+            response.json()["content"]["policy_info"]["lines_of_business"],
+            ["Umbrella"],
+        )
+
+    def test_stream_pdf_sse(self):
+        files = {
+            "file": ("document.pdf", TEST_PDF_PATH.read_bytes(), "application/pdf")
+        }
+        headers = {"Accept": "text/event-stream"}
+        response = self.client.post("/extract/pdf/stream", files=files, headers=headers)
+        self.assertTrue(
+            response.headers["content-type"].startswith("text/event-stream")
+        )
+        self.assertEqual(response.text.count("event: page\n"), 4)
+        self.assertIn("event: done\n", response.text)
+
+    def test_missing_file_field(self):
+        response = self.client.post("/extract/pdf", data={"other": "value"})
+        self.assertEqual(response.status_code, 422)
+
+    def test_saturated_queue_returns_503(self):
+        self.service.max_pending = 0
+        files = {"file": ("document.pdf", b"%PDF-1.4", "application/pdf")}
+        response = self.client.post("/extract/pdf", files=files)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], str(self.service.retry_after))
+        self.assertEqual(self.service.stats()["rejected"], 1)
+
+
+if __name__ == "__main__":
+    main()
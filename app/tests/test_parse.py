@@ -0,0 +1,188 @@
+from json import dumps
+from pathlib import Path
+from re import compile
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from app.extract import PDFExtractor
+from app.parse import (
+    FieldParser,
+    ParserRegistry,
+    load_labels,
+    parse_application,
+    trie_pattern,
+)
+
+FILLED_TEXT = """COMMERCIAL INSURANCE APPLICATION DATE (MM/DD/YYYY) 01/15/2024
+AGENCY Acme Insurance Agency CARRIER Great Lakes Mutual NAIC CODE 12345
+CONTACT NAME: Jane Broker
+PHONE (A/C, No, Ext): (312) 555-0100 FAX (A/C, No): (312) 555-0199
+E-MAIL ADDRESS: jane@acme-agency.com
+CODE: A-77 SUBCODE: 3 AGENCY CUSTOMER ID: CUST-42
+POLICY NUMBER PN-1 PROPOSED EFF DATE 02/01/2024 PROPOSED EXP DATE 02/01/2025
+LINES OF BUSINESS
+BUSINESS AUTO $ 1,200.00
+UMBRELLA $ 300
+CRIME $
+NAME (First Named Insured) AND MAILING ADDRESS (including ZIP+4)
+Widgets Inc
+100 Main Street
+Suite 5
+Springfield, IL 62701-1234
+GL CODE 9101 SIC 3599 NAICS 332710 FEIN OR SOC SEC # 12-3456789
+WEBSITE ADDRESS www.widgets.example
+ENTITY TYPE: LLC NO. OF MEMBERS AND MANAGERS: 2
+NAME (Other Named Insured) AND MAILING ADDRESS (including ZIP+4)
+Widgets Holdings LLC
+200 Oak Avenue
+Chicago, IL 60601
+NAICS 551112
+DESCRIPTION OF PRIMARY OPERATIONS
+Machine shop producing custom parts
+DATE BUSINESS STARTED (MM/DD/YYYY) 03/01/2010
+ANNUAL REVENUES: $ 2,500,000
+# FULL TIME EMPL 25 # PART TIME EMPL 4
+"""
+
+
+class TestTriePattern(TestCase):
+    def test_longest_label_wins(self):
+        pattern = compile(trie_pattern(["AGENCY", "AGENCY CUSTOMER ID:", "AGE"]))
+        self.assertEqual(
+            pattern.findall("AGE AGENCY AGENCY CUSTOMER ID:"),
+            ["AGE", "AGENCY", "AGENCY CUSTOMER ID:"],
+        )
+
+    def test_spaces_match_runs_of_whitespace(self):
+        pattern = compile(trie_pattern(["GL CODE"]))
+        self.assertEqual(
+            pattern.findall("GL   CODE GL\tCODE"), ["GL   CODE", "GL\tCODE"]
+        )
+
+
+class TestFieldParser(TestCase):
+    def test_labels_come_from_template_files(self):
+        self.assertIn(("BUSINESS AUTO", "premium.Business Auto"), load_labels())
+        with TemporaryDirectory() as path:
+            labels = {"name": "memo", "labels": [{"label": "RE:", "field": None}]}
+            (Path(path) / "memo_labels.json").write_text(dumps(labels))
+            (Path(path) / "memo_layout.json").write_text("{}")
+            self.assertEqual(load_labels("memo", path), [("RE:", None)])
+            parser = FieldParser(load_labels("memo", path))
+            with self.assertRaises(KeyError):
+                load_labels("missing", path)
+        self.assertEqual(parser.anchors("RE: renewal"), [(None, 0, 3)])
+
+    def test_parsers_are_kept_per_template(self):
+        with TemporaryDirectory() as path:
+            for name, label, field in [
+                ("memo", "RE:", "agency.agency_name"),
+                ("letter", "DEAR", "insured.name"),
+            ]:
+                labels = {"name": name, "labels": [{"label": label, "field": field}]}
+                (Path(path) / f"{name}_labels.json").write_text(dumps(labels))
+            parsers = ParserRegistry(path)
+            memo = parsers.get("memo")
+            self.assertIs(parsers.get("memo"), memo)
+            # the letter's label is not an anchor when parsing a memo
+            self.assertEqual(
+                memo.anchors("RE: renewal DEAR"), [("agency.agency_name", 0, 3)]
+            )
+            self.assertEqual(
+                parsers.get("letter").anchors("RE: DEAR"), [("insured.name", 4, 8)]
+            )
+
+    def test_anchors_in_one_pass(self):
+        parser = FieldParser()
+        fields = [field for field, _, _ in parser.anchors(FILLED_TEXT)]
+        self.assertEqual(fields[:3], ["agency.agency_name", None, None])
+        # labels inside longer words or labels do not match on their own
+        self.assertEqual(fields.count("insured.sic_code"), 1)
+        self.assertEqual(fields.count("agency.agency_code"), 1)
+
+    def test_parse_filled_text(self):
+        application = parse_application(FILLED_TEXT)
+        agency = application.agency
+        self.assertEqual(agency.agency_name, "Acme Insurance Agency")
+        self.assertEqual(agency.agency_code, "A-77")
+        self.assertEqual(agency.customer_id, "CUST-42")
+        self.assertEqual(agency.contact_info.full_name, "Jane Broker")
+        self.assertEqual(agency.contact_info.phone_number, "(312) 555-0100")
+        self.assertEqual(agency.contact_info.fax_number, "(312) 555-0199")
+        self.assertEqual(agency.contact_info.email, "jane@acme-agency.com")
+
+        insured = application.first_named_insured
+        self.assertEqual(insured.name, "Widgets Inc")
+        self.assertEqual(insured.mailing_address.line1, "100 Main Street")
+        self.assertEqual(insured.mailing_address.line2, "Suite 5")
+        self.assertEqual(insured.mailing_address.city, "Springfield")
+        self.assertEqual(insured.mailing_address.zip_code, "62701-1234")
+        self.assertEqual(
+            (insured.sic_code, insured.naics_code, insured.fein_or_ssn),
+            ("3599", "332710", "12-3456789"),
+        )
+        self.assertEqual(insured.website_address, "www.widgets.example")
+        self.assertEqual(len(application.additional_insureds), 1)
+        other = application.additional_insureds[0]
+        self.assertEqual(other.name, "Widgets Holdings LLC")
+        self.assertEqual(other.mailing_address.state, "IL")
+        self.assertEqual(other.naics_code, "551112")
+
+        policy = application.policy_info
+        self.assertEqual(policy.proposed_eff_date, "02/01/2024")
+        self.assertEqual(policy.proposed_exp_date, "02/01/2025")
+        self.assertEqual(
+            policy.premium_details, {"Business Auto": 1200.0, "Umbrella": 300.0}
+        )
+        self.assertEqual(
+            [coverage.line_of_business for coverage in application.coverages],
+            ["Business Auto", "Umbrella"],
+        )
+
+        business = application.business_info
+        self.assertEqual(business.entity_type, "LLC")
+        self.assertEqual(business.number_of_members, 2)
+        self.assertEqual(
+            business.description_of_operations, "Machine shop producing custom parts"
+        )
+        self.assertEqual(business.business_started_date, "03/01/2010")
+        self.assertEqual(business.annual_revenue, 2500000.0)
+        self.assertEqual(
+            (business.no_of_employees_fulltime, business.no_of_employees_parttime),
+            (25, 4),
+        )
+
+    def test_checked_lines_come_before_premium_lines(self):
+        application = parse_application(FILLED_TEXT, ["Property", "Umbrella"])
+        self.assertEqual(
+            application.policy_info.lines_of_business,
+            ["Property", "Umbrella", "Business Auto"],
+        )
+        self.assertNotIn("Property", application.policy_info.premium_details)
+
+    def test_text_without_labels(self):
+        application = parse_application("Dear underwriter, please see attached.")
+        self.assertIsNone(application.agency.agency_name)
+        self.assertIsNone(application.first_named_insured.name)
+        self.assertEqual(application.additional_insureds, [])
+        self.assertEqual(application.coverages, [])
+
+
+@patch("app.extract.set_experiment")
+@patch("app.extract.set_tracking_uri")
+class TestStructureData(TestCase):
+    def test_text_is_parsed_into_application(self, *_):
+        data = PDFExtractor(None, use_cache=False).structure_data(FILLED_TEXT)
+        self.assertEqual(data["first_named_insured"]["name"], "Widgets Inc")
+        self.assertEqual(
+            data["policy_info"]["lines_of_business"], ["Business Auto", "Umbrella"]
+        )
+
+    def test_structured_data_passes_through(self, *_):
+        data = {"first_named_insured": {"name": "Widgets Inc"}}
+        self.assertIs(PDFExtractor(None, use_cache=False).structure_data(data), data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+from random import Random
+from unittest import TestCase, main
+from warnings import catch_warnings, simplefilter
+
+from pandas import DataFrame
+
+from app.scoring import (
+    SCORE_COLUMNS,
+    edit_distances,
+    edit_similarity,
+    fields_frame,
+    flatten_record,
+    latency_percentiles,
+    record_fields,
+    score_fields,
+    score_records,
+)
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char != other),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+class TestFlattenRecord(TestCase):
+    def test_paths(self):
+        record = {"a": {"b": 1, "c": [{"d": 2}, 3]}, "e": None}
+        self.assertEqual(
+            flatten_record(record), {"a.b": 1, "a.c[0].d": 2, "a.c[1]": 3, "e": None}
+        )
+        self.assertEqual(
+            record_fields({**record, "f": 2.0, "g": ""}),
+            {"a.b": "1", "a.c[0].d": "2", "a.c[1]": "3", "f": "2"},
+        )
+
+
+class TestEditDistance(TestCase):
+    def test_matches_reference(self):
+        random = Random(0)
+
+        def text():
+            return "".join(random.choice("abé ") for _ in range(random.randint(0, 9)))
+
+        a = [text() for _ in range(500)]
+        b = [text() for _ in range(500)]
+        self.assertEqual(
+            list(edit_distances(a, b)),
+            [levenshtein(x, y) for x, y in zip(a, b, strict=True)],
+        )
+
+    def test_similarity(self):
+        similarity = edit_similarity(
+            ["kitten", "abc", "kitten"], ["sitting", "abd", "sitting"]
+        )
+        self.assertAlmostEqual(similarity[0], 4 / 7)
+        self.assertAlmostEqual(similarity[1], 2 / 3)
+        self.assertEqual(similarity[0], similarity[2])
+        self.assertEqual(len(edit_similarity([], [])), 0)
+
+
+class TestScoreFields(TestCase):
+    def test_per_field_scores(self):
+        expected = fields_frame(
+            record_fields(record)
+            for record in [
+                {"name": "Widgets Inc", "revenue": 1200, "naics": None},
+                {"name": "Acme", "revenue": 5.0, "naics": "332710"},
+            ]
+        )
+        extracted = fields_frame(
+            record_fields(record)
+            for record in [
+                {"name": "Widgets Inc", "revenue": 1200.0, "naics": None},
+                {"name": "Acne", "revenue": None, "naics": "332710", "extra": "x"},
+            ]
+        )
+        fields = score_fields(expected, extracted)
+        self.assertEqual(list(fields.index), ["extra", "naics", "name", "revenue"])
+        name = fields.loc["name"]
+        self.assertEqual((name["support"], name["matched"]), (2, 1))
+        self.assertEqual(name["exact_match"], 0.5)
+        self.assertAlmostEqual(name["similarity"], (1 + 0.75) / 2)
+        revenue = fields.loc["revenue"]
+        self.assertEqual((revenue["precision"], revenue["recall"]), (1.0, 0.5))
+        naics = fields.loc["naics"]
+        self.assertEqual((naics["exact_match"], naics["precision"]), (1.0, 1.0))
+        extra = fields.loc["extra"]
+        self.assertEqual((extra["support"], extra["precision"]), (0, 0.0))
+
+    def test_score_records_summary(self):
+        fields, metrics = score_records(
+            [{"a": "x", "b": "y"}], [{"a": "x", "b": "z"}], seconds=[1.0, 3.0]
+        )
+        self.assertEqual(len(fields), 2)
+        self.assertEqual((metrics["precision"], metrics["recall"]), (0.5, 0.5))
+        self.assertEqual(metrics["seconds_p50"], 2.0)
+
+    def test_empty(self):
+        fields, metrics = score_records([], [])
+        self.assertTrue(fields.empty)
+        self.assertEqual(metrics, {})
+        self.assertEqual(latency_percentiles([]), {})
+
+    def test_no_rows(self):
+        with catch_warnings():
+            simplefilter("error")
+            fields = score_fields(DataFrame(columns=["a"]), DataFrame())
+        self.assertTrue(fields.empty)
+        self.assertEqual(list(fields.columns), SCORE_COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import sleep
+from unittest import TestCase, main
+
+from app.singleflight import SingleFlight
+
+
+class TestSingleFlight(TestCase):
+    def test_concurrent_calls_coalesce(self):
+        group = SingleFlight()
+        release = Event()
+        calls = []
+
+        def extract(value):
+            calls.append(value)
+            release.wait(timeout=10)
+            return f"text for {value}"
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            leader = executor.submit(group.do, "doc", extract, "doc")
+            while group.in_flight() == 0:
+                sleep(0.01)
+            followers = [
+                executor.submit(group.do, "doc", extract, "doc") for _ in range(4)
+            ]
+            while group.stats()["coalesced"] < 4:
+                sleep(0.01)
+            release.set()
+            results = [leader.result()] + [future.result() for future in followers]
+
+        self.assertEqual(calls, ["doc"])
+        self.assertEqual(set(results), {"text for doc"})
+        self.assertEqual(group.stats(), {"executed": 1, "coalesced": 4, "in_flight": 0})
+
+    def test_errors_reach_every_caller(self):
+        group = SingleFlight()
+        release = Event()
+
+        def extract():
+            release.wait(timeout=10)
+            raise RuntimeError("Error in OCR process")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(group.do, "doc", extract)
+            while group.in_flight() == 0:
+                sleep(0.01)
+            follower = executor.submit(group.do, "doc", extract)
+            while group.stats()["coalesced"] == 0:
+                sleep(0.01)
+            release.set()
+            for future in (leader, follower):
+                with self.assertRaises(RuntimeError):
+                    future.result()
+        self.assertEqual(group.in_flight(), 0)
+
+    def test_sequential_calls_run_again(self):
+        group = SingleFlight()
+        self.assertEqual(group.do("doc", str.upper, "a"), "A")
+        self.assertEqual(group.do("doc", str.upper, "b"), "B")
+        self.assertEqual(group.stats()["executed"], 2)
+
+
+if __name__ == "__main__":
+    main()
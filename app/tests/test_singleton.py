@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from unittest import TestCase, main
+
+from app.singleton import process_wide
+
+
+class TestProcessWide(TestCase):
+    def test_builds_once(self):
+        built = []
+
+        @process_wide
+        def get_thing() -> object:
+            """returns a thing"""
+            sleep(0.05)
+            built.append(object())
+            return built[-1]
+
+        self.assertEqual(get_thing.__doc__, "returns a thing")
+        with ThreadPoolExecutor(4) as executor:
+            things = list(executor.map(lambda _: get_thing(), range(4)))
+        self.assertEqual(len(built), 1)
+        self.assertTrue(all(thing is built[0] for thing in things))
+
+        self.assertIs(get_thing.clear(), built[0])
+        self.assertIsNone(get_thing.clear())
+        self.assertIsNot(get_thing(), built[0])
+        self.assertEqual(len(built), 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import main as app_main
+from app.__init__ import DOCSTORE_PATH
+from app.data_model import FieldRegion
+from app.templates import (
+    CA_APP_CHECKBOXES,
+    CA_APP_FIELDS,
+    TemplateLayout,
+    TemplateRegistry,
+    extract_template_fields,
+    ocr_regions,
+    set_path,
+)
+
+TEST_PDF_PATH = DOCSTORE_PATH / "ACORD_CA_APP.pdf"
+
+
+class TestTemplateLayout(TestCase):
+    def setUp(self) -> None:
+        self.layout = TemplateRegistry().get("ca_app")
+
+    def test_ca_app_layout_is_indexed_by_page(self):
+        self.assertEqual(len(self.layout.regions), len(CA_APP_FIELDS))
+        self.assertEqual(self.layout.pages, [1])
+        self.assertEqual(len(self.layout.checkboxes), len(CA_APP_CHECKBOXES))
+        self.assertEqual(self.layout.checkbox_pages, [1])
+        self.assertLess(self.layout.ocr_area_ratio(), 0.05)
+        self.assertIn("properties", self.layout.schema)
+
+    def test_stored_layout_matches_form(self):
+        rebuilt = TemplateLayout.from_form(
+            "ca_app", TEST_PDF_PATH, CA_APP_FIELDS, checkbox_map=CA_APP_CHECKBOXES
+        )
+        self.assertEqual(rebuilt.to_dict(), self.layout.to_dict())
+
+    def test_register_and_reload(self):
+        layout = TemplateLayout(
+            "custom",
+            [FieldRegion("Policy.Number", 2, (10, 10, 100, 30))],
+            {1: (612, 792), 2: (612, 792)},
+            checkboxes=[FieldRegion("Policy.Lines", 1, (10, 40, 20, 50), value="Auto")],
+        )
+        with TemporaryDirectory() as path:
+            TemplateRegistry(path).register(layout, save=True)
+            reloaded = TemplateRegistry(path)
+        self.assertEqual(reloaded.names(), ["custom"])
+        self.assertEqual(reloaded.get("custom").to_dict(), layout.to_dict())
+        with self.assertRaises(KeyError):
+            reloaded.get("ca_app")
+
+    def test_set_path_nests_lists(self):
+        result = {}
+        set_path(result, ["Vehicles", "1", "VIN"], "123")
+        set_path(result, ["Policy", "Number"], "P-1")
+        self.assertEqual(
+            result, {"Vehicles": [None, {"VIN": "123"}], "Policy": {"Number": "P-1"}}
+        )
+
+
+class TestTemplateExtraction(TestCase):
+    def test_fields_follow_schema(self):
+        layout = TemplateRegistry().get("ca_app")
+        texts = {
+            region.bbox: region.path.rsplit(".", 1)[-1] for region in layout.regions
+        }
+        texts[layout.regions[-1].bbox] = "$1,000"
+
+        marked = {"Business Auto", "Crime", "LLC"}
+
+        def ocr_regions(pdf_path, page_number, bboxes):
+            return [texts[bbox] for bbox in bboxes]
+
+        def detect_checkboxes(pdf_path, page_number, bboxes):
+            boxes = layout.checkboxes_on_page(page_number)
+            return [checkbox.value in marked for checkbox in boxes]
+
+        with (
+            patch("app.templates.ocr_regions", side_effect=ocr_regions),
+            patch("app.templates.detect_checkboxes", side_effect=detect_checkboxes),
+        ):
+            fields = extract_template_fields(TEST_PDF_PATH, layout, workers=1)
+        self.assertEqual(fields["ApplicantInformation"]["Address"]["City"], "City")
+        self.assertEqual(fields["PolicyInformation"]["PolicyNumber"], "PolicyNumber")
+        self.assertEqual(fields["CoverageDetails"]["Liability"], 1000.0)
+        self.assertEqual(
+            fields["PolicyInformation"]["LinesOfBusiness"], ["Business Auto", "Crime"]
+        )
+        self.assertEqual(fields["ApplicantInformation"]["EntityType"], "LLC")
+
+    def test_ocr_regions_crops_boxes(self):
+        page = Image.new("L", (2550, 3300), 255)
+        with (
+            patch("app.templates.render_page", return_value=page),
+            patch(
+                "app.templates.image_to_string",
+                side_effect=lambda crop, config: f" {crop.size} ",
+            ),
+        ):
+            texts = ocr_regions(TEST_PDF_PATH, 1, [(0, 0, 72, 36), (72, 72, 144, 90)])
+        self.assertEqual(texts, ["(300, 150)", "(300, 75)"])
+
+    def test_unknown_template_returns_404(self):
+        client = TestClient(app_main.app)
+        files = {"file": ("doc.pdf", b"%PDF-1.4", "application/pdf")}
+        response = client.post("/extract/pdf/template/missing", files=files)
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from app.extract import PDFExtractor
+from app.tracking import TrackingSink
+
+
+def fake_client(fail: bool = False) -> MagicMock:
+    client = MagicMock()
+    client.get_experiment_by_name.return_value = None
+    client.create_experiment.return_value = "7"
+    client.create_run.return_value.info.run_id = "run"
+    if fail:
+        client.create_run.side_effect = ConnectionError("tracking server down")
+    return client
+
+
+class TestTrackingSink(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = TemporaryDirectory()
+        self.spool_path = Path(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def sink(self, **kwargs) -> TrackingSink:
+        kwargs = {"flush_interval": 60, "retry_interval": 0, **kwargs}
+        return TrackingSink(spool_path=self.spool_path, **kwargs)
+
+    def test_runs_logged_with_one_batch_call_each(self):
+        client = fake_client()
+        sink = self.sink()
+        artifacts = {}
+
+        def log_artifacts(run_id, path):
+            artifacts.update({p.name: p.read_text() for p in Path(path).iterdir()})
+
+        client.log_artifacts.side_effect = log_artifacts
+        with patch("app.tracking.MlflowClient", return_value=client):
+            for n in range(3):
+                self.assertTrue(
+                    sink.log_run(
+                        {"input_type": "file"}, {"seconds": n}, {"out.json": n}
+                    )
+                )
+            self.assertTrue(sink.flush(timeout=10))
+            sink.shutdown()
+        client.create_experiment.assert_called_once_with("PDF_Extraction")
+        self.assertEqual(client.log_batch.call_count, 3)
+        _, kwargs = client.log_batch.call_args
+        self.assertEqual(
+            [(param.key, param.value) for param in kwargs["params"]],
+            [("input_type", "file")],
+        )
+        self.assertEqual([metric.value for metric in kwargs["metrics"]], [2.0])
+        self.assertEqual(artifacts, {"out.json": "2"})
+        self.assertEqual(client.set_terminated.call_count, 3)
+        self.assertEqual(sink.stats()["logged"], 3)
+
+    def test_log_run_does_not_wait_for_server(self):
+        release = Event()
+        client = fake_client()
+        client.create_run.side_effect = lambda *args, **kwargs: release.wait()
+        sink = self.sink(batch_size=1)
+        with patch("app.tracking.MlflowClient", return_value=client):
+            self.assertTrue(sink.log_run({"a": 1}))
+            self.assertTrue(sink.log_run({"a": 2}))
+            release.set()
+            sink.shutdown()
+
+    def test_failed_server_spools_and_replays(self):
+        sink = self.sink()
+        with patch("app.tracking.MlflowClient", return_value=fake_client(fail=True)):
+            sink.log_run({"a": 1})
+            sink.log_run({"a": 2})
+            sink.flush(timeout=10)
+        self.assertEqual(sink.spooled(), 2)
+        self.assertEqual(sink.stats()["failed_flushes"], 1)
+
+        client = fake_client()
+        sink._client = None
+        with patch("app.tracking.MlflowClient", return_value=client):
+            sink.log_run({"a": 3})
+            sink.flush(timeout=10)
+            sink.shutdown()
+        self.assertEqual(sink.spooled(), 0)
+        logged = [
+            call.kwargs["params"][0].value for call in client.log_batch.call_args_list
+        ]
+        self.assertEqual(logged, ["1", "2", "3"])
+        self.assertEqual(sink.stats()["replayed"], 2)
+
+    def test_spool_survives_crash_during_replay(self):
+        sink = self.sink()
+        with patch("app.tracking.MlflowClient", return_value=fake_client(fail=True)):
+            sink.log_run({"a": 1})
+            sink.log_run({"a": 2})
+            sink.flush(timeout=10)
+            sink.shutdown()
+        with (
+            patch.object(sink, "_send", side_effect=KeyboardInterrupt),
+            self.assertRaises(KeyboardInterrupt),
+        ):
+            sink._write([])
+        self.assertEqual(sink.spooled(), 2)
+
+        client = fake_client()
+        restarted = self.sink()
+        with patch("app.tracking.MlflowClient", return_value=client):
+            restarted.flush(timeout=10)
+            restarted.shutdown()
+        self.assertEqual(restarted.spooled(), 0)
+        self.assertEqual(client.log_batch.call_count, 2)
+
+    def test_runs_spooled_while_waiting_to_retry(self):
+        sink = self.sink(retry_interval=3600)
+        with patch("app.tracking.MlflowClient", return_value=fake_client(fail=True)):
+            sink.log_run({"a": 1})
+            sink.flush(timeout=10)
+        client = fake_client()
+        with patch("app.tracking.MlflowClient", return_value=client):
+            sink.log_run({"a": 2})
+            sink.flush(timeout=10)
+            sink.shutdown()
+        client.log_batch.assert_not_called()
+        self.assertEqual(sink.spooled(), 2)
+
+    def test_overflow_policies(self):
+        release = Event()
+        client = fake_client()
+        client.create_run.side_effect = lambda *args, **kwargs: release.wait()
+        for overflow, spooled, dropped in [("drop", 0, 1), ("spool", 1, 0)]:
+            sink = self.sink(queue_size=1, batch_size=1, overflow=overflow)
+            with patch("app.tracking.MlflowClient", return_value=client):
+                sink.log_run({"n": 1})
+                # wait until the thread is blocked sending the first run
+                while sink.stats()["queued"]:
+                    pass
+                sink.log_run({"n": 2})
+                self.assertEqual(sink.log_run({"n": 3}), overflow == "spool")
+                self.assertEqual(sink.stats()["dropped"], dropped)
+                self.assertEqual(sink.spooled(), spooled)
+                release.set()
+                sink.shutdown()
+                release.clear()
+            (self.spool_path / "runs.jsonl").unlink(missing_ok=True)
+
+    def test_sampling(self):
+        sink = self.sink(sample_rate=0.0)
+        self.assertFalse(sink.log_run({"a": 1}))
+        self.assertEqual(sink.stats()["sampled_out"], 1)
+
+    def test_unknown_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            self.sink(overflow="block")
+
+
+class TestExtractDataLogging(TestCase):
+    @patch("app.extract.set_experiment")
+    @patch("app.extract.set_tracking_uri")
+    def test_extract_data_queues_run(self, *_):
+        sink = MagicMock()
+        extractor = PDFExtractor(None, use_cache=False, sink=sink)
+        with (
+            patch.object(extractor, "read_pdf_from_file", return_value="AGENCY X"),
+            patch.object(extractor, "pass_to_llm", side_effect=lambda data: data),
+        ):
+            data = extractor.extract_data("form.pdf")
+        self.assertEqual(data["agency"]["agency_name"], "X")
+        _, kwargs = sink.log_run.call_args
+        self.assertEqual(kwargs["params"]["input_type"], "file")
+        self.assertIn("seconds", kwargs["metrics"])
+        self.assertIs(kwargs["artifacts"]["output.json"], data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+from json import dumps
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from faker import Faker
+
+from app.data_model import Application
+from app.extract import PDFExtractor
+from app.validation import (
+    SchemaValidator,
+    ValidatorCache,
+    dataclass_schema,
+    validate_records,
+)
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Name": {"type": "string", "minLength": 1},
+        "Year": {"type": "integer", "minimum": 1900},
+        "Start": {"type": "string", "format": "date"},
+        "State": {"enum": ["IL", "NY"]},
+        "Drivers": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"License": {"type": "string", "pattern": "[A-Z]\\d+"}},
+                "required": ["License"],
+            },
+        },
+    },
+    "required": ["Name", "Year"],
+}
+
+
+def application_record() -> dict:
+    faker = Faker()
+    Faker.seed(0)
+    record = Application.rand(faker).to_dict()
+    # rand() fills a few string fields with ints and dates with date objects
+    record["agency"]["agency_code"] = "A-77"
+    record["agency"]["customer_id"] = "CUST-42"
+    record["policy_info"]["proposed_eff_date"] = "02/01/2024"
+    record["policy_info"]["proposed_exp_date"] = "02/01/2025"
+    record["business_info"]["business_started_date"] = "03/01/2010"
+    for insured in [record["first_named_insured"], *record["additional_insureds"]]:
+        insured["naics_code"] = insured["sic_code"] = "1234"
+    for coverage in record["coverages"]:
+        coverage["coverage_code"] = None
+    return record
+
+
+class TestSchemaValidator(TestCase):
+    def setUp(self) -> None:
+        self.validator = SchemaValidator(SCHEMA)
+
+    def test_valid_record(self):
+        record = {
+            "Name": "Widgets",
+            "Year": 2020,
+            "Start": "2020-01-31",
+            "State": "IL",
+            "Drivers": [{"License": "D123"}],
+        }
+        self.assertEqual(self.validator.errors(record), [])
+        self.assertTrue(self.validator.is_valid(record))
+
+    def test_per_field_errors(self):
+        errors = self.validator.errors(
+            {
+                "Name": "",
+                "Year": "2020",
+                "Start": "Jan 31",
+                "State": "CA",
+                "Drivers": [{"License": "D123"}, {"License": "x"}, {}],
+            }
+        )
+        self.assertEqual(
+            [(error.path, error.keyword) for error in errors],
+            [
+                ("Name", "minLength"),
+                ("Year", "type"),
+                ("Start", "format"),
+                ("State", "enum"),
+                ("Drivers[1].License", "pattern"),
+                ("Drivers[2].License", "required"),
+            ],
+        )
+
+    def test_type_error_stops_nested_checks(self):
+        errors = SchemaValidator({"type": "integer", "minimum": 5}).errors("3")
+        self.assertEqual([error.keyword for error in errors], ["type"])
+
+    def test_missing_required(self):
+        errors = self.validator.errors({})
+        self.assertEqual(
+            [(error.path, error.keyword) for error in errors],
+            [("Name", "required"), ("Year", "required")],
+        )
+
+    def test_validate_batch(self):
+        results = self.validator.validate_batch(
+            [{"Name": "a", "Year": 2000}, {"Name": "b"}, None]
+        )
+        self.assertEqual([len(errors) for errors in results], [0, 1, 1])
+
+
+class TestValidatorCache(TestCase):
+    def test_schema_compiled_once(self):
+        with TemporaryDirectory() as path:
+            (Path(path) / "form_template.json").write_text(dumps(SCHEMA))
+            cache = ValidatorCache(path)
+            validator = cache.get("form")
+            (Path(path) / "form_template.json").unlink()
+            self.assertIs(cache.get("form"), validator)
+            with self.assertRaises(KeyError):
+                cache.get("missing")
+
+    def test_template_schema(self):
+        validator = ValidatorCache().get("ca_app")
+        errors = validator.errors({"PolicyInformation": {"LinesOfBusiness": [1]}})
+        self.assertIn(
+            ("PolicyInformation.LinesOfBusiness[0]", "type"),
+            [(error.path, error.keyword) for error in errors],
+        )
+
+
+class TestApplicationSchema(TestCase):
+    def test_schema_from_dataclasses(self):
+        schema = dataclass_schema(Application)
+        self.assertIn("first_named_insured", schema["required"])
+        business = schema["properties"]["business_info"]["properties"]
+        self.assertEqual(
+            business["annual_revenue"], {"type": ["number", "null"], "minimum": 0}
+        )
+        self.assertEqual(schema["properties"]["additional_insureds"]["type"], "array")
+
+    def test_application_records(self):
+        valid = application_record()
+        invalid = application_record()
+        invalid["business_info"]["annual_revenue"] = "lots"
+        del invalid["agency"]["contact_info"]
+        results = validate_records([valid, invalid])
+        self.assertEqual(results[0], [])
+        self.assertEqual(
+            [(error.path, error.keyword) for error in results[1]],
+            [
+                ("agency.contact_info", "required"),
+                ("business_info.annual_revenue", "type"),
+            ],
+        )
+
+    def test_out_of_range_values(self):
+        record = application_record()
+        record["policy_info"]["proposed_eff_date"] = "next spring"
+        record["policy_info"]["premium_details"] = {"Umbrella": -300.0}
+        record["business_info"]["no_of_employees_fulltime"] = -25
+        record["coverages"][0]["premium"] = -300.0
+        self.assertEqual(
+            [(error.path, error.keyword) for error in validate_records([record])[0]],
+            [
+                ("policy_info.proposed_eff_date", "format"),
+                ("policy_info.premium_details.Umbrella", "minimum"),
+                ("business_info.no_of_employees_fulltime", "minimum"),
+                ("coverages[0].premium", "minimum"),
+            ],
+        )
+
+    def test_form_values(self):
+        record = application_record()
+        record["policy_info"]["proposed_eff_date"] = "1/5/2025"
+        record["business_info"]["business_started_date"] = "2010-03-01"
+        # a checked line of business whose premium was left blank
+        record["policy_info"]["premium_details"] = {"Umbrella": None}
+        self.assertEqual(validate_records([record]), [[]])
+
+    @patch("app.extract.set_experiment")
+    @patch("app.extract.set_tracking_uri")
+    def test_extractor_validate_data(self, *_):
+        extractor = PDFExtractor(None, use_cache=False)
+        self.assertTrue(extractor.validate_data(extractor.structure_data("AGENCY X")))
+        self.assertFalse(extractor.validate_data({"content": "raw text"}))
+        misread = "PROPOSED EFF DATE 02/0l/2O24\n# FULL TIME EMPL -25"
+        self.assertFalse(extractor.validate_data(extractor.structure_data(misread)))
+
+
+if __name__ == "__main__":
+    main()
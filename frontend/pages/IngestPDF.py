@@ -18,7 +18,7 @@ from streamlit import (
     text_input,
     title,
 )
-from utils import process_response
+from utils import process_response, process_stream
 
 from frontend.constants import APP_URL_BASE
 
@@ -38,10 +38,11 @@ with app_tab:
         uploaded_pdf = file_uploader("Choose your PDF file", type=["pdf"])
         if uploaded_pdf is not None:
             pdf_bytes = uploaded_pdf.getvalue()
-            URL = f"{APP_URL_BASE}/extract/pdf"
+            URL = f"{APP_URL_BASE}/extract/pdf/stream"
             files = {"file": ("document.pdf", pdf_bytes, "application/pdf")}
-            response = post(URL, files=files)
-            process_response(response)
+            # Stream the response so pages render as soon as they are extracted
+            response = post(URL, files=files, stream=True)
+            process_stream(response)
 
     # Image Upload
     elif upload_method == "Upload Image":
@@ -1,4 +1,6 @@
-from streamlit import error, json, success
+from json import loads
+
+from streamlit import empty, error, expander, json, success, text
 
 
 def process_response(response):
@@ -29,3 +31,49 @@ def process_response(response):
         error(
             f"Failed to extract data. Status code: {response.status_code} - {response.reason}"
         )
+
+
+def process_stream(response):
+    """
+    Utility function to render a streaming extraction response page by page.
+
+    Args:
+    response (requests.Response): A response from requests.post(..., stream=True) to an
+    NDJSON extraction endpoint.
+
+    Description:
+    Each line of the response is one JSON event. Every "page" event is rendered in
+    its own expander as soon as it arrives, so long documents display
+    progressively. The final "done" or "error" event replaces the progress
+    message with a summary. Filled fillable PDFs arrive as a single "form" event
+    holding the structured application.
+    """
+    if response.status_code != 200:
+        error(
+            f"Failed to extract data. Status code: {response.status_code} - "
+            f"{response.reason}"
+        )
+        return
+    status = empty()
+    status.info("Extracting pages...")
+    pages = 0
+    for line in response.iter_lines():
+        if not line:
+            continue
+        event = loads(line)
+        if event["event"] == "page":
+            pages += 1
+            with expander(f"Page {event['page_number']} ({event['method']})"):
+                text(event["text"])
+            status.info(f"Extracted {pages} pages...")
+        elif event["event"] == "form":
+            json(event["application"])
+        elif event["event"] == "done":
+            status.success(
+                f"Data extracted successfully from {event['pages']} pages "
+                f"in {event['elapsed']:.1f}s: {event['method_counts']}"
+            )
+        elif event["event"] == "error":
+            status.error(
+                f"Extraction failed after {event['pages']} pages: {event['detail']}"
+            )